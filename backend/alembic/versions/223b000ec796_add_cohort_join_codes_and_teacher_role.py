@@ -0,0 +1,51 @@
+"""add cohort join codes and teacher role
+
+Revision ID: 223b000ec796
+Revises: c7f3a2d9b614
+Create Date: 2026-10-16 20:46:08.430610
+
+"""
+import secrets
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '223b000ec796'
+down_revision: Union[str, None] = 'c7f3a2d9b614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+JOIN_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+JOIN_CODE_LENGTH = 8
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_teacher', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Whoever already teaches a class keeps being able to create them
+    op.execute("UPDATE users SET is_teacher = true WHERE id IN (SELECT teacher_id FROM cohorts)")
+
+    # Existing classes get a code each before the column becomes required
+    op.add_column('cohorts', sa.Column('join_code', sa.String(length=16), nullable=True))
+    bind = op.get_bind()
+    codes = set()
+    for cohort_id, in bind.execute(sa.text("SELECT id FROM cohorts")).fetchall():
+        code = None
+        while code is None or code in codes:
+            code = ''.join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+        codes.add(code)
+        bind.execute(sa.text("UPDATE cohorts SET join_code = :code WHERE id = :id"), {'code': code, 'id': cohort_id})
+    with op.batch_alter_table('cohorts') as batch_op:
+        batch_op.alter_column('join_code', existing_type=sa.String(length=16), nullable=False)
+    op.create_index(op.f('ix_cohorts_join_code'), 'cohorts', ['join_code'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cohorts_join_code'), table_name='cohorts')
+    with op.batch_alter_table('cohorts') as batch_op:
+        batch_op.drop_column('join_code')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('is_teacher')
@@ -0,0 +1,29 @@
+"""add idempotency key to user activities
+
+Revision ID: 3f8c2a6b91d4
+Revises: e6a19c4d7f30
+Create Date: 2026-10-16 20:41:09.553871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8c2a6b91d4'
+down_revision: Union[str, None] = 'e6a19c4d7f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_activities', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index('uq_user_activities_user_id_idempotency_key', 'user_activities', ['user_id', 'idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_user_activities_user_id_idempotency_key', table_name='user_activities')
+    with op.batch_alter_table('user_activities') as batch_op:
+        batch_op.drop_column('idempotency_key')
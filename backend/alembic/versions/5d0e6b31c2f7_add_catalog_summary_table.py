@@ -0,0 +1,39 @@
+"""add catalog summary table
+
+Revision ID: 5d0e6b31c2f7
+Revises: 879cf95569d3
+Create Date: 2026-10-16 13:20:18.640917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0e6b31c2f7'
+down_revision: Union[str, None] = '879cf95569d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are materialized lazily by the API for the current catalog version
+    op.create_table('catalog_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('catalog_version', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('label', sa.String(length=100), nullable=True),
+    sa.Column('total_questions', sa.Integer(), nullable=False),
+    sa.Column('easy_questions', sa.Integer(), nullable=False),
+    sa.Column('medium_questions', sa.Integer(), nullable=False),
+    sa.Column('hard_questions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('catalog_version', 'dimension', 'key', name='uq_catalog_summary_version_dimension_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_summary')
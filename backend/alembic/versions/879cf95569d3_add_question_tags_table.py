@@ -0,0 +1,45 @@
+"""add question tags table
+
+Revision ID: 879cf95569d3
+Revises: a263a52c8644
+Create Date: 2026-10-16 11:47:05.392641
+
+"""
+from typing import Sequence, Union
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '879cf95569d3'
+down_revision: Union[str, None] = 'a263a52c8644'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    question_tags = op.create_table('question_tags',
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('question_id', 'tag')
+    )
+    op.create_index('ix_question_tags_tag_question_id', 'question_tags', ['tag', 'question_id'], unique=False)
+
+    # Backfill from the JSON tags column
+    rows = op.get_bind().execute(sa.text("SELECT id, tags FROM questions WHERE tags IS NOT NULL")).fetchall()
+    backfill = []
+    for question_id, tags in rows:
+        if isinstance(tags, str):
+            tags = json.loads(tags)
+        for tag in dict.fromkeys(tags or []):
+            backfill.append({'question_id': question_id, 'tag': tag})
+    if backfill:
+        op.bulk_insert(question_tags, backfill)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_question_tags_tag_question_id', table_name='question_tags')
+    op.drop_table('question_tags')
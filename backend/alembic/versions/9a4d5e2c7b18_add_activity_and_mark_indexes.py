@@ -0,0 +1,35 @@
+"""add activity and mark indexes
+
+Revision ID: 9a4d5e2c7b18
+Revises: 3f8c2a6b91d4
+Create Date: 2026-10-16 21:18:33.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d5e2c7b18'
+down_revision: Union[str, None] = '3f8c2a6b91d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_activities_user_id_question_id_id', 'user_activities', ['user_id', 'question_id', 'id'], unique=False)
+    op.create_index('ix_user_activities_user_id_completed_at', 'user_activities', ['user_id', 'completed_at'], unique=False)
+    op.create_index('ix_marks_user_id_mark_type_created_at', 'marks', ['user_id', 'mark_type', 'created_at'], unique=False)
+    op.create_index(
+        'ix_questions_active_chapter_difficulty', 'questions', ['chapter_number', 'difficulty_level', 'id'], unique=False,
+        sqlite_where=sa.text('is_active = 1'), postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_questions_active_chapter_difficulty', table_name='questions')
+    op.drop_index('ix_marks_user_id_mark_type_created_at', table_name='marks')
+    op.drop_index('ix_user_activities_user_id_completed_at', table_name='user_activities')
+    op.drop_index('ix_user_activities_user_id_question_id_id', table_name='user_activities')
@@ -0,0 +1,32 @@
+"""add catalog state table
+
+Revision ID: a263a52c8644
+Revises: 24de4b9a9aef
+Create Date: 2026-10-16 09:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a263a52c8644'
+down_revision: Union[str, None] = '24de4b9a9aef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_state (id, version) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_state')
@@ -0,0 +1,58 @@
+"""add practice sessions
+
+Revision ID: a9d4e7b2c815
+Revises: f2b8c61d9e47
+Create Date: 2026-10-16 23:58:44.610372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e7b2c815'
+down_revision: Union[str, None] = 'f2b8c61d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('practice_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('ended_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('answered', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('time_spent', sa.Integer(), nullable=False),
+    sa.Column('chapters_touched', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_practice_sessions_id'), 'practice_sessions', ['id'], unique=False)
+    op.create_index('ix_practice_sessions_user_id_started_at', 'practice_sessions', ['user_id', 'started_at'], unique=False)
+    op.create_table('practice_session_chapters',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_number', sa.Integer(), nullable=False),
+    sa.Column('answered', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['practice_sessions.id'], ),
+    sa.PrimaryKeyConstraint('session_id', 'chapter_number')
+    )
+    # Earlier answers belong to no session
+    with op.batch_alter_table('user_activities') as batch_op:
+        batch_op.add_column(sa.Column('session_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_user_activities_session_id', 'practice_sessions', ['session_id'], ['id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_activities') as batch_op:
+        batch_op.drop_constraint('fk_user_activities_session_id', type_='foreignkey')
+        batch_op.drop_column('session_id')
+    op.drop_table('practice_session_chapters')
+    op.drop_index('ix_practice_sessions_user_id_started_at', table_name='practice_sessions')
+    op.drop_index(op.f('ix_practice_sessions_id'), table_name='practice_sessions')
+    op.drop_table('practice_sessions')
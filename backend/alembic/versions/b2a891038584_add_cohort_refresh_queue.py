@@ -0,0 +1,36 @@
+"""add cohort refresh queue
+
+Revision ID: b2a891038584
+Revises: 223b000ec796
+Create Date: 2026-10-16 20:49:29.617342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2a891038584'
+down_revision: Union[str, None] = '223b000ec796'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cohort_refresh_queue',
+    sa.Column('activity_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_number', sa.Integer(), nullable=True),
+    sa.Column('day', sa.Date(), nullable=True),
+    sa.PrimaryKeyConstraint('activity_id')
+    )
+    # Answers recorded before the queue existed are only covered by the old
+    # high-water mark, which can miss late commits: rebuild every class once
+    op.execute("UPDATE cohorts SET stats_stale = true")
+
+
+def downgrade() -> None:
+    op.drop_table('cohort_refresh_queue')
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""add user stats rollups
+
+Revision ID: b7e3d1f04a62
+Revises: 9a4d5e2c7b18
+Create Date: 2026-10-16 22:07:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d1f04a62'
+down_revision: Union[str, None] = '9a4d5e2c7b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_stats_summary',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('questions_attempted', sa.Integer(), nullable=False),
+    sa.Column('first_correct', sa.Integer(), nullable=False),
+    sa.Column('total_attempts', sa.Integer(), nullable=False),
+    sa.Column('total_time', sa.Integer(), nullable=False),
+    sa.Column('last_activity_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('user_stats_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('label', sa.String(length=100), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'dimension', 'key')
+    )
+
+    # Backfill from the activity log (scripts/rebuild_stats_rollups.py does the same later on)
+    op.execute("""
+        INSERT INTO user_stats_summary
+            (user_id, questions_attempted, first_correct, total_attempts, total_time, last_activity_id)
+        SELECT t.user_id, f.questions, f.first_correct, t.attempts, t.total_time, t.last_id
+        FROM (
+            SELECT user_id, count(*) AS attempts, coalesce(sum(time_spent), 0) AS total_time, max(id) AS last_id
+            FROM user_activities
+            GROUP BY user_id
+        ) AS t
+        JOIN (
+            SELECT a.user_id, count(*) AS questions,
+                   sum(CASE WHEN a.is_correct THEN 1 ELSE 0 END) AS first_correct
+            FROM user_activities AS a
+            JOIN (
+                SELECT min(id) AS id FROM user_activities GROUP BY user_id, question_id
+            ) AS first ON first.id = a.id
+            GROUP BY a.user_id
+        ) AS f ON f.user_id = t.user_id
+    """)
+    op.execute("""
+        INSERT INTO user_stats_counters (user_id, dimension, key, label, attempts, correct)
+        SELECT a.user_id, 'chapter', CAST(q.chapter_number AS VARCHAR(100)), max(q.chapter_name),
+               count(*), sum(CASE WHEN a.is_correct THEN 1 ELSE 0 END)
+        FROM user_activities AS a
+        JOIN questions AS q ON q.id = a.question_id
+        GROUP BY a.user_id, q.chapter_number
+    """)
+    op.execute("""
+        INSERT INTO user_stats_counters (user_id, dimension, key, label, attempts, correct)
+        SELECT a.user_id, 'difficulty', q.difficulty_level, NULL,
+               count(*), sum(CASE WHEN a.is_correct THEN 1 ELSE 0 END)
+        FROM user_activities AS a
+        JOIN questions AS q ON q.id = a.question_id
+        GROUP BY a.user_id, q.difficulty_level
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats_counters')
+    op.drop_table('user_stats_summary')
@@ -0,0 +1,74 @@
+"""add questions full-text search index
+
+Revision ID: c41f7a9e08b2
+Revises: 5d0e6b31c2f7
+Create Date: 2026-10-16 14:05:51.207334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e08b2'
+down_revision: Union[str, None] = '5d0e6b31c2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The index as of this revision, inlined so the migration never imports the app
+FTS_COLUMNS = "rowid, question_text, options, explanations, tags, chapter_number, difficulty_level"
+
+FTS_SELECT = """SELECT
+        {row}.id,
+        {row}.question_text,
+        (SELECT group_concat(value, ' ') FROM json_each({row}.options)),
+        (SELECT group_concat(value, ' ') FROM json_each({row}.explanations)),
+        (SELECT group_concat(value, ' ') FROM json_each({row}.tags)),
+        {row}.chapter_number,
+        {row}.difficulty_level"""
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        question_text, options, explanations, tags,
+        chapter_number UNINDEXED, difficulty_level UNINDEXED,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions
+    WHEN NEW.is_active BEGIN
+        INSERT INTO questions_fts ({FTS_COLUMNS}) {FTS_SELECT.format(row="NEW")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF
+        question_text, options, explanations, tags, chapter_number, difficulty_level, is_active
+    ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = OLD.id;
+        INSERT INTO questions_fts ({FTS_COLUMNS}) {FTS_SELECT.format(row="NEW")} WHERE NEW.is_active;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = OLD.id;
+    END""",
+]
+
+SEARCH_INDEX_BACKFILL = f"""
+    INSERT INTO questions_fts ({FTS_COLUMNS})
+    {FTS_SELECT.format(row="q")}
+    FROM questions q
+    WHERE q.is_active
+"""
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_INDEX_DDL:
+        op.execute(statement)
+    op.execute(SEARCH_INDEX_BACKFILL)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS questions_fts_insert")
+    op.execute("DROP TRIGGER IF EXISTS questions_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS questions_fts_delete")
+    op.execute("DROP TABLE IF EXISTS questions_fts")
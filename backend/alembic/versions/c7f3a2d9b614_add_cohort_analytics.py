@@ -0,0 +1,104 @@
+"""add cohort analytics
+
+Revision ID: c7f3a2d9b614
+Revises: a9d4e7b2c815
+Create Date: 2026-10-16 01:12:37.208514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f3a2d9b614'
+down_revision: Union[str, None] = 'a9d4e7b2c815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cohorts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('stats_stale', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['teacher_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cohorts_id'), 'cohorts', ['id'], unique=False)
+    op.create_index(op.f('ix_cohorts_teacher_id'), 'cohorts', ['teacher_id'], unique=False)
+    op.create_index(
+        'ix_cohorts_stale', 'cohorts', ['id'], unique=False,
+        sqlite_where=sa.text('stats_stale = 1'), postgresql_where=sa.text('stats_stale')
+    )
+    op.create_table('cohort_members',
+    sa.Column('cohort_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['cohort_id'], ['cohorts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('cohort_id', 'user_id')
+    )
+    op.create_index('ix_cohort_members_user_id_cohort_id', 'cohort_members', ['user_id', 'cohort_id'], unique=False)
+    op.create_table('cohort_chapter_stats',
+    sa.Column('cohort_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_number', sa.Integer(), nullable=False),
+    sa.Column('chapter_name', sa.String(length=100), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('students_attempted', sa.Integer(), nullable=False),
+    sa.Column('students_mastered', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['cohort_id'], ['cohorts.id'], ),
+    sa.PrimaryKeyConstraint('cohort_id', 'chapter_number')
+    )
+    op.create_table('cohort_question_stats',
+    sa.Column('cohort_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('students_attempted', sa.Integer(), nullable=False),
+    sa.Column('first_correct', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['cohort_id'], ['cohorts.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('cohort_id', 'question_id')
+    )
+    op.create_table('cohort_daily_activity',
+    sa.Column('cohort_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('active_students', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['cohort_id'], ['cohorts.id'], ),
+    sa.PrimaryKeyConstraint('cohort_id', 'day')
+    )
+    op.create_table('cohort_dashboards',
+    sa.Column('cohort_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('last_activity_id', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cohort_id'], ['cohorts.id'], ),
+    sa.PrimaryKeyConstraint('cohort_id')
+    )
+    # Start the high-water mark at zero: the first refresh folds in the whole log
+    op.create_table('cohort_analytics_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_activity_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cohort_analytics_state')
+    op.drop_table('cohort_dashboards')
+    op.drop_table('cohort_daily_activity')
+    op.drop_table('cohort_question_stats')
+    op.drop_table('cohort_chapter_stats')
+    op.drop_index('ix_cohort_members_user_id_cohort_id', table_name='cohort_members')
+    op.drop_table('cohort_members')
+    op.drop_index('ix_cohorts_stale', table_name='cohorts')
+    op.drop_index(op.f('ix_cohorts_teacher_id'), table_name='cohorts')
+    op.drop_index(op.f('ix_cohorts_id'), table_name='cohorts')
+    op.drop_table('cohorts')
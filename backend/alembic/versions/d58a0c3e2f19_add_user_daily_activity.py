@@ -0,0 +1,53 @@
+"""add user daily activity
+
+Revision ID: d58a0c3e2f19
+Revises: b7e3d1f04a62
+Create Date: 2026-10-16 22:48:12.907451
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd58a0c3e2f19'
+down_revision: Union[str, None] = 'b7e3d1f04a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('timezone', sa.String(length=50), nullable=False, server_default='UTC'))
+    op.create_table('user_daily_activity',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('time_spent', sa.Integer(), nullable=False),
+    sa.Column('first_attempt_correct', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Backfill from the activity log; every user starts out on UTC
+    op.execute("""
+        INSERT INTO user_daily_activity (user_id, day, total, correct, time_spent, first_attempt_correct)
+        SELECT a.user_id, date(a.completed_at), count(*),
+               sum(CASE WHEN a.is_correct THEN 1 ELSE 0 END),
+               coalesce(sum(a.time_spent), 0),
+               sum(CASE WHEN a.is_correct AND first.id IS NOT NULL THEN 1 ELSE 0 END)
+        FROM user_activities AS a
+        LEFT JOIN (
+            SELECT min(id) AS id FROM user_activities GROUP BY user_id, question_id
+        ) AS first ON first.id = a.id
+        WHERE a.completed_at IS NOT NULL
+        GROUP BY a.user_id, date(a.completed_at)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_daily_activity')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('timezone')
@@ -0,0 +1,53 @@
+"""add user question state table
+
+Revision ID: e6a19c4d7f30
+Revises: c41f7a9e08b2
+Create Date: 2026-10-16 20:02:17.846120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a19c4d7f30'
+down_revision: Union[str, None] = 'c41f7a9e08b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_question_state',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('first_activity_id', sa.Integer(), nullable=True),
+    sa.Column('last_activity_id', sa.Integer(), nullable=True),
+    sa.Column('first_correct', sa.Boolean(), nullable=True),
+    sa.Column('last_correct', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['first_activity_id'], ['user_activities.id'], ),
+    sa.ForeignKeyConstraint(['last_activity_id'], ['user_activities.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'question_id')
+    )
+
+    # Backfill from the activity log
+    op.execute("""
+        INSERT INTO user_question_state
+            (user_id, question_id, attempt_count, first_activity_id, last_activity_id, first_correct, last_correct)
+        SELECT g.user_id, g.question_id, g.attempts, g.first_id, g.last_id, f.is_correct, l.is_correct
+        FROM (
+            SELECT user_id, question_id, count(*) AS attempts, min(id) AS first_id, max(id) AS last_id
+            FROM user_activities
+            GROUP BY user_id, question_id
+        ) AS g
+        JOIN user_activities AS f ON f.id = g.first_id
+        JOIN user_activities AS l ON l.id = g.last_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_question_state')
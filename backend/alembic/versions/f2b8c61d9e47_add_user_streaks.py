@@ -0,0 +1,80 @@
+"""add user streaks
+
+Revision ID: f2b8c61d9e47
+Revises: d58a0c3e2f19
+Create Date: 2026-10-16 23:31:05.274918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8c61d9e47'
+down_revision: Union[str, None] = 'd58a0c3e2f19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_stats_summary', sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user_stats_summary', sa.Column('longest_streak', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user_stats_summary', sa.Column('daily_streak', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user_stats_summary', sa.Column('longest_daily_streak', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user_stats_summary', sa.Column('last_practice_day', sa.Date(), nullable=True))
+
+    # Backfill correct-answer streaks: every wrong answer starts a new run
+    op.execute("""
+        WITH ordered AS (
+            SELECT user_id, is_correct,
+                   sum(CASE WHEN is_correct THEN 0 ELSE 1 END) OVER (PARTITION BY user_id ORDER BY id) AS run
+            FROM user_activities
+        ), runs AS (
+            SELECT user_id, run, sum(CASE WHEN is_correct THEN 1 ELSE 0 END) AS length
+            FROM ordered GROUP BY user_id, run
+        )
+        UPDATE user_stats_summary SET
+            current_streak = coalesce((
+                SELECT length FROM runs WHERE runs.user_id = user_stats_summary.user_id ORDER BY run DESC LIMIT 1
+            ), 0),
+            longest_streak = coalesce((
+                SELECT max(length) FROM runs WHERE runs.user_id = user_stats_summary.user_id
+            ), 0)
+    """)
+
+    # Backfill daily streaks: consecutive days share day number minus rank
+    if op.get_bind().dialect.name == 'postgresql':
+        day_number = "(day - DATE '1970-01-01')"
+    else:
+        day_number = "CAST(julianday(day) AS INTEGER)"
+    op.execute(f"""
+        WITH numbered AS (
+            SELECT user_id, day, {day_number} - row_number() OVER (PARTITION BY user_id ORDER BY day) AS island
+            FROM user_daily_activity
+        ), islands AS (
+            SELECT user_id, count(*) AS length, max(day) AS last_day
+            FROM numbered GROUP BY user_id, island
+        )
+        UPDATE user_stats_summary SET
+            daily_streak = coalesce((
+                SELECT length FROM islands WHERE islands.user_id = user_stats_summary.user_id
+                ORDER BY last_day DESC LIMIT 1
+            ), 0),
+            longest_daily_streak = coalesce((
+                SELECT max(length) FROM islands WHERE islands.user_id = user_stats_summary.user_id
+            ), 0),
+            last_practice_day = (
+                SELECT max(day) FROM user_daily_activity WHERE user_daily_activity.user_id = user_stats_summary.user_id
+            )
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_stats_summary') as batch_op:
+        batch_op.drop_column('last_practice_day')
+        batch_op.drop_column('longest_daily_streak')
+        batch_op.drop_column('daily_streak')
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('current_streak')
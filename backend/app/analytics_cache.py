@@ -0,0 +1,162 @@
+"""
+Per-user analytics response cache
+
+The dashboard polls the analytics endpoints constantly, and between two polls
+the user has usually not answered anything. Responses are kept as encoded JSON
+keyed by ``(user id, endpoint, params, version)``, where the version is the
+user's last activity id together with the catalog version and the user's local
+date (``get_analytics_version``, one primary-key read). A new answer therefore
+changes the key and can never be served a stale report; ``invalidate`` also
+drops the user's entries as soon as an answer is committed or their analytics
+are reset, so the memory is freed straight away.
+
+Entries are evicted least-recently-used beyond ``max_entries`` and expire after
+``ttl_s``. Concurrent misses for the same key share one computation
+(single-flight) instead of all hitting the database.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.database import SessionRunner
+
+
+class AnalyticsCache:
+    """LRU + TTL cache of encoded analytics responses with single-flight misses"""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl = ttl_s
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires at, payload)
+        self._by_user: Dict[int, set] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0  # lookups that ran ``build``
+        self.coalesced = 0  # lookups that waited for another request's ``build`` instead
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def fetch(
+        self,
+        db: SessionRunner,
+        user_id: int,
+        endpoint: str,
+        params: tuple,
+        build: Callable[[], Awaitable[Any]]
+    ) -> bytes:
+        """Encoded response for the key, running ``build`` only on a miss"""
+        from app.crud.analytics import get_analytics_version
+
+        version = await db.run(get_analytics_version, user_id)
+        key = (user_id, endpoint, params, version)
+        payload = self._lookup(key)
+        if payload is not None:
+            return payload
+
+        pending = self._inflight.get(key)
+        with self._lock:
+            if pending is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = orjson.dumps(await build())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; nobody else has to retrieve it
+            raise
+        finally:
+            del self._inflight[key]
+        self._store(key, payload)
+        future.set_result(payload)
+        return payload
+
+    def _lookup(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, key: tuple, payload: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._by_user.setdefault(key[0], set()).add(key)
+            self.bytes += len(payload)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        _, payload = self._entries.pop(key)
+        self.bytes -= len(payload)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Drop every cached response of the users, e.g. after they answered"""
+        with self._lock:
+            for user_id in set(user_ids):
+                for key in list(self._by_user.get(user_id, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "users": len(self._by_user),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "in_flight": len(self._inflight)
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+analytics_cache = AnalyticsCache(settings.analytics_cache_entries, settings.analytics_cache_ttl_s)
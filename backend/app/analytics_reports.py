@@ -0,0 +1,264 @@
+"""
+Per-user report building shared by the analytics engines
+
+``app.crud.analytics`` groups a user's answers in SQL and
+``app.columnar_analytics`` groups them with NumPy; both hand the grouped rows
+to ``detailed_report`` and ``trend`` here, so the engines agree exactly. The
+time-zone helpers decide which local day and hour an answer falls in.
+"""
+
+import math
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.models import PracticeSession, User
+
+MOVING_AVERAGE_DAYS = 7
+TIME_PERCENTILES = (25, 50, 75, 90)
+
+
+@lru_cache(maxsize=None)
+def time_zone(name: Optional[str]) -> tzinfo:
+    """Time zone for a user's ``timezone`` setting, UTC when unset or unknown"""
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def local_time(value: datetime, zone: tzinfo) -> datetime:
+    """Wall-clock time in ``zone``; naive timestamps are stored in UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(zone)
+
+
+def utc_offsets(zone: tzinfo, start: datetime, end: datetime) -> List[tuple]:
+    """
+    ``(from, offset minutes)`` for every UTC offset ``zone`` uses between the
+    naive UTC times ``start`` and ``end``, one entry per daylight-saving change
+    """
+    def offset(at: datetime) -> int:
+        return int(local_time(at, zone).utcoffset().total_seconds()) // 60
+
+    periods = [(start, offset(start))]
+    day = start
+    while day < end:
+        next_day = min(day + timedelta(days=1), end)
+        if offset(next_day) != periods[-1][1]:
+            # Bisect to the second the offset changed
+            low, high = 0, int((next_day - day).total_seconds())
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset(day + timedelta(seconds=middle)) == periods[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            periods.append((day + timedelta(seconds=high), offset(next_day)))
+        day = next_day
+    return periods
+
+
+def user_zone(db: Session, user_id: int) -> tzinfo:
+    """Time zone from the user's ``timezone`` setting"""
+    return time_zone(db.query(User.timezone).filter(User.id == user_id).scalar())
+
+
+def window_start(today: date, days: int, zone: tzinfo) -> datetime:
+    """Naive UTC start of the first local day of a ``days``-day window ending ``today``"""
+    start = datetime.combine(today - timedelta(days=days - 1), time.min, zone)
+    return start.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def trend(row) -> Dict[str, Any]:
+    """One ``get_performance_trends`` entry from a day row"""
+    accuracy = (row.correct / row.total * 100) if row.total > 0 else 0
+    return {
+        "date": row.day.isoformat(),
+        "questions_attempted": row.total,
+        "correct_answers": row.correct,
+        "accuracy": round(accuracy, 1),
+        "time_spent": row.time_spent,
+        "avg_time_per_question": round(row.time_spent / row.total, 1) if row.total > 0 else 0
+    }
+
+
+def session_totals(db: Session, user_id: int, start: datetime) -> tuple:
+    """Count and total time of the user's practice sessions with answers started since naive UTC ``start``"""
+    row = db.query(
+        func.count(PracticeSession.id),
+        func.coalesce(func.sum(PracticeSession.time_spent), 0)
+    ).filter(
+        PracticeSession.user_id == user_id,
+        PracticeSession.started_at >= start,
+        PracticeSession.answered > 0
+    ).one()
+    return tuple(row)
+
+
+def hourly_accuracy(hourly_rows: list) -> List[Dict[str, Any]]:
+    """Answers and accuracy for each local hour practised, midnight first"""
+    return [
+        {
+            "hour": int(row.hour),
+            "questions_attempted": row.total,
+            "accuracy": round(row.correct / row.total * 100, 1)
+        }
+        for row in sorted(hourly_rows, key=lambda row: int(row.hour))
+    ]
+
+
+def moving_average(daily: list, window: int = MOVING_AVERAGE_DAYS) -> List[Dict[str, Any]]:
+    """
+    Accuracy over the ``window`` local days ending on each day practised,
+    weighted by answers. Day rows are oldest first.
+    """
+    averages = []
+    first = total = correct = 0
+    for row in daily:
+        total += row.total
+        correct += row.correct
+        while daily[first].day <= row.day - timedelta(days=window):
+            total -= daily[first].total
+            correct -= daily[first].correct
+            first += 1
+        averages.append({
+            "date": row.day.isoformat(),
+            "questions_attempted": total,
+            "accuracy": round(correct / total * 100, 1)
+        })
+    return averages
+
+
+def time_spent_percentiles(time_rows: list) -> Dict[str, int]:
+    """
+    Nearest-rank percentiles of the seconds spent per answer, from
+    ``(time_spent, total)`` rows of the timed answers
+    """
+    time_rows = sorted(time_rows, key=lambda row: row.time_spent)
+    answers = sum(row.total for row in time_rows)
+    percentiles = {}
+    seen = 0
+    rows = iter(time_rows)
+    for percentile in TIME_PERCENTILES:
+        rank = max(math.ceil(percentile * answers / 100), 1)
+        while seen < rank:
+            row = next(rows, None)
+            if row is None:
+                return percentiles
+            seen += row.total
+        percentiles[f"p{percentile}"] = row.time_spent
+    return percentiles
+
+
+def improvement_slope(daily: list) -> Optional[float]:
+    """
+    Least-squares trend of daily accuracy in percentage points per day, None
+    until two days have been practised
+    """
+    if len(daily) < 2:
+        return None
+    xs = [(row.day - daily[0].day).days for row in daily]
+    ys = [row.correct / row.total * 100 for row in daily]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+    return round(slope, 2)
+
+
+def detailed_report(days: int, daily: list, chapter_rows: list, difficulty_rows: list, hourly_rows: list,
+                    time_rows: list, sessions: tuple) -> Dict[str, Any]:
+    """
+    Build ``get_detailed_analytics`` output from grouped rows: day rows oldest
+    first, then chapter, difficulty and hour groups in first-practised order,
+    ``(time_spent, total)`` groups of the timed answers, and the
+    ``(count, total time)`` of the practice sessions in the window
+    """
+    if not daily:
+        return {
+            "insights": {
+                "total_practice_time": 0,
+                "average_session_length": 0,
+                "practice_sessions": 0,
+                "peak_performance_hour": None,
+                "improvement_areas": [],
+                "strengths": []
+            },
+            "patterns": {
+                "most_active_day": None,
+                "preferred_difficulty": None,
+                "consistency_score": 0
+            },
+            "curves": {
+                "hourly_accuracy": [],
+                "moving_average": [],
+                "time_spent_percentiles": {},
+                "improvement_slope": None
+            },
+            "trends": []
+        }
+    
+    # Totals, consistency and weekday patterns come from the day rows
+    total_time = sum(row.time_spent for row in daily)
+    session_count, session_time = sessions
+    avg_session_length = session_time / session_count if session_count > 0 else 0
+    consistency_score = len(daily) / days * 100
+    
+    daily_performance = {}
+    for row in daily:
+        weekday = row.day.strftime('%A')
+        daily_performance[weekday] = daily_performance.get(weekday, 0) + row.total
+    most_active_day = max(daily_performance.keys(), key=lambda x: daily_performance[x])
+    
+    # Chapter performance for strengths/weaknesses
+    chapter_accuracy = []
+    for row in chapter_rows:
+        accuracy = (row.correct / row.total) * 100
+        chapter_accuracy.append({"chapter": row.chapter_name, "accuracy": accuracy, "total": row.total})
+            
+    chapter_accuracy.sort(key=lambda x: x["accuracy"])
+    
+    improvement_areas = [{"name": item["chapter"], "accuracy": round(item["accuracy"])} for item in chapter_accuracy if item["total"] >= 5 and item["accuracy"] < 70]
+    strengths = [{"name": item["chapter"], "accuracy": round(item["accuracy"])} for item in reversed(chapter_accuracy) if item["total"] >= 5 and item["accuracy"] >= 85]
+
+    # Difficulty preference
+    preferred_difficulty = max(difficulty_rows, key=lambda row: row.total).difficulty_level if difficulty_rows else None
+
+    # Peak hour
+    best_hour = None
+    best_accuracy = -1
+    for row in hourly_rows:
+        if row.total >= 3:  # Minimum 3 questions
+            accuracy = row.correct / row.total
+            if accuracy > best_accuracy:
+                best_accuracy = accuracy
+                best_hour = int(row.hour)
+    
+    return {
+        "insights": {
+            "total_practice_time": total_time,
+            "average_session_length": round(avg_session_length, 1),
+            "practice_sessions": session_count,
+            "peak_performance_hour": f"{best_hour}:00" if best_hour is not None else None,
+            "improvement_areas": improvement_areas[:3],
+            "strengths": strengths[:3]
+        },
+        "patterns": {
+            "most_active_day": most_active_day,
+            "preferred_difficulty": preferred_difficulty,
+            "consistency_score": round(consistency_score, 1)
+        },
+        "curves": {
+            "hourly_accuracy": hourly_accuracy(hourly_rows),
+            "moving_average": moving_average(daily),
+            "time_spent_percentiles": time_spent_percentiles(time_rows),
+            "improvement_slope": improvement_slope(daily)
+        },
+        "trends": [trend(row) for row in daily]
+    }
@@ -7,6 +7,7 @@ from loguru import logger
 
 from app.core.database import SessionLocal
 from app.ai.service import AIChatService
+from app.ingest import activity_writer
 
 router = APIRouter()
 
@@ -27,6 +28,9 @@ async def websocket_chat_endpoint(websocket: WebSocket, user_id: int):
             logger.info(f"Received AI chat message from user {user_id}: {message}")
             
             try:
+                # The tutor reads the user's analytics, so wait for queued answers
+                await activity_writer.wait_for_user(user_id)
+                
                 # Use the streaming method and send chunks as they arrive
                 async for chunk in chat_service.get_ai_response_stream(message):
                     await websocket.send_text(chunk)
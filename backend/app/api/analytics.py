@@ -2,24 +2,25 @@
 Enhanced Analytics and Real-time Assessment endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, WebSocket, WebSocketDisconnect
 from sqlalchemy import and_, func, desc
 from loguru import logger
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
 
-from app.core.database import get_db
-from app.api.auth import get_current_user
+from app.core.database import SessionRunner, get_session_runner
+from app.api.auth import get_current_superuser, get_current_user_synced
 from app.crud.analytics import (
     get_user_stats, get_chapter_progress, get_recent_activity, 
     get_leaderboard, get_performance_trends, get_detailed_analytics,
-    get_real_time_stats, record_session_start, record_session_end,
-    reset_user_analytics
+    record_session_start, record_session_end,
+    reset_user_analytics, load_dashboard
 )
 from app.schemas.schemas import UserResponse, AnalyticsResponse, UserStats, ChapterProgress
 from app.models.models import UserActivity, Question
+from app.live_stats import live_stats
+from app.analytics_cache import analytics_cache
 from app.ws_manager import manager
 
 logger.info("Reloading analytics.py...")
@@ -41,29 +42,24 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
 
 @router.get("/", response_model=AnalyticsResponse)
 async def get_user_analytics(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get comprehensive user analytics"""
     try:
-        # Get user statistics
-        user_stats_data = get_user_stats(db, current_user.id)
-        user_stats = UserStats(**user_stats_data)
-        
-        # Get chapter progress
-        chapter_progress_data = get_chapter_progress(db, current_user.id)
-        chapter_progress = [ChapterProgress(**chapter) for chapter in chapter_progress_data]
-        
-        # Get recent activity
-        recent_activity = get_recent_activity(db, current_user.id, limit=20)
+        async def build():
+            # Stats, chapter progress and recent activity from one read transaction
+            dashboard = await db.run(load_dashboard, current_user.id, recent_limit=20)
+            return AnalyticsResponse(
+                user_stats=UserStats(**dashboard['user_stats']),
+                chapter_progress=[ChapterProgress(**chapter) for chapter in dashboard['chapter_progress']],
+                recent_activity=dashboard['recent_activity']
+            ).model_dump(mode="json")
         
         logger.info(f"Analytics requested by user: {current_user.username}")
         
-        return AnalyticsResponse(
-            user_stats=user_stats,
-            chapter_progress=chapter_progress,
-            recent_activity=recent_activity
-        )
+        content = await analytics_cache.fetch(db, current_user.id, "dashboard", (), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Analytics error: {str(e)}")
@@ -75,13 +71,17 @@ async def get_user_analytics(
 
 @router.get("/stats", response_model=UserStats)
 async def get_user_statistics(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get user statistics only"""
     try:
-        user_stats_data = get_user_stats(db, current_user.id)
-        return UserStats(**user_stats_data)
+        async def build():
+            user_stats_data = await db.run(get_user_stats, current_user.id)
+            return UserStats(**user_stats_data).model_dump(mode="json")
+        
+        content = await analytics_cache.fetch(db, current_user.id, "stats", (), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Stats error: {str(e)}")
@@ -93,12 +93,12 @@ async def get_user_statistics(
 
 @router.get("/real-time-stats")
 async def get_real_time_stats(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get real-time statistics for dashboard updates"""
     try:
-        stats = get_real_time_stats(db, current_user.id)
+        stats = await db.run(live_stats.get, current_user.id)
         
         # Broadcast to connected clients
         await manager.broadcast(json.dumps({
@@ -119,14 +119,17 @@ async def get_real_time_stats(
 
 @router.get("/detailed")
 async def get_detailed_analytics_endpoint(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    days: int = 30
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner),
+    days: int = Query(30, ge=1, le=365, description="Window in days, e.g. 7, 30, 90 or 365")
 ):
     """Get detailed analytics with trends and patterns"""
     try:
-        analytics = get_detailed_analytics(db, current_user.id, days)
-        return analytics
+        async def build():
+            return await db.run(get_detailed_analytics, current_user.id, days)
+        
+        content = await analytics_cache.fetch(db, current_user.id, "detailed", (days,), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Detailed analytics error: {str(e)}")
@@ -138,14 +141,18 @@ async def get_detailed_analytics_endpoint(
 
 @router.get("/trends")
 async def get_performance_trends_endpoint(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    days: int = 30
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner),
+    days: int = Query(30, ge=1, le=365, description="Window in days, e.g. 7, 30, 90 or 365")
 ):
     """Get performance trends over time"""
     try:
-        trends = get_performance_trends(db, current_user.id, days)
-        return {"trends": trends}
+        async def build():
+            trends = await db.run(get_performance_trends, current_user.id, days)
+            return {"trends": trends}
+        
+        content = await analytics_cache.fetch(db, current_user.id, "trends", (days,), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Trends error: {str(e)}")
@@ -157,22 +164,22 @@ async def get_performance_trends_endpoint(
 
 @router.post("/session/start")
 async def start_practice_session(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Record the start of a practice session"""
     try:
-        session = record_session_start(db, current_user.id)
+        session = await db.run(record_session_start, current_user.id)
         
         # Broadcast session start
         await manager.broadcast(json.dumps({
             "type": "session_start",
             "user_id": current_user.id,
             "session_id": session.id,
-            "timestamp": session.created_at.isoformat()
+            "timestamp": session.started_at.isoformat()
         }))
         
-        return {"session_id": session.id, "started_at": session.created_at}
+        return {"session_id": session.id, "started_at": session.started_at}
         
     except Exception as e:
         logger.error(f"Session start error: {str(e)}")
@@ -185,32 +192,41 @@ async def start_practice_session(
 @router.post("/session/end/{session_id}")
 async def end_practice_session(
     session_id: int,
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
-    """Record the end of a practice session"""
+    """End a practice session and return its summary"""
     try:
-        session = record_session_end(db, current_user.id, session_id)
+        summary = await db.run(record_session_end, current_user.id, session_id)
+        if summary is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Practice session not found"
+            )
         
         # Get updated stats
-        updated_stats = get_real_time_stats(db, current_user.id)
+        updated_stats = await db.run(live_stats.get, current_user.id)
         
         # Broadcast session end with updated stats
         await manager.broadcast(json.dumps({
             "type": "session_end",
             "user_id": current_user.id,
             "session_id": session_id,
-            "duration": session.duration,
+            "duration": summary['duration'],
+            "summary": summary,
             "updated_stats": updated_stats
         }))
         
         return {
             "session_id": session_id, 
-            "duration": session.duration,
-            "ended_at": session.updated_at,
+            "duration": summary['duration'],
+            "ended_at": summary['ended_at'],
+            "summary": summary,
             "updated_stats": updated_stats
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Session end error: {str(e)}")
         raise HTTPException(
@@ -220,12 +236,12 @@ async def end_practice_session(
 
 @router.post("/reset")
 async def reset_analytics(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Reset all analytics for the current user."""
     try:
-        num_deleted = reset_user_analytics(db, current_user.id)
+        num_deleted = await db.run(reset_user_analytics, current_user.id)
         logger.info(f"Analytics reset for user {current_user.username}. {num_deleted} activities deleted.")
         
         # Broadcast reset event
@@ -245,13 +261,17 @@ async def reset_analytics(
 
 @router.get("/progress")
 async def get_progress(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get user's progress by chapter"""
     try:
-        chapter_progress_data = get_chapter_progress(db, current_user.id)
-        return {"chapter_progress": chapter_progress_data}
+        async def build():
+            chapter_progress_data = await db.run(get_chapter_progress, current_user.id)
+            return {"chapter_progress": chapter_progress_data}
+        
+        content = await analytics_cache.fetch(db, current_user.id, "progress", (), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Progress error: {str(e)}")
@@ -263,13 +283,17 @@ async def get_progress(
 
 @router.get("/recent")
 async def get_recent_user_activity(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get user's recent activity"""
     try:
-        recent_activity = get_recent_activity(db, current_user.id, limit=50)
-        return {"recent_activity": recent_activity}
+        async def build():
+            recent_activity = await db.run(get_recent_activity, current_user.id, limit=50)
+            return {"recent_activity": recent_activity}
+        
+        content = await analytics_cache.fetch(db, current_user.id, "recent", (), build)
+        return Response(content=content, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Recent activity error: {str(e)}")
@@ -279,14 +303,22 @@ async def get_recent_user_activity(
         )
 
 
+@router.get("/cache-stats")
+async def get_analytics_cache_stats(
+    current_user: UserResponse = Depends(get_current_superuser)
+):
+    """Analytics response cache hit rate and memory, for monitoring. Superusers only."""
+    return analytics_cache.stats()
+
+
 @router.get("/leaderboard")
 async def get_analytics_leaderboard(
-    db: Session = Depends(get_db),
+    db: SessionRunner = Depends(get_session_runner),
     limit: int = 10
 ):
     """Get leaderboard of top performers"""
     try:
-        leaderboard_data = get_leaderboard(db, limit=limit)
+        leaderboard_data = await db.run(get_leaderboard, limit=limit)
         return {"leaderboard": leaderboard_data}
         
     except Exception as e:
@@ -5,14 +5,14 @@ Authentication endpoints
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 from loguru import logger
 
-from app.core.database import get_db
+from app.core.database import SessionRunner, get_session_runner
 from app.core.config import settings
 from app.core.security import create_access_token, verify_token
-from app.crud.user import create_user, authenticate_user, get_user_by_username, get_user_by_email, get_user_by_id, set_user_verification_code
-from app.schemas.schemas import UserCreate, UserLogin, UserResponse, Token, TokenData
+from app.ingest import ActivityWriteError, activity_writer
+from app.crud.user import create_user, authenticate_user, get_user_by_username, get_user_by_email, get_user_by_id, set_user_verification_code, set_user_timezone
+from app.schemas.schemas import UserCreate, UserLogin, UserResponse, Token, TokenData, TimezoneUpdate
 
 router = APIRouter()
 security = HTTPBearer()
@@ -20,7 +20,7 @@ security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ) -> UserResponse:
     """Get current authenticated user"""
     try:
@@ -38,7 +38,7 @@ async def get_current_user(
             detail="Could not validate credentials"
         )
     
-    user = get_user_by_username(db, username=token_data.username)
+    user = await db.run(get_user_by_username, token_data.username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,12 +48,51 @@ async def get_current_user(
     return UserResponse.from_orm(user)
 
 
+async def get_current_user_synced(
+    current_user: UserResponse = Depends(get_current_user)
+) -> UserResponse:
+    """Current user, once all of their queued answer activity is written"""
+    try:
+        await activity_writer.wait_for_user(current_user.id)
+    except ActivityWriteError as e:
+        logger.error(f"Activity write error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Some of your answers could not be saved"
+        )
+    return current_user
+
+
+async def get_current_superuser(
+    current_user: UserResponse = Depends(get_current_user)
+) -> UserResponse:
+    """Current user, who must be a superuser"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+
+async def get_current_teacher(
+    current_user: UserResponse = Depends(get_current_user)
+) -> UserResponse:
+    """Current user, who must be a teacher or a superuser"""
+    if not (current_user.is_teacher or current_user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can manage classes"
+        )
+    return current_user
+
+
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: SessionRunner = Depends(get_session_runner)):
     """Register a new user. Account will be inactive until verified."""
     try:
         # Check if username already exists
-        existing_user = get_user_by_username(db, user.username)
+        existing_user = await db.run(get_user_by_username, user.username)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +100,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Check if email already exists
-        existing_email = get_user_by_email(db, user.email)
+        existing_email = await db.run(get_user_by_email, user.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,13 +108,13 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user (will be inactive by default)
-        db_user = create_user(db, user)
+        db_user = await db.run(create_user, user)
         
         # In a real implementation, you would generate a code and send a verification email.
         # from app.core.security import generate_verification_code
         # from app.services.email import send_verification_email
         # verification_code = generate_verification_code() # e.g., "123456"
-        # set_user_verification_code(db, db_user.id, verification_code)
+        # await db.run(set_user_verification_code, db_user.id, verification_code)
         # await send_verification_email(to_email=db_user.email, code=verification_code)
         logger.info(f"New user '{db_user.username}' registered. Verification needed.")
         logger.info(f"Placeholder: Verification code for {db_user.username} is '123456'")
@@ -93,10 +132,10 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def login(username: str = Form(...), password: str = Form(...), db: SessionRunner = Depends(get_session_runner)):
     """Authenticate user and return access token"""
     try:
-        user = authenticate_user(db, username, password)
+        user = await db.run(authenticate_user, username, password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -139,6 +178,25 @@ async def get_current_user_info(current_user: UserResponse = Depends(get_current
     return current_user
 
 
+@router.put("/me/timezone", response_model=UserResponse)
+async def update_timezone(
+    update: TimezoneUpdate,
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Set the time zone used to group analytics into days"""
+    try:
+        user = await db.run(set_user_timezone, current_user.id, update.timezone)
+        return UserResponse.from_orm(user)
+        
+    except Exception as e:
+        logger.error(f"Timezone update error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update time zone"
+        )
+
+
 @router.post("/logout")
 async def logout(current_user: UserResponse = Depends(get_current_user)):
     """Logout user (client should delete token)"""
@@ -148,7 +206,7 @@ async def logout(current_user: UserResponse = Depends(get_current_user)):
 # --- Placeholder Endpoints for Social Login & Email Verification ---
 
 @router.post("/verify-email")
-async def verify_email_endpoint(code: str = Form(...), db: Session = Depends(get_db)):
+async def verify_email_endpoint(code: str = Form(...), db: SessionRunner = Depends(get_session_runner)):
     """
     Verify a user's email address with a code.
     Placeholder implementation uses a dummy code.
@@ -156,7 +214,7 @@ async def verify_email_endpoint(code: str = Form(...), db: Session = Depends(get
     from app.crud.user import verify_user_by_code
     logger.info(f"Email verification attempt with code: '{code}'.")
     
-    user = verify_user_by_code(db, code)
+    user = await db.run(verify_user_by_code, code)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired verification code.")
 
@@ -0,0 +1,209 @@
+"""
+Cohort (class) management and class analytics endpoints
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from loguru import logger
+from typing import List
+
+from app.core.database import SessionRunner, get_session_runner
+from app.api.auth import get_current_teacher, get_current_user
+from app.crud.cohort import (
+    create_cohort, get_teacher_cohorts, get_student_cohorts, get_cohort_for_teacher,
+    join_cohort, reset_join_code, remove_cohort_member, get_cohort_dashboard
+)
+from app.schemas.schemas import UserResponse, CohortCreate, CohortResponse, CohortJoin, CohortMembershipResponse
+
+router = APIRouter()
+
+
+async def _teacher_cohort(db: SessionRunner, cohort_id: int, user_id: int):
+    cohort = await db.run(get_cohort_for_teacher, cohort_id, user_id)
+    if cohort is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cohort not found"
+        )
+    return cohort
+
+
+@router.post("", response_model=CohortResponse)
+async def create_cohort_endpoint(
+    cohort_data: CohortCreate,
+    current_user: UserResponse = Depends(get_current_teacher),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Create a class taught by the current user, who must be a teacher"""
+    try:
+        cohort = await db.run(create_cohort, current_user.id, cohort_data.name)
+        logger.info(f"Cohort {cohort.id} created by user {current_user.username}")
+        return CohortResponse.model_validate(cohort)
+
+    except Exception as e:
+        logger.error(f"Create cohort error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create cohort"
+        )
+
+
+@router.get("", response_model=List[CohortResponse])
+async def list_cohorts(
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get the classes the current user teaches"""
+    try:
+        cohorts = await db.run(get_teacher_cohorts, current_user.id)
+        return [CohortResponse.model_validate(cohort) for cohort in cohorts]
+
+    except Exception as e:
+        logger.error(f"List cohorts error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get cohorts"
+        )
+
+
+@router.get("/joined", response_model=List[CohortMembershipResponse])
+async def list_joined_cohorts(
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get the classes the current user has joined as a student"""
+    try:
+        cohorts = await db.run(get_student_cohorts, current_user.id)
+        return [CohortMembershipResponse.model_validate(cohort) for cohort in cohorts]
+
+    except Exception as e:
+        logger.error(f"List joined cohorts error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get joined cohorts"
+        )
+
+
+@router.post("/join")
+async def join_cohort_endpoint(
+    join_data: CohortJoin,
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Join the class whose code the teacher shared; history shows on its dashboard after the next refresh"""
+    try:
+        cohort = await db.run(join_cohort, join_data.join_code, current_user.id)
+        if cohort is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No class has this join code"
+            )
+
+        logger.info(f"User {current_user.username} joined cohort {cohort.id}")
+        return {"cohort_id": cohort.id, "name": cohort.name}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Join cohort error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to join cohort"
+        )
+
+
+@router.delete("/{cohort_id}/membership")
+async def leave_cohort(
+    cohort_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Leave a class; the student's answers drop out of its dashboard after the next refresh"""
+    try:
+        if not await db.run(remove_cohort_member, cohort_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Not a member of this class"
+            )
+
+        logger.info(f"User {current_user.username} left cohort {cohort_id}")
+        return {"message": "Left the class successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Leave cohort error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to leave cohort"
+        )
+
+
+@router.post("/{cohort_id}/join-code", response_model=CohortResponse)
+async def reset_cohort_join_code(
+    cohort_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Issue a new join code for a class, e.g. after the old one leaked"""
+    try:
+        await _teacher_cohort(db, cohort_id, current_user.id)
+        cohort = await db.run(reset_join_code, cohort_id)
+        return CohortResponse.model_validate(cohort)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Reset join code error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to reset join code"
+        )
+
+
+@router.delete("/{cohort_id}/members/{user_id}")
+async def remove_member(
+    cohort_id: int,
+    user_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Remove a student from a class"""
+    try:
+        await _teacher_cohort(db, cohort_id, current_user.id)
+        if not await db.run(remove_cohort_member, cohort_id, user_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cohort member not found"
+            )
+
+        return {"message": "Cohort member removed successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Remove cohort member error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to remove cohort member"
+        )
+
+
+@router.get("/{cohort_id}/dashboard")
+async def cohort_dashboard(
+    cohort_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get the precomputed class dashboard: chapter mastery, weakest questions and participation"""
+    try:
+        await _teacher_cohort(db, cohort_id, current_user.id)
+        return await db.run(get_cohort_dashboard, cohort_id)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Cohort dashboard error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get cohort dashboard"
+        )
@@ -2,77 +2,138 @@
 Question and MCQ practice endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from loguru import logger
 import json
+import random
+from datetime import datetime, timezone
 
-from app.core.database import get_db
-from app.api.auth import get_current_user
+from app.catalog import attempted_sets, get_catalog_version
+from app.core.config import settings
+from app.core.database import SessionRunner, get_session_runner, run_db
+from app.api.auth import get_current_user, get_current_user_synced
 from app.models.models import Question
 from app.crud.question import (
     get_question_by_id, 
     get_questions_filtered, 
     get_random_question,
-    get_chapter_summary,
-    get_all_tags,
+    get_practice_set,
+    search_questions,
+    get_catalog_summary,
+    get_tag_counts,
     get_wrongly_answered_question_ids,
     get_attempted_question_ids,
     get_questions_by_ids
 )
-from app.crud.analytics import record_user_activity, create_mark, get_user_marks, remove_mark, get_real_time_stats
+from app.crud.analytics import record_user_activities, get_activities_by_idempotency_keys, create_mark, get_user_marks, remove_mark
 from app.schemas.schemas import (
     UserResponse, 
     QuestionResponse, 
     QuestionPractice, 
     QuestionFilter,
     AnswerSubmission,
+    PracticeSetRequest,
+    PracticeSetResponse,
+    QuestionSearchHit,
+    QuestionSearchResponse,
     AnswerResponse,
+    BatchAnswerRequest,
+    BatchAnswerResponse,
+    BatchAnswerResult,
     MarkCreate,
     MarkResponse
 )
+from app.payloads import question_payloads, practice_view, json_array, json_object
+from app.ingest import activity_writer
+from app.live_stats import live_stats
 from app.ws_manager import manager
 
 router = APIRouter()
 
 
+async def broadcast_stats(user_ids: List[int]) -> None:
+    """Push real-time stats for users whose answers were just written"""
+    for user_id in user_ids:
+        stats = await run_db(live_stats.get, user_id)
+        await manager.broadcast(json.dumps({
+            "type": "stats_update",
+            "user_id": user_id,
+            "data": stats
+        }))
+
+
+activity_writer.add_listener(broadcast_stats)
+
+
+def answer_explanation(question: Question, user_answer: str) -> Optional[str]:
+    """Explanation for the chosen option, falling back to the correct one"""
+    if question.explanations and user_answer in question.explanations:
+        return question.explanations[user_answer]
+    if question.explanations and question.correct_answer in question.explanations:
+        return question.explanations[question.correct_answer]
+    return None
+
+
+async def catalog_cache_headers(
+    request: Request,
+    response: Response,
+    db: SessionRunner = Depends(get_session_runner)
+) -> int:
+    """
+    Conditional-GET support for responses that only change with the catalog.
+    Sets a strong ETag derived from the catalog version plus Cache-Control,
+    and answers ``304 Not Modified`` when ``If-None-Match`` already holds it.
+    """
+    version = await db.run(get_catalog_version)
+    etag = f'"catalog-{version}-{request.app.version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.catalog_cache_max_age}"
+    }
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if "*" in candidates or etag in candidates:
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return version
+
+
 @router.post("/filter")
 async def filter_questions(
     filters: QuestionFilter,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Filter questions based on criteria"""
     try:
-        questions, total_count = get_questions_filtered(db, filters, current_user.id)
-        
-        # Convert to practice format (hide answers and explanations)
-        practice_questions = [
-            QuestionPractice(
-                id=q.id,
-                question_id=q.question_id,
-                question_text=q.question_text,
-                options=q.options,
-                hints=q.hints,
-                chapter_name=q.chapter_name,
-                chapter_number=q.chapter_number,
-                difficulty_level=q.difficulty_level,
-                tags=q.tags
-            )
-            for q in questions
-        ]
+        questions, total_count, next_cursor = await db.run(get_questions_filtered, filters, current_user.id)
         
-        return {
-            "questions": practice_questions,
-            "total_count": total_count,
-            "page_info": {
-                "limit": filters.limit,
-                "offset": filters.offset,
-                "has_more": total_count > (filters.offset + filters.limit)
+        # Practice format (no answers or explanations), spliced from cached JSON
+        version = await db.run(get_catalog_version)
+        content = json_object(
+            "questions",
+            (question_payloads.practice(q, version) for q in questions),
+            {
+                "total_count": total_count,
+                "page_info": {
+                    "limit": filters.limit,
+                    "offset": filters.offset,
+                    "has_more": next_cursor is not None,
+                    "next_cursor": next_cursor
+                }
             }
-        }
+        )
+        return Response(content=content, media_type="application/json")
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Filter questions error: {str(e)}")
         raise HTTPException(
@@ -85,12 +146,12 @@ async def filter_questions(
 async def get_practice_question(
     filters: QuestionFilter,
     exclude_attempted: bool = Query(False, description="Exclude already attempted questions"),
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get a random question for practice based on filters"""
     try:
-        question = get_random_question(db, filters, current_user.id, exclude_attempted)
+        question = await db.run(get_random_question, filters, current_user.id, exclude_attempted)
         
         if not question:
             raise HTTPException(
@@ -99,19 +160,8 @@ async def get_practice_question(
             )
         
         # Return in practice format (hide answer and explanations)
-        practice_question = QuestionPractice(
-            id=question.id,
-            question_id=question.question_id,
-            question_text=question.question_text,
-            options=question.options,
-            hints=question.hints,
-            chapter_name=question.chapter_name,
-            chapter_number=question.chapter_number,
-            difficulty_level=question.difficulty_level,
-            tags=question.tags
-        )
-        
-        return practice_question
+        content = question_payloads.practice(question, await db.run(get_catalog_version))
+        return Response(content=content, media_type="application/json")
         
     except HTTPException:
         raise
@@ -123,16 +173,49 @@ async def get_practice_question(
         )
 
 
+@router.post("/practice_set", response_model=PracticeSetResponse)
+async def get_practice_set_endpoint(
+    request: PracticeSetRequest,
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Get a reproducible deck of distinct practice questions in one call"""
+    try:
+        seed = request.seed if request.seed is not None else random.randrange(2 ** 31)
+        offset = request.filters.offset or 0
+        questions, total_available, next_offset = await db.run(
+            get_practice_set, request.filters, request.size, seed, current_user.id, request.exclude_attempted
+        )
+        
+        practice_questions = [QuestionPractice(**practice_view(q)) for q in questions]
+        
+        return PracticeSetResponse(
+            questions=practice_questions,
+            seed=seed,
+            total_available=total_available,
+            offset=offset,
+            next_offset=next_offset,
+            has_more=next_offset is not None
+        )
+        
+    except Exception as e:
+        logger.error(f"Practice set error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get practice set"
+        )
+
+
 @router.post("/check_answer", response_model=AnswerResponse)
 async def check_answer(
     submission: AnswerSubmission,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Check user's answer and record activity"""
     try:
         # Get the question
-        question = get_question_by_id(db, submission.question_id)
+        question = await db.run(get_question_by_id, submission.question_id)
         if not question:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -142,31 +225,40 @@ async def check_answer(
         # Check if answer is correct
         is_correct = submission.user_answer.lower() == question.correct_answer.lower()
         
-        # Record user activity
-        record_user_activity(db, current_user.id, submission, is_correct)
-
-        # Broadcast real-time stats update
-        stats = get_real_time_stats(db, current_user.id)
-        await manager.broadcast(json.dumps({
-            "type": "stats_update",
+        if submission.next and submission.next.exclude_attempted:
+            # Make the attempted set resident so the queued answer lands in it
+            await db.run(attempted_sets.get, current_user.id)
+        
+        # Queue the activity; the writer broadcasts stats once it is committed
+        await activity_writer.submit({
             "user_id": current_user.id,
-            "data": stats
-        }))
+            "question_id": question.id,
+            "user_answer": submission.user_answer,
+            "is_correct": is_correct,
+            "time_spent": submission.time_spent,
+            "completed_at": datetime.utcnow()
+        })
 
         # Get explanation for the user's answer
-        explanation = None
-        if question.explanations and submission.user_answer in question.explanations:
-            explanation = question.explanations[submission.user_answer]
-        elif question.explanations and question.correct_answer in question.explanations:
-            explanation = question.explanations[question.correct_answer]
+        explanation = answer_explanation(question, submission.user_answer)
         
         logger.info(f"Answer checked for user {current_user.username}: question {question.question_id}, correct: {is_correct}")
         
+        # Pick the next question now so the client skips a /get_question round trip
+        next_question = None
+        if submission.next:
+            upcoming = await db.run(
+                get_random_question, submission.next.filters, current_user.id, submission.next.exclude_attempted
+            )
+            if upcoming:
+                next_question = QuestionPractice(**practice_view(upcoming))
+        
         return AnswerResponse(
             is_correct=is_correct,
             correct_answer=question.correct_answer,
             explanation=explanation,
-            user_answer=submission.user_answer
+            user_answer=submission.user_answer,
+            next_question=next_question
         )
         
     except HTTPException:
@@ -179,16 +271,113 @@ async def check_answer(
         )
 
 
+@router.post("/check_answers", response_model=BatchAnswerResponse)
+async def check_answers(
+    batch: BatchAnswerRequest,
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """
+    Grade and record a batch of answers collected offline.
+    Answers whose idempotency key was already recorded are reported as
+    duplicates and not written again; results keep the submitted order.
+    """
+    try:
+        answers = batch.answers
+        questions = {
+            question.id: question
+            for question in await db.run(get_questions_by_ids, list({answer.question_id for answer in answers}))
+            if question.is_active
+        }
+        recorded_before = await db.run(
+            get_activities_by_idempotency_keys, current_user.id, list({answer.idempotency_key for answer in answers})
+        )
+        
+        now = datetime.utcnow()
+        results = []
+        records = []
+        # Outcome per idempotency key, from earlier uploads or earlier in this batch
+        outcomes = {key: activity.is_correct for key, activity in recorded_before.items()}
+        for answer in answers:
+            question = questions.get(answer.question_id)
+            if question is None:
+                results.append(BatchAnswerResult(
+                    idempotency_key=answer.idempotency_key,
+                    question_id=answer.question_id,
+                    status="not_found",
+                    user_answer=answer.user_answer
+                ))
+                continue
+            
+            duplicate = answer.idempotency_key in outcomes
+            if duplicate:
+                is_correct = outcomes[answer.idempotency_key]
+            else:
+                is_correct = answer.user_answer.lower() == question.correct_answer.lower()
+                outcomes[answer.idempotency_key] = is_correct
+
+                # Trust the client clock for when it was answered, but never a future time
+                answered_at = answer.answered_at or now
+                if answered_at.tzinfo is not None:
+                    answered_at = answered_at.astimezone(timezone.utc).replace(tzinfo=None)
+                records.append({
+                    "user_id": current_user.id,
+                    "question_id": question.id,
+                    "user_answer": answer.user_answer,
+                    "is_correct": is_correct,
+                    "time_spent": answer.time_spent,
+                    "completed_at": min(answered_at, now),
+                    "idempotency_key": answer.idempotency_key
+                })
+            
+            results.append(BatchAnswerResult(
+                idempotency_key=answer.idempotency_key,
+                question_id=answer.question_id,
+                status="duplicate" if duplicate else "recorded",
+                is_correct=is_correct,
+                correct_answer=question.correct_answer,
+                explanation=answer_explanation(question, answer.user_answer),
+                user_answer=answer.user_answer
+            ))
+        
+        # One transaction for the whole batch, then one stats update
+        if records:
+            await db.run(record_user_activities, records)
+            await broadcast_stats([current_user.id])
+        
+        logger.info(f"Batch of {len(answers)} answers from user {current_user.username}: {len(records)} recorded")
+        
+        return BatchAnswerResponse(
+            results=results,
+            recorded=len(records),
+            duplicates=sum(1 for result in results if result.status == "duplicate")
+        )
+        
+    except IntegrityError:
+        # A concurrent upload recorded some of these keys first; a retry sees them as duplicates.
+        # The session inside db.run has already rolled back.
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Answers were submitted concurrently, please retry"
+        )
+    except Exception as e:
+        logger.error(f"Check answers error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to check answers"
+        )
+
+
 @router.post("/mark", response_model=MarkResponse)
 async def mark_question(
     mark_data: MarkCreate,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Mark/bookmark a question for review"""
     try:
         # Verify question exists
-        question = get_question_by_id(db, mark_data.question_id)
+        question = await db.run(get_question_by_id, mark_data.question_id)
         if not question:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -196,7 +385,7 @@ async def mark_question(
             )
         
         # Create mark
-        mark = create_mark(db, current_user.id, mark_data.question_id, mark_data.mark_type, mark_data.notes)
+        mark = await db.run(create_mark, current_user.id, mark_data.question_id, mark_data.mark_type, mark_data.notes)
         
         logger.info(f"Question marked by user {current_user.username}: question {mark_data.question_id}")
         
@@ -216,11 +405,11 @@ async def mark_question(
 async def get_marks(
     mark_type: Optional[str] = Query(None, description="Filter by mark type"),
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get user's bookmarked questions"""
     try:
-        marks = get_user_marks(db, current_user.id, mark_type)
+        marks = await db.run(get_user_marks, current_user.id, mark_type)
         return [MarkResponse.from_orm(mark) for mark in marks]
         
     except Exception as e:
@@ -235,11 +424,11 @@ async def get_marks(
 async def remove_mark_endpoint(
     mark_id: int,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Remove a bookmark"""
     try:
-        success = remove_mark(db, current_user.id, mark_id)
+        success = await db.run(remove_mark, current_user.id, mark_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -259,15 +448,13 @@ async def remove_mark_endpoint(
 
 
 @router.get("/chapters")
-async def get_chapters(db: Session = Depends(get_db)):
+async def get_chapters(
+    db: SessionRunner = Depends(get_session_runner),
+    _version: int = Depends(catalog_cache_headers)
+):
     """Get summary of all chapters"""
     try:
-        # Simple test query first
-        total_questions = db.query(Question).filter(Question.is_active == True).count()
-        logger.info(f"Total questions in DB: {total_questions}")
-        
-        chapters = get_chapter_summary(db)
-        logger.info(f"Chapters retrieved: {len(chapters)}")
+        chapters = (await db.run(get_catalog_summary))["chapters"]
         return {"chapters": chapters}
         
     except Exception as e:
@@ -280,12 +467,51 @@ async def get_chapters(db: Session = Depends(get_db)):
         )
 
 
+@router.get("/search", response_model=QuestionSearchResponse)
+async def search_questions_endpoint(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; end a word with * for a prefix match"),
+    chapter_numbers: Optional[List[int]] = Query(None),
+    difficulty_levels: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: UserResponse = Depends(get_current_user),
+    db: SessionRunner = Depends(get_session_runner)
+):
+    """Full-text search over questions, options, explanations and tags"""
+    try:
+        hits = await db.run(search_questions, q, chapter_numbers, difficulty_levels, limit, offset)
+        
+        results = [
+            QuestionSearchHit(
+                question=QuestionPractice(**practice_view(question)),
+                rank=rank,
+                snippet=snippet or ""
+            )
+            for question, rank, snippet in hits
+        ]
+        
+        return QuestionSearchResponse(query=q, results=results, limit=limit, offset=offset)
+        
+    except Exception as e:
+        logger.error(f"Search questions error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search questions"
+        )
+
+
 @router.get("/tags")
-async def get_tags(db: Session = Depends(get_db)):
-    """Get all available tags"""
+async def get_tags(
+    db: SessionRunner = Depends(get_session_runner),
+    _version: int = Depends(catalog_cache_headers)
+):
+    """Get all available tags with their question counts"""
     try:
-        tags = get_all_tags(db)
-        return {"tags": tags}
+        tag_counts = await db.run(get_tag_counts)
+        return {
+            "tags": [row["tag"] for row in tag_counts],
+            "counts": {row["tag"]: row["count"] for row in tag_counts}
+        }
         
     except Exception as e:
         logger.error(f"Get tags error: {str(e)}")
@@ -295,10 +521,13 @@ async def get_tags(db: Session = Depends(get_db)):
         )
         
 @router.get("/topics")
-async def get_topics(db: Session = Depends(get_db)):
+async def get_topics(
+    db: SessionRunner = Depends(get_session_runner),
+    _version: int = Depends(catalog_cache_headers)
+):
     """Use chapters as topics"""
     try:
-        chapters = get_chapter_summary(db)
+        chapters = (await db.run(get_catalog_summary))["chapters"]
         topics = [
             {
                 "name": f"Chapter {chap['chapter_number']}: {chap['chapter_name']}",
@@ -313,10 +542,13 @@ async def get_topics(db: Session = Depends(get_db)):
 
 
 @router.get("/count")
-async def get_questions_count(db: Session = Depends(get_db)):
+async def get_questions_count(
+    db: SessionRunner = Depends(get_session_runner),
+    _version: int = Depends(catalog_cache_headers)
+):
     """Get the total number of active questions."""
     try:
-        count = db.query(Question).filter(Question.is_active == True).count()
+        count = (await db.run(get_catalog_summary))["total_questions"]
         return {"total_count": count}
     except Exception as e:
         logger.error(f"Get questions count error: {str(e)}")
@@ -325,16 +557,16 @@ async def get_questions_count(db: Session = Depends(get_db)):
             detail="Failed to get question count"
         )
 
-@router.get("/review/wrong", response_model=List[QuestionResponse])
+@router.get("/review/wrong", responses={200: {"model": List[QuestionResponse]}})
 async def get_wrong_questions_for_review(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get all questions the user has answered incorrectly."""
     try:
-        question_ids = get_wrongly_answered_question_ids(db, current_user.id)
-        questions = get_questions_by_ids(db, question_ids)
-        return questions
+        question_ids = await db.run(get_wrongly_answered_question_ids, current_user.id)
+        payloads = await db.run(question_payloads.full_by_ids, question_ids, await db.run(get_catalog_version))
+        return Response(content=json_array(payloads), media_type="application/json")
     except Exception as e:
         logger.error(f"Get wrong questions error: {str(e)}")
         raise HTTPException(
@@ -342,16 +574,16 @@ async def get_wrong_questions_for_review(
             detail="Failed to get questions for review"
         )
 
-@router.get("/review/attempted", response_model=List[QuestionResponse])
+@router.get("/review/attempted", responses={200: {"model": List[QuestionResponse]}})
 async def get_attempted_questions_for_review(
-    current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserResponse = Depends(get_current_user_synced),
+    db: SessionRunner = Depends(get_session_runner)
 ):
     """Get all questions the user has attempted."""
     try:
-        question_ids = get_attempted_question_ids(db, current_user.id)
-        questions = get_questions_by_ids(db, question_ids)
-        return questions
+        question_ids = await db.run(get_attempted_question_ids, current_user.id)
+        payloads = await db.run(question_payloads.full_by_ids, question_ids, await db.run(get_catalog_version))
+        return Response(content=json_array(payloads), media_type="application/json")
     except Exception as e:
         logger.error(f"Get attempted questions error: {str(e)}")
         raise HTTPException(
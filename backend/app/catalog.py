@@ -0,0 +1,601 @@
+"""
+In-memory question catalog with bitmap filter indexes
+
+Active questions are loaded once into compact slotted records. Every filterable
+attribute (chapter, difficulty, type, tag) keeps a bitmap where bit ``i`` is set
+when the question with primary key ``i`` matches, so a filtered random pick is a
+bitmap intersection plus one sample instead of a full query over ``questions``.
+
+The catalog reloads itself whenever the version stored in ``catalog_state``
+changes. Each load builds a new ``CatalogSnapshot`` and publishes it with a
+single assignment, so a request that takes the snapshot once never mixes the
+entries of one version with the indexes of another. Anything that adds, edits or deactivates questions (``create_question``,
+the import scripts, ``deactivate_question``) must call ``bump_catalog_version``.
+
+Bumping the version also materializes the new version's summary counts into
+``catalog_summary`` in the writer's own transaction, so readers never write.
+
+``AttemptedSets`` keeps an LRU of per-user attempted-question bitsets over the
+same id space, so ``exclude_attempted`` sampling is "filter AND NOT attempted".
+"""
+
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import CatalogState, CatalogSummary, Question, QuestionTag, UserQuestionState
+from app.schemas.schemas import QuestionFilter
+
+# Rejection-sampling attempts before falling back to the full bitmap select
+SAMPLE_ATTEMPTS = 32
+
+# Maximum number of filter signatures whose results are kept
+MAX_CACHED_FILTERS = 256
+
+
+def get_catalog_version(db: Session) -> int:
+    """Get the current question catalog version (0 if never bumped)"""
+    version = db.query(CatalogState.version).filter(CatalogState.id == 1).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Mark the question catalog as changed and store its summary (committed by the caller)"""
+    updated = db.query(CatalogState).filter(CatalogState.id == 1).update(
+        {CatalogState.version: CatalogState.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(CatalogState(id=1, version=1))
+    db.flush()
+    _store_catalog_summary(db, get_catalog_version(db))
+
+
+def _store_catalog_summary(db: Session, version: int) -> None:
+    """Replace the materialized summary rows with counts over the active questions"""
+    active = Question.is_active == True
+
+    def level_count(level: str):
+        return func.sum(case((Question.difficulty_level == level, 1), else_=0))
+
+    rows = [CatalogSummary(
+        catalog_version=version, dimension='total', key='active',
+        total_questions=db.query(func.count(Question.id)).filter(active).scalar()
+    )]
+    rows += [
+        CatalogSummary(
+            catalog_version=version, dimension='chapter', key=str(row.chapter_number), label=row.chapter_name,
+            total_questions=row.total, easy_questions=row.easy, medium_questions=row.medium, hard_questions=row.hard
+        )
+        for row in db.query(
+            Question.chapter_number,
+            func.min(Question.chapter_name).label('chapter_name'),
+            func.count(Question.id).label('total'),
+            level_count('Easy').label('easy'),
+            level_count('Medium').label('medium'),
+            level_count('Hard').label('hard')
+        ).filter(active).group_by(Question.chapter_number)
+    ]
+    rows += [
+        CatalogSummary(catalog_version=version, dimension='difficulty', key=level, total_questions=count)
+        for level, count in db.query(Question.difficulty_level, func.count(Question.id)).filter(
+            active
+        ).group_by(Question.difficulty_level)
+    ]
+    rows += [
+        CatalogSummary(catalog_version=version, dimension='tag', key=tag, total_questions=count)
+        for tag, count in db.query(QuestionTag.tag, func.count(QuestionTag.question_id)).join(
+            Question, Question.id == QuestionTag.question_id
+        ).filter(active).group_by(QuestionTag.tag)
+    ]
+    db.query(CatalogSummary).filter(CatalogSummary.catalog_version != version).delete(synchronize_session=False)
+    db.add_all(rows)
+    db.flush()
+
+
+class Bitset:
+    """Growable bitset over question ids with O(1) add and membership"""
+
+    __slots__ = ("_bytes", "_bits")
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._bytes = bytearray()
+        self._bits: Optional[int] = None
+        for question_id in ids:
+            self.add(question_id)
+
+    def add(self, question_id: int) -> None:
+        index = question_id >> 3
+        if index >= len(self._bytes):
+            self._bytes.extend(bytes(index - len(self._bytes) + 1))
+        self._bytes[index] |= 1 << (question_id & 7)
+        self._bits = None
+
+    def __contains__(self, question_id: int) -> bool:
+        index = question_id >> 3
+        return index < len(self._bytes) and bool(self._bytes[index] >> (question_id & 7) & 1)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    @property
+    def bits(self) -> int:
+        """The bitset as a Python int, suitable for bitmap intersections"""
+        if self._bits is None:
+            self._bits = int.from_bytes(self._bytes, "little")
+        return self._bits
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bytes)
+
+
+def _bitmap(ids: Iterable[int], size: int) -> int:
+    """Build an int bitmap from question ids in O(len(ids))"""
+    buffer = bytearray((size >> 3) + 1)
+    for question_id in ids:
+        buffer[question_id >> 3] |= 1 << (question_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _nth_set_bit(bits: int, n: int) -> int:
+    """Position of the n-th (0-based) set bit, by halving on popcounts"""
+    offset = 0
+    width = bits.bit_length()
+    while width > 64:
+        half = width >> 1
+        low = bits & ((1 << half) - 1)
+        count = low.bit_count()
+        if n < count:
+            bits = low
+            width = half
+        else:
+            n -= count
+            bits >>= half
+            offset += half
+            width -= half
+    while n:
+        bits &= bits - 1
+        n -= 1
+    return offset + (bits & -bits).bit_length() - 1
+
+
+class CatalogEntry:
+    """Compact view of an active question (no JSON payloads)"""
+
+    __slots__ = (
+        "id", "question_id", "chapter_number", "chapter_name",
+        "difficulty_level", "question_type", "tags"
+    )
+
+    def __init__(self, id, question_id, chapter_number, chapter_name,
+                 difficulty_level, question_type, tags):
+        self.id = id
+        self.question_id = question_id
+        self.chapter_number = chapter_number
+        self.chapter_name = chapter_name
+        self.difficulty_level = difficulty_level
+        self.question_type = question_type
+        self.tags = frozenset(tags or ())
+
+
+class CatalogSnapshot:
+    """
+    Entries and bitmap indexes of one catalog version. Never changed after it
+    is built, apart from its memo of filter results, so readers that hold one
+    snapshot see a consistent catalog however many reloads happen meanwhile.
+    """
+
+    def __init__(self, rows: Iterable[tuple] = (), version: Optional[int] = None):
+        """Build from ``(id, question_id, chapter_number, chapter_name,
+        difficulty_level, question_type, tags)`` rows"""
+        entries: Dict[int, CatalogEntry] = {}
+        postings: Dict[Tuple[str, object], List[int]] = {}
+        for row in rows:
+            entry = CatalogEntry(*row)
+            entries[entry.id] = entry
+            postings.setdefault(("chapter", entry.chapter_number), []).append(entry.id)
+            postings.setdefault(("difficulty", entry.difficulty_level), []).append(entry.id)
+            postings.setdefault(("type", entry.question_type), []).append(entry.id)
+            for tag in entry.tags:
+                postings.setdefault(("tag", tag), []).append(entry.id)
+
+        ids = list(entries)
+        size = max(ids, default=0)
+        indexes = {"chapter": {}, "difficulty": {}, "type": {}, "tag": {}}
+        for (dimension, key), members in postings.items():
+            indexes[dimension][key] = _bitmap(members, size)
+
+        self.version = version
+        self.entries = entries
+        self.ids = ids
+        self.active = _bitmap(ids, size)
+        self.by_chapter: Dict[int, int] = indexes["chapter"]
+        self.by_difficulty: Dict[str, int] = indexes["difficulty"]
+        self.by_type: Dict[str, int] = indexes["type"]
+        self.by_tag: Dict[str, int] = indexes["tag"]
+        self._postings = postings
+        self._filter_cache: Dict[tuple, list] = {}
+        self._cache_lock = threading.Lock()
+
+    def build_summary(self) -> dict:
+        """Per-chapter, per-difficulty and per-tag counts from the bitmaps"""
+        chapters = []
+        for number in sorted(self.by_chapter):
+            bits = self.by_chapter[number]
+            first_id = self._postings[("chapter", number)][0]
+            chapters.append({
+                'chapter_number': number,
+                'chapter_name': self.entries[first_id].chapter_name,
+                'total_questions': bits.bit_count(),
+                'easy_questions': (bits & self.by_difficulty.get('Easy', 0)).bit_count(),
+                'medium_questions': (bits & self.by_difficulty.get('Medium', 0)).bit_count(),
+                'hard_questions': (bits & self.by_difficulty.get('Hard', 0)).bit_count()
+            })
+        return {
+            'catalog_version': self.version,
+            'total_questions': len(self.ids),
+            'chapters': chapters,
+            'difficulties': {
+                level: bits.bit_count() for level, bits in sorted(self.by_difficulty.items())
+            },
+            'tags': {tag: bits.bit_count() for tag, bits in sorted(self.by_tag.items())}
+        }
+
+    @staticmethod
+    def signature(filters: QuestionFilter) -> tuple:
+        """Hashable, order-independent key for the filterable fields"""
+        return (
+            tuple(sorted(set(filters.chapter_numbers or ()))),
+            tuple(sorted(set(filters.difficulty_levels or ()))),
+            tuple(sorted(set(filters.question_types or ()))),
+            tuple(sorted(set(filters.tags or ()))),
+            filters.tag_match
+        )
+
+    def filter_bitmap(self, filters: QuestionFilter) -> int:
+        """Bitmap of active questions matching the filters"""
+        return self._cached(filters)[0]
+
+    def _cached(self, filters: QuestionFilter) -> list:
+        """``[bitmap, member ids or None]`` for the filter signature"""
+        key = self.signature(filters)
+        with self._cache_lock:
+            cached = self._filter_cache.get(key)
+        if cached is not None:
+            return cached
+
+        chapters, difficulties, types, tags, tag_match = key
+        bits = self.active
+        for values, index in (
+            (chapters, self.by_chapter),
+            (difficulties, self.by_difficulty),
+            (types, self.by_type)
+        ):
+            if values:
+                union = 0
+                for value in values:
+                    union |= index.get(value, 0)
+                bits &= union
+        if tags and tag_match == "any":
+            union = 0
+            for tag in tags:
+                union |= self.by_tag.get(tag, 0)
+            bits &= union
+        else:
+            for tag in tags:
+                bits &= self.by_tag.get(tag, 0)
+
+        with self._cache_lock:
+            cached = self._filter_cache.get(key)
+            if cached is None:
+                if len(self._filter_cache) >= MAX_CACHED_FILTERS:
+                    self._filter_cache.pop(next(iter(self._filter_cache)), None)
+                cached = self._filter_cache[key] = [bits, None]
+        return cached
+
+    def members(self, filters: QuestionFilter) -> List[int]:
+        """Ascending ids of active questions matching the filters"""
+        cached = self._cached(filters)
+        if cached[1] is None:
+            cached[1] = [
+                question_id for question_id in self._driver(filters)
+                if self.matches(self.entries[question_id], filters)
+            ]
+        return cached[1]
+
+    def count(self, filters: QuestionFilter) -> int:
+        """Number of active questions matching the filters"""
+        return self.filter_bitmap(filters).bit_count()
+
+    def matches(self, entry: CatalogEntry, filters: QuestionFilter) -> bool:
+        """Check a single entry against the filters"""
+        if filters.chapter_numbers and entry.chapter_number not in filters.chapter_numbers:
+            return False
+        if filters.difficulty_levels and entry.difficulty_level not in filters.difficulty_levels:
+            return False
+        if filters.question_types and entry.question_type not in filters.question_types:
+            return False
+        if filters.tags:
+            if filters.tag_match == "any":
+                return not entry.tags.isdisjoint(filters.tags)
+            return entry.tags.issuperset(filters.tags)
+        return True
+
+    def _driver(self, filters: QuestionFilter) -> List[int]:
+        """Smallest single-valued posting list that every match must belong to"""
+        driver = self.ids
+        for dimension, values in (
+            ("chapter", filters.chapter_numbers),
+            ("difficulty", filters.difficulty_levels),
+            ("type", filters.question_types)
+        ):
+            if values and len(set(values)) == 1:
+                members = self._postings.get((dimension, values[0]), [])
+                if len(members) < len(driver):
+                    driver = members
+        tags = set(filters.tags or ())
+        if filters.tag_match == "any" and len(tags) > 1:
+            tags = ()
+        for tag in tags:
+            members = self._postings.get(("tag", tag), [])
+            if len(members) < len(driver):
+                driver = members
+        return driver
+
+    def sample(
+        self,
+        filters: QuestionFilter,
+        exclude: Optional[Bitset] = None,
+        rng: random.Random = random
+    ) -> Optional[int]:
+        """Pick a uniformly random matching question id, skipping ``exclude``
+
+        Broad filters are served by rejection sampling from the smallest posting
+        list, which is O(1) regardless of catalog size. Narrow filters fall back
+        to intersecting the bitmaps and selecting a random set bit.
+        """
+        # A failed round means the filter is narrow relative to its driver list,
+        # so switch to (and keep using) the exact member list for that signature
+        with self._cache_lock:
+            cached = self._filter_cache.get(self.signature(filters))
+        rounds = [(None, False)]
+        if cached is None or cached[1] is None:
+            rounds.insert(0, (self._driver(filters), True))
+
+        for candidates, check in rounds:
+            if candidates is None:
+                candidates = self.members(filters)
+            if not candidates:
+                return None
+            for _ in range(SAMPLE_ATTEMPTS):
+                entry = self.entries[candidates[rng.randrange(len(candidates))]]
+                if check and not self.matches(entry, filters):
+                    continue
+                if exclude is None or entry.id not in exclude:
+                    return entry.id
+
+        bits = self.filter_bitmap(filters)
+        if exclude is not None:
+            bits &= ~exclude.bits
+        count = bits.bit_count()
+        if not count:
+            return None
+        return _nth_set_bit(bits, rng.randrange(count))
+
+    def deck(
+        self,
+        filters: QuestionFilter,
+        seed: int,
+        start: int,
+        size: int,
+        exclude: Optional[Bitset] = None
+    ) -> Tuple[List[int], int, Optional[int]]:
+        """Up to ``size`` ids from position ``start`` of the seeded shuffle of matching question ids
+
+        Uses a lazy Fisher-Yates shuffle, so the same seed and filters always
+        give the same order and only the positions up to the last pick are
+        swapped. Positions count every matching question, ``exclude``d or not,
+        so answering questions from one page never shifts the next page; the
+        excluded ones are skipped. Returns the ids, the number of candidates
+        not excluded, and the position to continue from (None when no
+        candidate is left).
+        """
+        candidates = self.members(filters)
+        count = len(candidates)
+        total = count if exclude is None else sum(1 for question_id in candidates if question_id not in exclude)
+
+        rng = random.Random(seed)
+        swapped: Dict[int, int] = {}
+        picked = []
+        seen = 0  # candidates not excluded before ``position``
+        position = 0
+        while position < count and len(picked) < size:
+            other = rng.randrange(position, count)
+            chosen = swapped.get(other, candidates[other])
+            swapped[other] = swapped.get(position, candidates[position])
+            position += 1
+            if exclude is not None and chosen in exclude:
+                continue
+            seen += 1
+            if position > start:
+                picked.append(chosen)
+        return picked, total, position if total > seen else None
+
+
+class QuestionCatalog:
+    """
+    Process-wide catalog of active questions. A reload builds a new
+    ``CatalogSnapshot`` and publishes it with one assignment; readers take
+    ``snapshot`` once (``ensure_fresh`` returns it) and use only that.
+    """
+
+    def __init__(self):
+        self.snapshot = CatalogSnapshot()
+        self._loading: Optional[int] = None  # version being loaded, if any
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        return self.snapshot.version
+
+    @property
+    def entries(self) -> Dict[int, CatalogEntry]:
+        return self.snapshot.entries
+
+    signature = staticmethod(CatalogSnapshot.signature)
+
+    def ensure_fresh(self, db: Session) -> CatalogSnapshot:
+        """
+        Reload the catalog if the stored catalog version has moved on, and
+        return the snapshot to read. Only one request loads a version; the
+        others keep serving the current snapshot meanwhile instead of waiting,
+        which on the async engine would block the event loop the loader needs.
+        """
+        version = get_catalog_version(db)
+        snapshot = self.snapshot
+        if version == snapshot.version:
+            return snapshot
+        with self._lock:
+            snapshot = self.snapshot
+            if snapshot.version is not None and (
+                version < snapshot.version or (self._loading is not None and self._loading >= version)
+            ):
+                return snapshot
+            self._loading = version
+        try:
+            self.load(db, version)
+        finally:
+            with self._lock:
+                if self._loading == version:
+                    self._loading = None
+        return self.snapshot
+
+    def load(self, db: Session, version: int) -> None:
+        """Load all active questions from the database"""
+        # Query before taking the lock: on the async engine the query yields to
+        # the event loop, and another request blocking on the lock would stall it
+        rows = db.query(
+            Question.id,
+            Question.question_id,
+            Question.chapter_number,
+            Question.chapter_name,
+            Question.difficulty_level,
+            Question.question_type,
+            Question.tags
+        ).filter(Question.is_active == True).order_by(Question.id).all()
+        if self.build(rows, version):
+            logger.info(f"Question catalog v{version} loaded: {len(rows)} active questions")
+
+    def build(self, rows: Iterable[tuple], version: int) -> bool:
+        """Build a snapshot from question rows and publish it unless a newer one is in place"""
+        snapshot = CatalogSnapshot(rows, version)
+        with self._lock:
+            if self.snapshot.version is not None and version < self.snapshot.version:
+                return False
+            self.snapshot = snapshot
+        return True
+
+    def clear(self) -> None:
+        """Forget the loaded catalog; the next ``ensure_fresh`` reloads it"""
+        self.snapshot = CatalogSnapshot()
+
+    # Each call reads one snapshot throughout
+    def build_summary(self) -> dict:
+        return self.snapshot.build_summary()
+
+    def filter_bitmap(self, filters: QuestionFilter) -> int:
+        return self.snapshot.filter_bitmap(filters)
+
+    def members(self, filters: QuestionFilter) -> List[int]:
+        return self.snapshot.members(filters)
+
+    def count(self, filters: QuestionFilter) -> int:
+        return self.snapshot.count(filters)
+
+    def sample(self, filters: QuestionFilter, exclude: Optional[Bitset] = None,
+               rng: random.Random = random) -> Optional[int]:
+        return self.snapshot.sample(filters, exclude, rng)
+
+    def deck(self, filters: QuestionFilter, seed: int, start: int, size: int,
+             exclude: Optional[Bitset] = None) -> Tuple[List[int], int, Optional[int]]:
+        return self.snapshot.deck(filters, seed, start, size, exclude)
+
+
+class AttemptedSets:
+    """LRU of per-user attempted-question bitsets
+
+    A user's set is rebuilt from ``user_question_state`` the first time it is needed
+    and then kept current as answers are recorded or queued. Sets for users that are
+    not resident are simply rebuilt on their next use. Attempts added while a set
+    is loading are kept and applied to it before it is stored.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._sets: "OrderedDict[int, Bitset]" = OrderedDict()
+        self._loading: Dict[int, List[List[int]]] = {}  # user -> attempts added during each load
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> Bitset:
+        """Get the user's attempted bitset, loading it if not resident"""
+        with self._lock:
+            attempted = self._sets.get(user_id)
+            if attempted is not None:
+                self._sets.move_to_end(user_id)
+                return attempted
+            added: List[int] = []
+            self._loading.setdefault(user_id, []).append(added)
+
+        rows = db.query(UserQuestionState.question_id).filter(
+            UserQuestionState.user_id == user_id
+        ).all()
+        attempted = Bitset(question_id for question_id, in rows)
+
+        with self._lock:
+            loads = self._loading.get(user_id, [])
+            current = any(load is added for load in loads)
+            if current:
+                loads[:] = [load for load in loads if load is not added]
+                if not loads:
+                    del self._loading[user_id]
+            for question_id in added:
+                attempted.add(question_id)
+            if not current:
+                return attempted  # discarded while loading: this snapshot may predate it
+            resident = self._sets.get(user_id)
+            if resident is not None:
+                self._sets.move_to_end(user_id)
+                return resident
+            self._sets[user_id] = attempted
+            while len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+        return attempted
+
+    def add(self, user_id: int, question_id: int) -> None:
+        """Record an attempt if the user's set is resident or loading"""
+        with self._lock:
+            attempted = self._sets.get(user_id)
+            if attempted is not None:
+                attempted.add(question_id)
+            for added in self._loading.get(user_id, ()):
+                added.append(question_id)
+
+    def discard(self, user_id: int) -> None:
+        """Drop the user's set, e.g. after their analytics are reset"""
+        with self._lock:
+            self._sets.pop(user_id, None)
+            self._loading.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+
+catalog = QuestionCatalog()
+attempted_sets = AttemptedSets(settings.attempted_cache_users)
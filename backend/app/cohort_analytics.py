@@ -0,0 +1,67 @@
+"""
+Background refresh of class (cohort) analytics
+
+``CohortAnalytics`` wakes every ``cohort_refresh_interval_s`` seconds and runs
+``refresh_cohort_analytics`` until the queue of committed answers is empty,
+one batch per transaction, so a class dashboard is at most about one interval
+behind the answers. Dashboard reads never wait for it: they read
+the row the last pass rendered.
+"""
+
+import asyncio
+from typing import Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.cohort import refresh_cohort_analytics
+
+
+class CohortAnalytics:
+    """Periodic, incremental refresh of the class aggregate tables"""
+
+    def __init__(self, interval_s: int, batch_size: int):
+        self.interval = interval_s
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the periodic refresh task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                folded = await asyncio.to_thread(self._refresh_once)
+                if folded:
+                    logger.info(f"Cohort analytics folded in {folded} answers")
+            except Exception as e:
+                logger.error(f"Cohort analytics refresh error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def _refresh_once(self) -> int:
+        """Catch the class aggregates up with the queued answers"""
+        db = SessionLocal()
+        try:
+            folded = 0
+            while True:
+                advanced = refresh_cohort_analytics(db, self.batch_size)
+                folded += advanced
+                if advanced < self.batch_size:
+                    return folded
+        finally:
+            db.close()
+
+
+cohort_analytics = CohortAnalytics(settings.cohort_refresh_interval_s, settings.cohort_refresh_batch_size)
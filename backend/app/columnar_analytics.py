@@ -0,0 +1,180 @@
+"""
+Vectorized per-user analytics reports
+
+Selected with ``ANALYTICS_ENGINE=numpy``. The SQL implementation in
+``app.crud.analytics`` runs one grouped query per breakdown; this engine reads
+a user's answers in the window once, as column arrays (question index,
+correctness, time spent, completed-at epoch, chapter and difficulty codes),
+and derives every breakdown from them with ``bincount``. Local days and hours
+come from shifting the epochs by the UTC offset in force, found with
+``searchsorted`` over the zone's daylight-saving periods.
+
+Grouped rows are handed to the same report builder the SQL path uses, so the
+output is identical, ties included, down to the hourly accuracy curve, the
+moving average, the time-spent percentiles and the improvement slope.
+NumPy is optional: without it ``get_detailed_analytics`` stays on SQL.
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any, Dict, List
+
+from loguru import logger
+from sqlalchemy import BigInteger, and_, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.analytics_reports import detailed_report, session_totals, trend, user_zone, utc_offsets, window_start
+from app.catalog import catalog
+from app.models.models import Question, UserActivity
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logger.warning("NumPy is not installed; ANALYTICS_ENGINE=numpy falls back to SQL")
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 24 * SECONDS_PER_HOUR
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+DayRow = namedtuple("DayRow", "day total correct time_spent")
+ChapterRow = namedtuple("ChapterRow", "chapter_name total correct")
+DifficultyRow = namedtuple("DifficultyRow", "difficulty_level total")
+HourRow = namedtuple("HourRow", "hour total correct")
+TimeRow = namedtuple("TimeRow", "time_spent total")
+
+
+class UserColumns:
+    """One user's answers in a window as parallel arrays, in activity id order"""
+
+    __slots__ = (
+        "question", "correct", "time_spent", "timed", "epoch", "chapter", "difficulty",
+        "chapter_names", "difficulty_names", "local_day", "hour"
+    )
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+
+def _epoch_seconds(db: Session, column):
+    """Whole seconds since the Unix epoch; local days and hours change on whole seconds"""
+    if db.get_bind().dialect.name == 'postgresql':
+        return cast(func.floor(func.extract('epoch', column)), BigInteger)
+    return cast(func.strftime('%s', column), BigInteger)
+
+
+def _codes(names: List[str], index: "np.ndarray") -> tuple:
+    """Integer code per element of ``index`` into ``names``, with the distinct names"""
+    distinct = {name: code for code, name in enumerate(dict.fromkeys(names))}
+    lookup = np.array([distinct[name] for name in names], dtype=np.int32)
+    return lookup[index], list(distinct)
+
+
+def load_user_columns(db: Session, user_id: int, zone: tzinfo, start: datetime) -> UserColumns:
+    """Read the user's answers completed since naive UTC ``start`` into column arrays"""
+    rows = db.connection().execute(select(
+        UserActivity.question_id,
+        case((UserActivity.is_correct == True, 1), else_=0),
+        func.coalesce(UserActivity.time_spent, 0),
+        case((UserActivity.time_spent.is_(None), 0), else_=1),
+        _epoch_seconds(db, UserActivity.completed_at)
+    ).where(
+        and_(
+            UserActivity.user_id == user_id,
+            UserActivity.completed_at >= start
+        )
+    ).order_by(UserActivity.id)).fetchall()
+    question_ids, correct, time_spent, timed, epoch = zip(*rows) if rows else ((), (), (), (), ())
+
+    columns = UserColumns()
+    questions, columns.question = np.unique(np.array(question_ids, dtype=np.int64), return_inverse=True)
+    columns.correct = np.array(correct, dtype=np.int64)
+    columns.time_spent = np.array(time_spent, dtype=np.int64)
+    columns.timed = np.array(timed, dtype=bool)
+    columns.epoch = np.array(epoch, dtype=np.int64)
+
+    # Chapter and difficulty per distinct question, from the catalog where possible
+    entries = catalog.ensure_fresh(db).entries
+    metadata = {}
+    for question_id in questions.tolist():
+        entry = entries.get(question_id)
+        if entry is not None:
+            metadata[question_id] = (entry.chapter_name, entry.difficulty_level)
+    missing = [question_id for question_id in questions.tolist() if question_id not in metadata]
+    if missing:
+        for question_id, chapter_name, difficulty_level in db.query(
+            Question.id, Question.chapter_name, Question.difficulty_level
+        ).filter(Question.id.in_(missing)):
+            metadata[question_id] = (chapter_name, difficulty_level)
+    chapters = [metadata[question_id][0] for question_id in questions.tolist()]
+    difficulties = [metadata[question_id][1] for question_id in questions.tolist()]
+    columns.chapter, columns.chapter_names = _codes(chapters, columns.question)
+    columns.difficulty, columns.difficulty_names = _codes(difficulties, columns.question)
+
+    # Local wall-clock time: add the offset in force at each answer
+    periods = utc_offsets(zone, start, datetime.utcnow())
+    changes = np.array([int((changed_at - UNIX_EPOCH).total_seconds()) for changed_at, _ in periods])
+    offsets = np.array([minutes * 60 for _, minutes in periods], dtype=np.int64)
+    period = np.maximum(np.searchsorted(changes, columns.epoch, side="right") - 1, 0)
+    local = columns.epoch + offsets[period]
+    columns.local_day = local // SECONDS_PER_DAY
+    columns.hour = (local // SECONDS_PER_HOUR) % 24
+    return columns
+
+
+def _groups(codes: "np.ndarray", *weights: "np.ndarray") -> tuple:
+    """
+    Distinct codes in first-seen order with the count and the sum of each
+    ``weights`` array per code
+    """
+    distinct, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    sums = [np.bincount(inverse, minlength=len(distinct))]
+    sums += [np.bincount(inverse, weights=weight, minlength=len(distinct)).astype(np.int64) for weight in weights]
+    return (distinct[order].tolist(), *(values[order].tolist() for values in sums))
+
+
+def _day_rows(columns: UserColumns) -> List[DayRow]:
+    days, totals, correct, time_spent = _groups(columns.local_day, columns.correct, columns.time_spent)
+    rows = [
+        DayRow(date(1970, 1, 1) + timedelta(days=day), total, right, seconds)
+        for day, total, right, seconds in zip(days, totals, correct, time_spent)
+    ]
+    return sorted(rows, key=lambda row: row.day)
+
+
+def _window(db: Session, user_id: int, days: int) -> tuple:
+    """Naive UTC start of the user's ``days``-day window and their answers in it"""
+    zone = user_zone(db, user_id)
+    start = window_start(datetime.now(zone).date(), days, zone)
+    return start, load_user_columns(db, user_id, zone, start)
+
+
+def performance_trends(db: Session, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
+    """``get_performance_trends`` computed from the user's answers"""
+    _, columns = _window(db, user_id, days)
+    return [trend(row) for row in _day_rows(columns)]
+
+
+def detailed_analytics(db: Session, user_id: int, days: int = 30) -> Dict[str, Any]:
+    """``get_detailed_analytics`` computed from the user's answers"""
+    start, columns = _window(db, user_id, days)
+    if not len(columns):
+        return detailed_report(days, [], [], [], [], [], (0, 0))
+
+    codes, totals, correct = _groups(columns.chapter, columns.correct)
+    chapter_rows = [
+        ChapterRow(columns.chapter_names[code], total, right)
+        for code, total, right in zip(codes, totals, correct)
+    ]
+    codes, totals = _groups(columns.difficulty)
+    difficulty_rows = [DifficultyRow(columns.difficulty_names[code], total) for code, total in zip(codes, totals)]
+    hours, totals, correct = _groups(columns.hour, columns.correct)
+    hourly_rows = [HourRow(hour, total, right) for hour, total, right in zip(hours, totals, correct)]
+    seconds, totals = _groups(columns.time_spent[columns.timed])
+    time_rows = [TimeRow(value, total) for value, total in zip(seconds, totals)]
+
+    return detailed_report(
+        days, _day_rows(columns), chapter_rows, difficulty_rows, hourly_rows, time_rows,
+        session_totals(db, user_id, start)
+    )
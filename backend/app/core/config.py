@@ -15,6 +15,7 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = f"sqlite:///{PROJECT_ROOT / 'backend' / 'data' / 'edutheo.db'}"
+    async_database: bool = False  # serve API routes through the aiosqlite/asyncpg engine
     
     # Security
     secret_key: str = "your-secret-key-change-in-production"
@@ -30,6 +31,27 @@ class Settings(BaseSettings):
     # Environment
     environment: str = "development"
     
+    # Caching
+    attempted_cache_users: int = 10000  # users whose attempted-question bitsets stay resident
+    question_payload_cache_size: int = 50000  # questions whose encoded JSON payloads stay resident
+    catalog_cache_max_age: int = 300  # seconds clients may reuse catalog responses before revalidating
+    live_stats_cache_users: int = 10000  # users whose real-time stats counters stay resident
+    live_stats_reconcile_interval_s: int = 300  # how often changed live stats are checked against the database
+    analytics_cache_entries: int = 20000  # encoded analytics responses kept resident
+    analytics_cache_ttl_s: int = 60  # seconds an analytics response may be served from cache
+    
+    # Analytics
+    analytics_engine: str = "sql"  # "sql" or "numpy" (vectorized per-user reports, needs NumPy)
+    practice_session_idle_timeout_s: int = 1800  # answers after this long without one start outside the open session
+    cohort_refresh_interval_s: int = 60  # how often class dashboards fold in new answers
+    cohort_refresh_batch_size: int = 50000  # queued answers folded in by one refresh transaction
+    
+    # Answer ingestion (write-behind)
+    activity_batch_size: int = 500  # records per INSERT batch
+    activity_flush_interval_ms: int = 50  # longest a record waits before its batch is written
+    activity_queue_size: int = 10000  # queued records before check_answer waits for room
+    activity_dead_letter_path: str = "logs/activity_dead_letters.jsonl"  # records that could not be written
+    
     # Import data source
     source_mcq_file: str = "../raw_data/9th_physics_mcqs.json"
 
@@ -2,11 +2,17 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
 
+T = TypeVar("T")
+
 # SQLite configuration with thread safety
 connect_args = {"check_same_thread": False}
 if "sqlite" in settings.database_url:
@@ -28,6 +34,35 @@ SessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+# Drivers the async engine uses for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """The same database addressed through its asyncio driver"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.async_database:
+    async_engine = create_async_engine(
+        async_database_url(settings.database_url),
+        echo=settings.environment == "development"
+    )
+    # Objects are used after commit outside the session's greenlet, so never expire them
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -37,9 +72,106 @@ def get_db():
         db.close()
 
 
+class SessionRunner:
+    """
+    Database access for ``async def`` routes that never blocks the event loop.
+    ``await db.run(fn, *args)`` calls ``fn(session, *args)`` with a regular
+    ``Session``, so the CRUD modules serve both engines: with
+    ``async_database`` on it goes through ``AsyncSession.run_sync`` on the
+    aiosqlite/asyncpg engine, otherwise it runs in the thread pool.
+
+    Every call gets a session of its own that is closed when ``fn`` returns,
+    so no connection is held while the route awaits something else. Returned
+    objects stay readable because sessions here never expire on commit.
+    """
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            session_factory = AsyncSessionLocal if AsyncSessionLocal is not None else SessionLocal
+        self.session_factory = session_factory
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if isinstance(self.session_factory, async_sessionmaker):
+            async with self.session_factory() as session:
+                return await session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(self._run_sync, fn, *args, **kwargs)
+
+    def _run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self.session_factory(expire_on_commit=False) as session:
+            return fn(session, *args, **kwargs)
+
+
+def get_session_runner() -> SessionRunner:
+    """Dependency to get non-blocking database access"""
+    return SessionRunner()
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run ``fn(session, *args)`` off the event loop"""
+    return await SessionRunner().run(fn, *args, **kwargs)
+
+
 def init_db():
     """Initialize database with tables"""
     Base.metadata.create_all(bind=engine)
+    init_search_index(engine)
+
+
+# FTS5 index over the text of active questions. The rowid is questions.id,
+# chapter and difficulty ride along unindexed so filtered searches never join
+# back to questions, and triggers keep it in sync with every write.
+_FTS_COLUMNS = "rowid, question_text, options, explanations, tags, chapter_number, difficulty_level"
+
+_FTS_SELECT = """SELECT
+        {row}.id,
+        {row}.question_text,
+        (SELECT group_concat(value, ' ') FROM json_each({row}.options)),
+        (SELECT group_concat(value, ' ') FROM json_each({row}.explanations)),
+        (SELECT group_concat(value, ' ') FROM json_each({row}.tags)),
+        {row}.chapter_number,
+        {row}.difficulty_level"""
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        question_text, options, explanations, tags,
+        chapter_number UNINDEXED, difficulty_level UNINDEXED,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions
+    WHEN NEW.is_active BEGIN
+        INSERT INTO questions_fts ({_FTS_COLUMNS}) {_FTS_SELECT.format(row="NEW")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF
+        question_text, options, explanations, tags, chapter_number, difficulty_level, is_active
+    ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = OLD.id;
+        INSERT INTO questions_fts ({_FTS_COLUMNS}) {_FTS_SELECT.format(row="NEW")} WHERE NEW.is_active;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+        DELETE FROM questions_fts WHERE rowid = OLD.id;
+    END""",
+]
+
+SEARCH_INDEX_BACKFILL = f"""
+    INSERT INTO questions_fts ({_FTS_COLUMNS})
+    {_FTS_SELECT.format(row="q")}
+    FROM questions q
+    WHERE q.is_active
+"""
+
+
+def init_search_index(bind) -> None:
+    """Create the SQLite full-text search index and its triggers if missing"""
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_fts'"
+        )).first()
+        for statement in SEARCH_INDEX_DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(SEARCH_INDEX_BACKFILL))
     
     
 def enable_wal_mode():
@@ -3,11 +3,24 @@ CRUD operations for UserActivity and analytics
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc, case
-from app.models.models import UserActivity, Question, Mark
+from sqlalchemy import and_, func, desc, case, insert, update, bindparam, select, literal, cast, union_all, Integer, String
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.models import (
+    User, UserActivity, UserQuestionState, UserStatsSummary, UserStatsCounter, UserDailyActivity, Question, Mark,
+    CatalogState, PracticeSession, PracticeSessionChapter, Cohort, CohortMember, CohortRefreshQueue
+)
 from app.schemas.schemas import AnswerSubmission
+from app.catalog import attempted_sets
+from app.crud.question import get_catalog_summary
+from app.live_stats import _utc_naive, live_stats
+from app.streaks import STREAK_COLUMNS, Streaks
+from app.analytics_cache import analytics_cache
+from app.analytics_reports import (
+    detailed_report, local_time, session_totals, time_zone, trend, user_zone, utc_offsets, window_start
+)
+from app.core.config import settings
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta, timezone, tzinfo
 
 
 def record_user_activity(
@@ -17,94 +30,405 @@ def record_user_activity(
     is_correct: bool
 ) -> UserActivity:
     """Record user's answer submission"""
-    # Check if this is a repeat attempt
-    existing_activity = db.query(UserActivity).filter(
-        and_(
-            UserActivity.user_id == user_id,
-            UserActivity.question_id == submission.question_id
+    activity_ids = record_user_activities(db, [{
+        'user_id': user_id,
+        'question_id': submission.question_id,
+        'user_answer': submission.user_answer,
+        'is_correct': is_correct,
+        'time_spent': submission.time_spent,
+        'completed_at': datetime.utcnow()
+    }])
+    return db.get(UserActivity, activity_ids[0])
+
+
+def _upsert(db: Session, model, index_elements: list, increments: List[str], replace: List[str] = ()):
+    """
+    ``INSERT .. ON CONFLICT`` for the session's dialect that adds the
+    ``increments`` columns to an existing row and overwrites ``replace``
+    """
+    upsert = postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert
+    stmt = upsert(model)
+    set_ = {name: getattr(model, name) + getattr(stmt.excluded, name) for name in increments}
+    set_.update({name: getattr(stmt.excluded, name) for name in replace})
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+
+def _local_hour(db: Session, column, zone: tzinfo, start: datetime, end: datetime):
+    """SQL hour of day of the UTC ``column`` in ``zone``, exact for times between ``start`` and ``end``"""
+    if db.get_bind().dialect.name == 'postgresql':
+        return func.extract('hour', func.timezone(getattr(zone, 'key', 'UTC'), column))
+
+    # SQLite has no time zones: shift by the offset in force at each moment
+    periods = utc_offsets(zone, start, end)
+    modifiers = [f"{minutes:+d} minutes" for _, minutes in periods]
+    modifier = literal(modifiers[0])
+    if len(periods) > 1:
+        modifier = case(
+            *((column < changed_at, earlier) for (changed_at, _), earlier in zip(periods[1:], modifiers)),
+            else_=modifiers[-1]
         )
-    ).first()
-    
-    attempt_number = 1
-    if existing_activity:
-        # Get the highest attempt number for this user-question pair
-        max_attempt = db.query(func.max(UserActivity.attempt_number)).filter(
-            and_(
-                UserActivity.user_id == user_id,
-                UserActivity.question_id == submission.question_id
-            )
-        ).scalar() or 0
-        attempt_number = max_attempt + 1
-    
-    activity = UserActivity(
-        user_id=user_id,
-        question_id=submission.question_id,
-        user_answer=submission.user_answer,
-        is_correct=is_correct,
-        time_spent=submission.time_spent,
-        attempt_number=attempt_number,
-        completed_at=datetime.utcnow()
+    return cast(func.strftime('%H', column, modifier), Integer)
+
+
+def get_analytics_version(db: Session, user_id: int) -> tuple:
+    """
+    What a user's analytics depend on besides the request: their last activity
+    id, the catalog version and their local date. One round trip.
+    """
+    row = db.execute(select(
+        select(UserStatsSummary.last_activity_id).where(UserStatsSummary.user_id == user_id).scalar_subquery(),
+        select(CatalogState.version).where(CatalogState.id == 1).scalar_subquery(),
+        select(User.timezone).where(User.id == user_id).scalar_subquery()
+    )).one()
+    last_activity_id, catalog_version, timezone_name = row
+    return last_activity_id or 0, catalog_version or 0, datetime.now(time_zone(timezone_name)).date().isoformat()
+
+
+def _add_to_day(days: Dict[tuple, Dict[str, Any]], user_id: int, day: date,
+                correct: int, time_spent: int, first_correct: int) -> None:
+    row = days.get((user_id, day))
+    if row is None:
+        row = days[(user_id, day)] = {
+            'user_id': user_id, 'day': day, 'total': 0, 'correct': 0,
+            'time_spent': 0, 'first_attempt_correct': 0
+        }
+    row['total'] += 1
+    row['correct'] += correct
+    row['time_spent'] += time_spent
+    row['first_attempt_correct'] += first_correct
+
+
+def _state_upsert(db: Session):
+    return _upsert(
+        db, UserQuestionState,
+        [UserQuestionState.user_id, UserQuestionState.question_id],
+        ['attempt_count'], ['last_correct']
+    ).returning(UserQuestionState.user_id, UserQuestionState.question_id, UserQuestionState.attempt_count)
+
+
+def _update_stats_rollups(db: Session, rows: List[Dict[str, Any]], activity_ids: List[int]) -> None:
+    """
+    Add freshly inserted activities to ``user_stats_summary`` (streaks
+    included), ``user_stats_counters``, ``user_daily_activity`` and the
+    counters of the practice sessions they were stamped with, and queue them
+    for the class aggregates
+    """
+    questions = {
+        row.id: row for row in db.query(
+            Question.id, Question.chapter_number, Question.chapter_name, Question.difficulty_level
+        ).filter(Question.id.in_({row['question_id'] for row in rows}))
+    }
+    zones = {
+        row.id: time_zone(row.timezone) for row in db.query(User.id, User.timezone).filter(
+            User.id.in_({row['user_id'] for row in rows})
+        )
+    }
+    # Streaks advance from the stored state; lock it until the batch commits
+    streaks = {
+        row.user_id: Streaks.from_row(row) for row in db.query(
+            UserStatsSummary.user_id, *(getattr(UserStatsSummary, name) for name in STREAK_COLUMNS)
+        ).filter(UserStatsSummary.user_id.in_(zones)).with_for_update()
+    }
+    recount = set()  # users with a back-dated practice day
+
+    summaries: Dict[int, Dict[str, Any]] = {}
+    counters: Dict[tuple, Dict[str, Any]] = {}
+    days: Dict[tuple, Dict[str, Any]] = {}
+    sessions: Dict[int, Dict[str, Any]] = {}
+    session_chapters: Dict[tuple, Dict[str, Any]] = {}
+    queued: List[Dict[str, Any]] = []
+    for row, activity_id in zip(rows, activity_ids):
+        user_id = row['user_id']
+        correct = 1 if row['is_correct'] else 0
+        first_attempt = row['attempt_number'] == 1
+
+        summary = summaries.get(user_id)
+        if summary is None:
+            summary = summaries[user_id] = {
+                'user_id': user_id, 'questions_attempted': 0, 'first_correct': 0,
+                'total_attempts': 0, 'total_time': 0, 'last_activity_id': 0
+            }
+        summary['total_attempts'] += 1
+        summary['total_time'] += row['time_spent'] or 0
+        summary['last_activity_id'] = activity_id
+        if first_attempt:
+            summary['questions_attempted'] += 1
+            summary['first_correct'] += correct
+
+        streak = streaks.setdefault(user_id, Streaks())
+        streak.answer(correct)
+        day = None
+        if row['completed_at'] is not None:
+            day = local_time(row['completed_at'], zones.get(user_id, timezone.utc)).date()
+            _add_to_day(days, user_id, day, correct, row['time_spent'] or 0, correct if first_attempt else 0)
+            if not streak.practice(day):
+                recount.add(user_id)
+
+        question = questions[row['question_id']]
+        queued.append({
+            'activity_id': activity_id, 'user_id': user_id, 'question_id': row['question_id'],
+            'chapter_number': question.chapter_number, 'day': day
+        })
+        for dimension, key, label in (
+            ('chapter', str(question.chapter_number), question.chapter_name),
+            ('difficulty', question.difficulty_level, None)
+        ):
+            counter = counters.get((user_id, dimension, key))
+            if counter is None:
+                counter = counters[(user_id, dimension, key)] = {
+                    'user_id': user_id, 'dimension': dimension, 'key': key,
+                    'label': label, 'attempts': 0, 'correct': 0
+                }
+            counter['attempts'] += 1
+            counter['correct'] += correct
+
+        session_id = row.get('session_id')
+        if session_id is not None:
+            _add_to_session(sessions, session_chapters, session_id, question.chapter_number, row, correct)
+
+    conn = db.connection()
+    if days:
+        conn.execute(_upsert(
+            db, UserDailyActivity, [UserDailyActivity.user_id, UserDailyActivity.day],
+            ['total', 'correct', 'time_spent', 'first_attempt_correct']
+        ), list(days.values()))
+    if recount:
+        _recount_daily_streaks(db, {user_id: streaks[user_id] for user_id in recount})
+
+    for user_id, summary in summaries.items():
+        summary.update(streaks[user_id].values())
+    conn.execute(_upsert(
+        db, UserStatsSummary, [UserStatsSummary.user_id],
+        ['questions_attempted', 'first_correct', 'total_attempts', 'total_time'],
+        ['last_activity_id', *STREAK_COLUMNS]
+    ), list(summaries.values()))
+    conn.execute(_upsert(
+        db, UserStatsCounter,
+        [UserStatsCounter.user_id, UserStatsCounter.dimension, UserStatsCounter.key],
+        ['attempts', 'correct'], ['label']
+    ), list(counters.values()))
+    if sessions:
+        _update_session_counters(db, sessions, session_chapters)
+    conn.execute(insert(CohortRefreshQueue), queued)
+
+
+def _open_sessions(db: Session, user_ids) -> Dict[int, list]:
+    """``user id -> [session id, started at, last answer at]`` of each user's open practice session"""
+    open_sessions = {}
+    for row in db.query(
+        PracticeSession.id, PracticeSession.user_id, PracticeSession.started_at, PracticeSession.last_activity_at
+    ).filter(
+        PracticeSession.user_id.in_(user_ids),
+        PracticeSession.ended_at.is_(None)
+    ).order_by(PracticeSession.started_at):
+        started_at = _utc_naive(row.started_at)
+        open_sessions[row.user_id] = [row.id, started_at, _utc_naive(row.last_activity_at) or started_at]
+    return open_sessions
+
+
+def _stamp_sessions(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Set ``session_id`` on each row: the user's open practice session when the
+    answer was completed after it started and within the idle timeout of the
+    session's previous answer, otherwise None
+    """
+    open_sessions = _open_sessions(db, {row['user_id'] for row in rows})
+    idle = timedelta(seconds=settings.practice_session_idle_timeout_s)
+    for row in rows:
+        row['session_id'] = None
+        session = open_sessions.get(row['user_id'])
+        completed_at = row['completed_at']
+        if session is None or completed_at is None or completed_at < session[1] or completed_at - session[2] > idle:
+            continue
+        row['session_id'] = session[0]
+        session[2] = max(session[2], completed_at)
+
+
+def _add_to_session(sessions: Dict[int, Dict[str, Any]], session_chapters: Dict[tuple, Dict[str, Any]],
+                    session_id: int, chapter_number: int, row: Dict[str, Any], correct: int) -> None:
+    session = sessions.get(session_id)
+    if session is None:
+        session = sessions[session_id] = {
+            'key_id': session_id, 'add_answered': 0, 'add_correct': 0, 'add_time': 0,
+            'last_at': row['completed_at']
+        }
+    session['add_answered'] += 1
+    session['add_correct'] += correct
+    session['add_time'] += row['time_spent'] or 0
+    session['last_at'] = max(session['last_at'], row['completed_at'])
+
+    chapter = session_chapters.get((session_id, chapter_number))
+    if chapter is None:
+        chapter = session_chapters[(session_id, chapter_number)] = {
+            'session_id': session_id, 'chapter_number': chapter_number, 'answered': 0, 'correct': 0
+        }
+    chapter['answered'] += 1
+    chapter['correct'] += correct
+
+
+def _update_session_counters(db: Session, sessions: Dict[int, Dict[str, Any]],
+                             session_chapters: Dict[tuple, Dict[str, Any]]) -> None:
+    conn = db.connection()
+    conn.execute(_upsert(
+        db, PracticeSessionChapter, [PracticeSessionChapter.session_id, PracticeSessionChapter.chapter_number],
+        ['answered', 'correct']
+    ), list(session_chapters.values()))
+
+    practice = PracticeSession.__table__
+    chapters = PracticeSessionChapter.__table__
+    last_at = bindparam('last_at')
+    conn.execute(
+        practice.update().where(practice.c.id == bindparam('key_id')).values(
+            answered=practice.c.answered + bindparam('add_answered'),
+            correct=practice.c.correct + bindparam('add_correct'),
+            time_spent=practice.c.time_spent + bindparam('add_time'),
+            last_activity_at=case((practice.c.last_activity_at > last_at, practice.c.last_activity_at), else_=last_at),
+            chapters_touched=select(func.count()).where(chapters.c.session_id == practice.c.id).scalar_subquery()
+        ),
+        list(sessions.values())
     )
-    
-    db.add(activity)
+
+
+def _recount_daily_streaks(db: Session, streaks: Dict[int, Streaks]) -> None:
+    """Recount the users' daily streaks from their ``user_daily_activity`` rows"""
+    days: Dict[int, List[date]] = {user_id: [] for user_id in streaks}
+    for user_id, day in db.query(UserDailyActivity.user_id, UserDailyActivity.day).filter(
+        UserDailyActivity.user_id.in_(streaks)
+    ).order_by(UserDailyActivity.user_id, UserDailyActivity.day):
+        days[user_id].append(day)
+    for user_id, streak in streaks.items():
+        streak.recount_days(days[user_id])
+
+
+def record_user_activities(db: Session, records: List[Dict[str, Any]]) -> List[int]:
+    """
+    Record a batch of answer submissions in one transaction and return the new
+    activity ids in record order.
+    Each record holds ``user_id``, ``question_id``, ``user_answer``,
+    ``is_correct``, ``time_spent`` and ``completed_at``. Attempt numbers come
+    from upserting ``user_question_state`` first, so no query over
+    ``user_activities`` is needed. Answers are stamped with the user's open
+    practice session, and the per-user stats rollups and session counters
+    are updated in the same transaction.
+    """
+    if not records:
+        return []
+
+    # Collapse the batch to one state change per (user, question)
+    changes: Dict[tuple, Dict[str, Any]] = {}
+    for record in records:
+        key = (record['user_id'], record['question_id'])
+        change = changes.get(key)
+        if change is None:
+            change = changes[key] = {
+                'user_id': record['user_id'],
+                'question_id': record['question_id'],
+                'attempt_count': 0,
+                'first_correct': record['is_correct'],
+                'last_correct': None
+            }
+        change['attempt_count'] += 1
+        change['last_correct'] = record['is_correct']
+
+    conn = db.connection()
+    next_attempt = {}
+    for user_id, question_id, attempt_count in conn.execute(_state_upsert(db), list(changes.values())):
+        key = (user_id, question_id)
+        next_attempt[key] = attempt_count - changes[key]['attempt_count'] + 1
+
+    rows = []
+    for record in records:
+        key = (record['user_id'], record['question_id'])
+        rows.append({**record, 'attempt_number': next_attempt[key]})
+        next_attempt[key] += 1
+    _stamp_sessions(db, rows)
+
+    activity_ids = [
+        activity_id for activity_id, in conn.execute(
+            insert(UserActivity).returning(UserActivity.id, sort_by_parameter_order=True), rows
+        )
+    ]
+
+    # Point each state row at its first and latest activity
+    first_ids, last_ids = {}, {}
+    for record, activity_id in zip(records, activity_ids):
+        key = (record['user_id'], record['question_id'])
+        first_ids.setdefault(key, activity_id)
+        last_ids[key] = activity_id
+
+    state = UserQuestionState.__table__
+    conn.execute(
+        state.update().where(and_(
+            state.c.user_id == bindparam('key_user_id'),
+            state.c.question_id == bindparam('key_question_id')
+        )).values(
+            first_activity_id=func.coalesce(state.c.first_activity_id, bindparam('first_id')),
+            last_activity_id=bindparam('last_id')
+        ),
+        [
+            {'key_user_id': key[0], 'key_question_id': key[1], 'first_id': first_ids[key], 'last_id': last_ids[key]}
+            for key in changes
+        ]
+    )
+    _update_stats_rollups(db, rows, activity_ids)
     db.commit()
-    db.refresh(activity)
-    return activity
+
+    for record in records:
+        attempted_sets.add(record['user_id'], record['question_id'])
+    live_stats.apply(
+        {**row, 'id': activity_id} for row, activity_id in zip(rows, activity_ids)
+    )
+    analytics_cache.invalidate(record['user_id'] for record in records)
+    return activity_ids
+
+
+def get_activities_by_idempotency_keys(db: Session, user_id: int, keys: List[str]) -> Dict[str, UserActivity]:
+    """Map already-recorded idempotency keys of the user to their activity"""
+    if not keys:
+        return {}
+    activities = db.query(UserActivity).filter(
+        UserActivity.user_id == user_id,
+        UserActivity.idempotency_key.in_(keys)
+    ).all()
+    return {activity.idempotency_key: activity for activity in activities}
 
 
 def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
     """
     Get comprehensive user statistics.
     Accuracy-related stats are based on the user's first attempt at each question.
+    Served from the ``user_stats_summary`` and ``user_stats_counters`` rollups.
     """
-    # Subquery to get the ID of the first attempt for each unique question by the user
-    first_attempt_sq = db.query(
-        UserActivity.question_id,
-        func.min(UserActivity.id).label('first_activity_id')
-    ).filter(UserActivity.user_id == user_id).group_by(UserActivity.question_id).subquery()
-
-    # Query to get the actual first attempt records
-    first_activities_query = db.query(UserActivity).join(
-        first_attempt_sq, UserActivity.id == first_attempt_sq.c.first_activity_id
-    )
+    summary = db.query(
+        UserStatsSummary.questions_attempted,
+        UserStatsSummary.first_correct,
+        UserStatsSummary.total_attempts,
+        UserStatsSummary.total_time,
+        *(getattr(UserStatsSummary, name) for name in STREAK_COLUMNS)
+    ).filter(UserStatsSummary.user_id == user_id).first()
+    today = datetime.now(user_zone(db, user_id)).date()
+    return _user_stats(summary, _user_counters(db, user_id), today)
 
-    # Total unique questions attempted
-    total_questions_attempted = first_activities_query.count()
-    
-    # Correct answers on the first attempt
-    correct_answers = first_activities_query.filter(UserActivity.is_correct == True).count()
-    
-    # Total time spent across ALL attempts (not just first)
-    total_time = db.query(func.sum(UserActivity.time_spent)).filter(
-        UserActivity.user_id == user_id,
-        UserActivity.time_spent.isnot(None)
-    ).scalar() or 0
-    
-    # Total number of activities (all attempts)
-    total_activities_all_attempts = db.query(UserActivity).filter(UserActivity.user_id == user_id).count()
 
-    # Questions by difficulty (based on all attempts)
-    difficulty_stats = db.query(
-        Question.difficulty_level,
-        func.count(UserActivity.id).label('count')
-    ).join(UserActivity).filter(
-        UserActivity.user_id == user_id
-    ).group_by(Question.difficulty_level).all()
+def _user_stats(summary, counters: list, today: date) -> Dict[str, Any]:
+    """
+    ``get_user_stats`` output from a summary row (or None), sorted counter rows
+    and the user's local date
+    """
+    # Total unique questions attempted and correct answers on the first attempt
+    total_questions_attempted = summary.questions_attempted if summary else 0
+    correct_answers = summary.first_correct if summary else 0
     
-    # Questions by chapter (based on all attempts)
-    chapter_stats = db.query(
-        Question.chapter_number,
-        Question.chapter_name,
-        func.count(UserActivity.id).label('count')
-    ).join(UserActivity).filter(
-        UserActivity.user_id == user_id
-    ).group_by(Question.chapter_number, Question.chapter_name).all()
+    # Total time and number of activities across ALL attempts (not just first)
+    total_time = summary.total_time if summary else 0
+    total_activities_all_attempts = summary.total_attempts if summary else 0
     
     # Accuracy based on first attempts
     accuracy = (correct_answers / total_questions_attempted * 100) if total_questions_attempted > 0 else 0
     # Average time based on all attempts
     avg_time = (total_time / total_activities_all_attempts) if total_activities_all_attempts > 0 else 0
     
+    # Questions by difficulty and by chapter (based on all attempts)
     return {
         'total_questions_attempted': total_questions_attempted,
         'correct_answers': correct_answers,
@@ -112,50 +436,56 @@ def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
         'total_time_spent': total_time,
         'average_time_per_question': round(avg_time, 2),
         'questions_by_difficulty': {
-            row.difficulty_level: row.count for row in difficulty_stats
+            row.key: row.attempts for row in counters if row.dimension == 'difficulty'
         },
         'questions_by_chapter': {
-            f"Ch{row.chapter_number}: {row.chapter_name}": row.count 
-            for row in chapter_stats
-        }
+            f"Ch{row.key}: {row.label}": row.attempts
+            for row in counters if row.dimension == 'chapter'
+        },
+        'streaks': Streaks.from_row(summary).payload(today)
     }
 
 
+def _sort_counters(rows: list) -> list:
+    return sorted(rows, key=lambda row: (row.dimension, int(row.key) if row.dimension == 'chapter' else row.key))
+
+
+def _user_counters(db: Session, user_id: int) -> list:
+    """The user's chapter and difficulty counter rows, chapters in number order"""
+    rows = db.query(
+        UserStatsCounter.dimension,
+        UserStatsCounter.key,
+        UserStatsCounter.label,
+        UserStatsCounter.attempts,
+        UserStatsCounter.correct
+    ).filter(UserStatsCounter.user_id == user_id).all()
+    return _sort_counters(rows)
+
+
 def get_chapter_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
     """Get user's progress by chapter"""
-    # Get total questions per chapter
-    chapter_totals = db.query(
-        Question.chapter_number,
-        Question.chapter_name,
-        func.count(Question.id).label('total_questions')
-    ).filter(Question.is_active == True).group_by(
-        Question.chapter_number, Question.chapter_name
-    ).all()
-    
-    # Get user's attempts per chapter
-    user_attempts = db.query(
-        Question.chapter_number,
-        func.count(UserActivity.id).label('attempted'),
-        func.sum(case((UserActivity.is_correct == True, 1), else_=0)).label('correct')
-    ).join(UserActivity).filter(
-        UserActivity.user_id == user_id
-    ).group_by(Question.chapter_number).all()
-    
-    # Combine data
-    attempts_dict = {row.chapter_number: row for row in user_attempts}
+    # Total questions per chapter come from the materialized catalog summary
+    # and the user's attempts per chapter from the counter rollups
+    return _chapter_progress(get_catalog_summary(db)['chapters'], _user_counters(db, user_id))
+
+
+def _chapter_progress(chapter_totals: List[Dict[str, Any]], counters: list) -> List[Dict[str, Any]]:
+    attempts_dict = {
+        int(row.key): row for row in counters if row.dimension == 'chapter'
+    }
     
     progress = []
     for chapter in chapter_totals:
-        attempt_data = attempts_dict.get(chapter.chapter_number)
-        attempted = attempt_data.attempted if attempt_data else 0
+        attempt_data = attempts_dict.get(chapter['chapter_number'])
+        attempted = attempt_data.attempts if attempt_data else 0
         correct = attempt_data.correct if attempt_data else 0
         
         accuracy = (correct / attempted * 100) if attempted > 0 else 0
         
         progress.append({
-            'chapter_number': chapter.chapter_number,
-            'chapter_name': chapter.chapter_name,
-            'total_questions': chapter.total_questions,
+            'chapter_number': chapter['chapter_number'],
+            'chapter_name': chapter['chapter_name'],
+            'total_questions': chapter['total_questions'],
             'attempted_questions': attempted,
             'correct_answers': correct,
             'accuracy_percentage': round(accuracy, 2)
@@ -164,26 +494,129 @@ def get_chapter_progress(db: Session, user_id: int) -> List[Dict[str, Any]]:
     return progress
 
 
+def _recent_activity_query(db: Session, user_id: int, limit: int):
+    """The user's latest answers with the question columns the dashboard shows"""
+    return db.query(
+        UserActivity.user_answer,
+        UserActivity.is_correct,
+        UserActivity.time_spent,
+        UserActivity.completed_at,
+        Question.question_id,
+        Question.question_text,
+        Question.chapter_name,
+        Question.difficulty_level
+    ).join(Question, Question.id == UserActivity.question_id).filter(
+        UserActivity.user_id == user_id
+    ).order_by(desc(UserActivity.completed_at)).limit(limit)
+
+
+def _recent_item(row) -> Dict[str, Any]:
+    return {
+        'question_id': row.question_id,
+        'question_text': row.question_text[:100] + "..." if len(row.question_text) > 100 else row.question_text,
+        'chapter_name': row.chapter_name,
+        'difficulty_level': row.difficulty_level,
+        'user_answer': row.user_answer,
+        'is_correct': row.is_correct,
+        'time_spent': row.time_spent,
+        'completed_at': row.completed_at.isoformat() if row.completed_at else None
+    }
+
+
 def get_recent_activity(db: Session, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Get user's recent activity"""
-    activities = db.query(UserActivity, Question).join(Question).filter(
-        UserActivity.user_id == user_id
-    ).order_by(desc(UserActivity.completed_at)).limit(limit).all()
-    
-    result = []
-    for activity, question in activities:
-        result.append({
-            'question_id': question.question_id,
-            'question_text': question.question_text[:100] + "..." if len(question.question_text) > 100 else question.question_text,
-            'chapter_name': question.chapter_name,
-            'difficulty_level': question.difficulty_level,
-            'user_answer': activity.user_answer,
-            'is_correct': activity.is_correct,
-            'time_spent': activity.time_spent,
-            'completed_at': activity.completed_at.isoformat() if activity.completed_at else None
-        })
-    
-    return result
+    return [_recent_item(row) for row in _recent_activity_query(db, user_id, limit)]
+
+
+def load_dashboard(db: Session, user_id: int, recent_limit: int = 20) -> Dict[str, Any]:
+    """
+    Everything the analytics dashboard shows, read with a fixed number of
+    queries: one ``UNION ALL`` over the stats rollups (streaks included), the
+    daily rollups around today, the user's time zone and the catalog version,
+    then the recent answers unless ``recent_limit`` is 0. The rollups come from
+    that single statement and so agree with each other; the recent answers are
+    a separate read and may include an answer committed in between. Returns
+    ``user_stats``, ``chapter_progress`` and ``recent_activity`` in the shapes
+    of ``get_user_stats``, ``get_chapter_progress`` and
+    ``get_recent_activity``, plus ``today``.
+    """
+    # The user's local today is one of these UTC-relative days; it is picked once the zone is read
+    utc_today = datetime.utcnow().date()
+    no_text = literal(None, String)
+    no_number = literal(None, Integer)
+
+    counts = union_all(
+        select(
+            literal('summary').label('kind'), no_text.label('key'), no_text.label('label'),
+            UserStatsSummary.questions_attempted.label('a'), UserStatsSummary.first_correct.label('b'),
+            UserStatsSummary.total_attempts.label('c'), UserStatsSummary.total_time.label('d')
+        ).where(UserStatsSummary.user_id == user_id),
+        select(
+            literal('streaks'), cast(UserStatsSummary.last_practice_day, String), no_text,
+            UserStatsSummary.current_streak, UserStatsSummary.longest_streak,
+            UserStatsSummary.daily_streak, UserStatsSummary.longest_daily_streak
+        ).where(UserStatsSummary.user_id == user_id),
+        select(
+            UserStatsCounter.dimension, UserStatsCounter.key, UserStatsCounter.label,
+            UserStatsCounter.attempts, UserStatsCounter.correct, no_number, no_number
+        ).where(UserStatsCounter.user_id == user_id),
+        select(
+            literal('day'), cast(UserDailyActivity.day, String), no_text, UserDailyActivity.total,
+            UserDailyActivity.correct, UserDailyActivity.time_spent, no_number
+        ).where(
+            UserDailyActivity.user_id == user_id,
+            UserDailyActivity.day.between(utc_today - timedelta(days=1), utc_today + timedelta(days=1))
+        ),
+        select(
+            literal('timezone'), User.timezone, no_text, no_number, no_number, no_number, no_number
+        ).where(User.id == user_id),
+        select(
+            literal('catalog'), no_text, no_text, CatalogState.version, no_number, no_number, no_number
+        ).where(CatalogState.id == 1)
+    )
+
+    summary, streaks, zone, catalog_version, counters, days = None, None, timezone.utc, 0, [], {}
+    for row in db.execute(counts):
+        if row.kind == 'summary':
+            summary = UserStatsSummary(
+                questions_attempted=row.a, first_correct=row.b, total_attempts=row.c, total_time=row.d
+            )
+        elif row.kind == 'streaks':
+            streaks = row
+        elif row.kind == 'timezone':
+            zone = time_zone(row.key)
+        elif row.kind == 'day':
+            days[date.fromisoformat(row.key)] = row
+        elif row.kind == 'catalog':
+            catalog_version = row.a or 0
+        else:
+            counters.append(UserStatsCounter(
+                dimension=row.kind, key=row.key, label=row.label, attempts=row.a, correct=row.b
+            ))
+    counters = _sort_counters(counters)
+    if summary is not None and streaks is not None:
+        summary.current_streak, summary.longest_streak = streaks.a, streaks.b
+        summary.daily_streak, summary.longest_daily_streak = streaks.c, streaks.d
+        summary.last_practice_day = date.fromisoformat(streaks.key) if streaks.key else None
+
+    recent = _recent_activity_query(db, user_id, recent_limit).all() if recent_limit > 0 else []
+
+    local_today = datetime.now(zone).date()
+    today = days.get(local_today)
+    total, correct, time_spent = (today.a, today.b, today.c) if today is not None else (0, 0, 0)
+    today_accuracy = (correct / total * 100) if total > 0 else 0
+    return {
+        'user_stats': _user_stats(summary, counters, local_today),
+        'chapter_progress': _chapter_progress(get_catalog_summary(db, catalog_version)['chapters'], counters),
+        'recent_activity': [_recent_item(row) for row in recent],
+        'today': {
+            "questions_attempted": total,
+            "correct_answers": correct,
+            "accuracy": round(today_accuracy, 1),
+            "time_spent": time_spent,
+            "current_streak": summary.current_streak if summary is not None else 0
+        }
+    }
 
 
 def create_mark(db: Session, user_id: int, question_id: int, mark_type: str = "review", notes: str = None) -> Mark:
@@ -284,243 +717,333 @@ def get_leaderboard(db: Session, limit: int = 10) -> List[Dict[str, Any]]:
 
 def get_real_time_stats(db: Session, user_id: int) -> Dict[str, Any]:
     """Get real-time statistics for live dashboard updates"""
-    # Current session stats (today)
-    today = datetime.utcnow().date()
-    today_start = datetime.combine(today, datetime.min.time())
-    
-    today_activities = db.query(UserActivity).filter(
-        and_(
-            UserActivity.user_id == user_id,
-            UserActivity.completed_at >= today_start
-        )
-    ).all()
-    
-    today_total = len(today_activities)
-    today_correct = sum(1 for activity in today_activities if activity.is_correct)
-    today_time = sum(activity.time_spent for activity in today_activities if activity.time_spent)
-    today_accuracy = (today_correct / today_total * 100) if today_total > 0 else 0
-    
-    # Overall stats
-    overall_stats = get_user_stats(db, user_id)
-    chapter_progress = get_chapter_progress(db, user_id)
-
-    # Recent streak
-    recent_activities = db.query(UserActivity).filter(
-        UserActivity.user_id == user_id
-    ).order_by(desc(UserActivity.completed_at)).limit(10).all()
-    
-    current_streak = 0
-    for activity in recent_activities:
-        if activity.is_correct:
-            current_streak += 1
-        else:
-            break
-    
+    dashboard = load_dashboard(db, user_id, recent_limit=0)
     return {
-        "today": {
-            "questions_attempted": today_total,
-            "correct_answers": today_correct,
-            "accuracy": round(today_accuracy, 1),
-            "time_spent": today_time,
-            "current_streak": current_streak
-        },
-        "overall": overall_stats,
-        "chapter_progress": chapter_progress,
+        "today": dashboard['today'],
+        "overall": dashboard['user_stats'],
+        "chapter_progress": dashboard['chapter_progress'],
         "last_updated": datetime.utcnow().isoformat()
     }
 
 
-def get_performance_trends(db: Session, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
-    """Get performance trends over the specified number of days"""
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    # Group activities by date
-    daily_stats = db.query(
-        func.date(UserActivity.completed_at).label('date'),
-        func.count(UserActivity.id).label('total'),
-        func.sum(case((UserActivity.is_correct == True, 1), else_=0)).label('correct'),
-        func.sum(UserActivity.time_spent).label('time_spent')
+def _daily_activity(db: Session, user_id: int, days: int, zone: tzinfo) -> tuple:
+    """The user's local date and their day rows for the last ``days`` days, oldest first"""
+    today = datetime.now(zone).date()
+    rows = db.query(
+        UserDailyActivity.day,
+        UserDailyActivity.total,
+        UserDailyActivity.correct,
+        UserDailyActivity.time_spent
     ).filter(
-        and_(
-            UserActivity.user_id == user_id,
-            UserActivity.completed_at >= start_date,
-            UserActivity.completed_at <= end_date
-        )
-    ).group_by(
-        func.date(UserActivity.completed_at)
-    ).order_by(
-        func.date(UserActivity.completed_at)
-    ).all()
-    
-    trends = []
-    for stat in daily_stats:
-        accuracy = (stat.correct / stat.total * 100) if stat.total > 0 else 0
-        trends.append({
-            "date": stat.date,
-            "questions_attempted": stat.total,
-            "correct_answers": stat.correct,
-            "accuracy": round(accuracy, 1),
-            "time_spent": stat.time_spent or 0,
-            "avg_time_per_question": round((stat.time_spent or 0) / stat.total, 1) if stat.total > 0 else 0
-        })
-    
-    return trends
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day > today - timedelta(days=days)
+    ).order_by(UserDailyActivity.day).all()
+    return today, rows
+
+
+def _columnar_engine():
+    """The NumPy engine when ``analytics_engine`` selects it and NumPy is installed"""
+    if settings.analytics_engine != 'numpy':
+        return None
+    from app import columnar_analytics
+    return columnar_analytics if columnar_analytics.np is not None else None
+
+
+def get_performance_trends(db: Session, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
+    """
+    Get performance trends over the specified number of days, today included.
+    Days are bucketed in the user's time zone and read from ``user_daily_activity``,
+    so at most ``days`` rows are loaded.
+    """
+    engine = _columnar_engine()
+    if engine is not None:
+        return engine.performance_trends(db, user_id, days)
+    _, rows = _daily_activity(db, user_id, days, user_zone(db, user_id))
+    return [trend(row) for row in rows]
 
 
 def get_detailed_analytics(db: Session, user_id: int, days: int = 30) -> Dict[str, Any]:
     """Get detailed analytics including patterns and insights"""
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
+    engine = _columnar_engine()
+    if engine is not None:
+        return engine.detailed_analytics(db, user_id, days)
+
+    zone = user_zone(db, user_id)
+    today, daily = _daily_activity(db, user_id, days, zone)
+    if not daily:
+        return detailed_report(days, [], [], [], [], [], (0, 0))
     
-    # Get activities in date range, joining with Question to get metadata
-    activities_query = db.query(UserActivity, Question).join(Question).filter(
-        and_(
-            UserActivity.user_id == user_id,
-            UserActivity.completed_at >= start_date
-        )
+    # Chapter, difficulty and hour patterns are grouped in SQL; ties keep the
+    # order in which the buckets were first practised
+    start = window_start(today, days, zone)
+    in_window = and_(
+        UserActivity.user_id == user_id,
+        UserActivity.completed_at >= start
     )
+    correct = func.sum(case((UserActivity.is_correct == True, 1), else_=0))
     
-    activities_with_questions = activities_query.all()
-    
-    if not activities_with_questions:
-        return {
-            "insights": {
-                "total_practice_time": 0,
-                "average_session_length": 0,
-                "peak_performance_hour": None,
-                "improvement_areas": [],
-                "strengths": []
-            },
-            "patterns": {
-                "most_active_day": None,
-                "preferred_difficulty": None,
-                "consistency_score": 0
-            },
-            "trends": []
-        }
-    
-    activities = [aq[0] for aq in activities_with_questions]
-    
-    # Chapter performance for strengths/weaknesses
-    chapter_performance = {}
-    for activity, question in activities_with_questions:
-        chapter = question.chapter_name
-        if chapter not in chapter_performance:
-            chapter_performance[chapter] = {"total": 0, "correct": 0}
-        chapter_performance[chapter]["total"] += 1
-        if activity.is_correct:
-            chapter_performance[chapter]["correct"] += 1
-            
-    chapter_accuracy = []
-    for chapter, stats in chapter_performance.items():
-        if stats["total"] > 0:
-            accuracy = (stats["correct"] / stats["total"]) * 100
-            chapter_accuracy.append({"chapter": chapter, "accuracy": accuracy, "total": stats["total"]})
-            
-    chapter_accuracy.sort(key=lambda x: x["accuracy"])
-    
-    improvement_areas = [{"name": item["chapter"], "accuracy": round(item["accuracy"])} for item in chapter_accuracy if item["total"] >= 5 and item["accuracy"] < 70]
-    strengths = [{"name": item["chapter"], "accuracy": round(item["accuracy"])} for item in reversed(chapter_accuracy) if item["total"] >= 5 and item["accuracy"] >= 85]
-
-    # Difficulty preference
-    difficulty_stats = {}
-    for _, question in activities_with_questions:
-        level = question.difficulty_level
-        difficulty_stats[level] = difficulty_stats.get(level, 0) + 1
-    
-    preferred_difficulty = max(difficulty_stats.keys(), key=lambda k: difficulty_stats[k]) if difficulty_stats else None
+    chapter_rows = db.query(
+        Question.chapter_name,
+        func.count(UserActivity.id).label('total'),
+        correct.label('correct')
+    ).join(Question, Question.id == UserActivity.question_id).filter(in_window).group_by(
+        Question.chapter_name
+    ).order_by(func.min(UserActivity.id)).all()
 
-    # Time-based patterns
-    hourly_performance = {}
-    daily_performance = {}
-    
-    for activity in activities:
-        if not activity.completed_at: continue
-        hour = activity.completed_at.hour
-        day = activity.completed_at.strftime('%A')
-        
-        if hour not in hourly_performance:
-            hourly_performance[hour] = {"total": 0, "correct": 0}
-        if day not in daily_performance:
-            daily_performance[day] = {"total": 0, "correct": 0}
-        
-        hourly_performance[hour]["total"] += 1
-        daily_performance[day]["total"] += 1
-        
-        if activity.is_correct:
-            hourly_performance[hour]["correct"] += 1
-            daily_performance[day]["correct"] += 1
-            
-    best_hour = None
-    best_accuracy = -1
-    if hourly_performance:
-        for hour, stats in hourly_performance.items():
-            if stats["total"] >= 3:  # Minimum 3 questions
-                accuracy = stats["correct"] / stats["total"]
-                if accuracy > best_accuracy:
-                    best_accuracy = accuracy
-                    best_hour = hour
-
-    most_active_day = max(daily_performance.keys(), key=lambda x: daily_performance[x]["total"]) if daily_performance else None
-    
-    dates = [activity.completed_at.date() for activity in activities if activity.completed_at]
-    unique_dates = set(dates)
-    consistency_score = len(unique_dates) / days * 100 if days > 0 else 0
-    
-    total_time = sum(activity.time_spent for activity in activities if activity.time_spent)
-    avg_session_length = total_time / len(unique_dates) if unique_dates else 0
-    
-    trends = get_performance_trends(db, user_id, days)
-    
-    return {
-        "insights": {
-            "total_practice_time": total_time,
-            "average_session_length": round(avg_session_length, 1),
-            "peak_performance_hour": f"{best_hour}:00" if best_hour is not None else None,
-            "improvement_areas": improvement_areas[:3],
-            "strengths": strengths[:3]
-        },
-        "patterns": {
-            "most_active_day": most_active_day,
-            "preferred_difficulty": preferred_difficulty,
-            "consistency_score": round(consistency_score, 1)
-        },
-        "trends": trends
-    }
+    difficulty_rows = db.query(
+        Question.difficulty_level,
+        func.count(UserActivity.id).label('total')
+    ).join(Question, Question.id == UserActivity.question_id).filter(in_window).group_by(
+        Question.difficulty_level
+    ).order_by(func.min(UserActivity.id)).all()
 
+    # Hours in the user's local time
+    hour = _local_hour(db, UserActivity.completed_at, zone, start, datetime.utcnow())
+    hourly_rows = db.query(
+        hour.label('hour'),
+        func.count(UserActivity.id).label('total'),
+        correct.label('correct')
+    ).filter(in_window).group_by(hour).order_by(func.min(UserActivity.id)).all()
 
-def record_session_start(db: Session, user_id: int):
-    """Record the start of a practice session"""
-    from app.models.models import User
-    
-    # For now, we'll track this in user activities, but could create a separate Sessions table
-    # This is a simplified implementation
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.updated_at = datetime.utcnow()
-        db.commit()
-        return user
-    return None
+    # Time spent as a histogram of the timed answers, for the percentiles
+    time_rows = db.query(
+        UserActivity.time_spent,
+        func.count(UserActivity.id).label('total')
+    ).filter(in_window, UserActivity.time_spent.isnot(None)).group_by(UserActivity.time_spent).all()
 
+    return detailed_report(
+        days, daily, chapter_rows, difficulty_rows, hourly_rows, time_rows, session_totals(db, user_id, start)
+    )
 
-def record_session_end(db: Session, user_id: int, session_id: int):
-    """Record the end of a practice session"""
-    from app.models.models import User
-    
-    # Simplified implementation - in a real system you'd have a Sessions table
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.updated_at = datetime.utcnow()
-        # Calculate duration (would be better with actual session tracking)
-        duration = 0  # This would be calculated from session start/end times
-        user.duration = duration  # This field doesn't exist, just for example
+
+def record_session_start(db: Session, user_id: int) -> PracticeSession:
+    """
+    Open a practice session for the user. A session they left open is ended
+    at its last answer (or its start, if it has none).
+    """
+    db.query(PracticeSession).filter(
+        PracticeSession.user_id == user_id,
+        PracticeSession.ended_at.is_(None)
+    ).update(
+        {PracticeSession.ended_at: func.coalesce(PracticeSession.last_activity_at, PracticeSession.started_at)},
+        synchronize_session=False
+    )
+    session = PracticeSession(user_id=user_id, started_at=datetime.utcnow())
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+def record_session_end(db: Session, user_id: int, session_id: int) -> Optional[Dict[str, Any]]:
+    """
+    End one of the user's practice sessions and return its summary, read from
+    the session's counters. None when the user has no such session.
+    """
+    session = db.query(PracticeSession).filter(
+        PracticeSession.id == session_id,
+        PracticeSession.user_id == user_id
+    ).first()
+    if session is None:
+        return None
+    if session.ended_at is None:
+        session.ended_at = datetime.utcnow()
         db.commit()
-        return user
-    return None
+
+    chapters = db.query(
+        PracticeSessionChapter.chapter_number,
+        PracticeSessionChapter.answered,
+        PracticeSessionChapter.correct
+    ).filter(PracticeSessionChapter.session_id == session_id).order_by(PracticeSessionChapter.chapter_number).all()
+    chapter_names = {chapter['chapter_number']: chapter['chapter_name'] for chapter in get_catalog_summary(db)['chapters']}
+
+    started_at, ended_at = _utc_naive(session.started_at), _utc_naive(session.ended_at)
+    accuracy = (session.correct / session.answered * 100) if session.answered > 0 else 0
+    return {
+        'session_id': session.id,
+        'started_at': started_at.isoformat(),
+        'ended_at': ended_at.isoformat(),
+        'duration': int((ended_at - started_at).total_seconds()),
+        'questions_answered': session.answered,
+        'correct_answers': session.correct,
+        'accuracy': round(accuracy, 1),
+        'time_spent': session.time_spent,
+        'chapters_touched': session.chapters_touched,
+        'chapters': [
+            {
+                'chapter_number': row.chapter_number,
+                'chapter_name': chapter_names.get(row.chapter_number),
+                'questions_answered': row.answered,
+                'correct_answers': row.correct
+            }
+            for row in chapters
+        ]
+    }
+
+
+def _mark_cohorts_stale(db: Session, user_id: Optional[int] = None) -> None:
+    """Have the next class analytics refresh rebuild the classes of ``user_id``, or all of them"""
+    query = db.query(Cohort)
+    if user_id is not None:
+        query = query.filter(Cohort.id.in_(select(CohortMember.cohort_id).where(CohortMember.user_id == user_id)))
+    query.update({Cohort.stats_stale: True}, synchronize_session=False)
+
 
 def reset_user_analytics(db: Session, user_id: int) -> int:
-    """Deletes all activity for a user."""
+    """Deletes all activity for a user, along with the state, rollups and practice sessions derived from it."""
+    user_sessions = select(PracticeSession.id).where(PracticeSession.user_id == user_id)
+    db.query(PracticeSessionChapter).filter(
+        PracticeSessionChapter.session_id.in_(user_sessions)
+    ).delete(synchronize_session=False)
+    db.query(UserQuestionState).filter(UserQuestionState.user_id == user_id).delete(synchronize_session=False)
+    db.query(UserStatsSummary).filter(UserStatsSummary.user_id == user_id).delete(synchronize_session=False)
+    db.query(UserStatsCounter).filter(UserStatsCounter.user_id == user_id).delete(synchronize_session=False)
+    db.query(UserDailyActivity).filter(UserDailyActivity.user_id == user_id).delete(synchronize_session=False)
     num_deleted = db.query(UserActivity).filter(UserActivity.user_id == user_id).delete(synchronize_session=False)
+    db.query(PracticeSession).filter(PracticeSession.user_id == user_id).delete(synchronize_session=False)
+    _mark_cohorts_stale(db, user_id)
+    db.commit()
+    attempted_sets.discard(user_id)
+    live_stats.discard(user_id)
+    analytics_cache.invalidate([user_id])
+    return num_deleted
+
+
+def rebuild_user_stats_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute ``user_stats_summary`` (streaks included), ``user_stats_counters``
+    and ``user_daily_activity`` from ``user_activities`` for one user, or for
+    everyone when ``user_id`` is None.
+    Returns the number of users with a rebuilt summary.
+    """
+    scope = [] if user_id is None else [UserActivity.user_id == user_id]
+    for model in (UserStatsSummary, UserStatsCounter):
+        query = db.query(model)
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        query.delete(synchronize_session=False)
+
+    correct = func.sum(case((UserActivity.is_correct == True, 1), else_=0))
+
+    # First attempt at each question is the lowest activity id
+    first_ids = select(func.min(UserActivity.id).label('id')).where(*scope).group_by(
+        UserActivity.user_id, UserActivity.question_id
+    ).subquery()
+    first_attempts = select(
+        UserActivity.user_id,
+        func.count().label('questions'),
+        correct.label('first_correct')
+    ).join(first_ids, first_ids.c.id == UserActivity.id).group_by(UserActivity.user_id).subquery()
+    totals = select(
+        UserActivity.user_id,
+        func.count().label('attempts'),
+        func.coalesce(func.sum(UserActivity.time_spent), 0).label('total_time'),
+        func.max(UserActivity.id).label('last_id')
+    ).where(*scope).group_by(UserActivity.user_id).subquery()
+
+    rebuilt = db.execute(insert(UserStatsSummary).from_select(
+        ['user_id', 'questions_attempted', 'first_correct', 'total_attempts', 'total_time', 'last_activity_id'],
+        select(
+            totals.c.user_id, first_attempts.c.questions, first_attempts.c.first_correct,
+            totals.c.attempts, totals.c.total_time, totals.c.last_id
+        ).join(first_attempts, first_attempts.c.user_id == totals.c.user_id)
+    )).rowcount
+
+    counter_columns = ['user_id', 'dimension', 'key', 'label', 'attempts', 'correct']
+    db.execute(insert(UserStatsCounter).from_select(counter_columns, select(
+        UserActivity.user_id, literal('chapter'), cast(Question.chapter_number, String),
+        func.max(Question.chapter_name), func.count(), correct
+    ).join(Question, Question.id == UserActivity.question_id).where(*scope).group_by(
+        UserActivity.user_id, Question.chapter_number
+    )))
+    db.execute(insert(UserStatsCounter).from_select(counter_columns, select(
+        UserActivity.user_id, literal('difficulty'), Question.difficulty_level,
+        literal(None, String), func.count(), correct
+    ).join(Question, Question.id == UserActivity.question_id).where(*scope).group_by(
+        UserActivity.user_id, Question.difficulty_level
+    )))
+
+    # Correct-answer streaks replay every answer in recording order
+    streaks: Dict[int, Streaks] = {}
+    for row in db.query(UserActivity.user_id, UserActivity.is_correct).filter(*scope).order_by(
+        UserActivity.id
+    ).yield_per(1000):
+        streaks.setdefault(row.user_id, Streaks()).answer(row.is_correct)
+    if streaks:
+        db.execute(update(UserStatsSummary), [
+            {'user_id': user_id, 'current_streak': streak.current_streak, 'longest_streak': streak.longest_streak}
+            for user_id, streak in streaks.items()
+        ])
     db.commit()
-    return num_deleted
\ No newline at end of file
+
+    # Also recounts the daily streaks
+    rebuild_user_daily_activity(db, user_id)
+    return rebuilt
+
+
+def rebuild_user_daily_activity(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute ``user_daily_activity`` for one user, or for everyone when
+    ``user_id`` is None, bucketing answers by each user's current time zone,
+    and recount their daily streaks from the new days.
+    Returns the number of day rows written.
+    """
+    scope = [] if user_id is None else [UserActivity.user_id == user_id]
+    query = db.query(UserDailyActivity)
+    if user_id is not None:
+        query = query.filter(UserDailyActivity.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+    users = db.query(User.id, User.timezone)
+    if user_id is not None:
+        users = users.filter(User.id == user_id)
+    zones = {row.id: time_zone(row.timezone) for row in users}
+
+    first_ids = select(func.min(UserActivity.id).label('id')).where(*scope).group_by(
+        UserActivity.user_id, UserActivity.question_id
+    ).subquery()
+    activities = db.query(
+        UserActivity.user_id,
+        UserActivity.completed_at,
+        UserActivity.is_correct,
+        UserActivity.time_spent,
+        first_ids.c.id.label('first_id')
+    ).outerjoin(first_ids, first_ids.c.id == UserActivity.id).filter(
+        *scope, UserActivity.completed_at.isnot(None)
+    )
+
+    days: Dict[tuple, Dict[str, Any]] = {}
+    for row in activities.yield_per(1000):
+        correct = 1 if row.is_correct else 0
+        day = local_time(row.completed_at, zones.get(row.user_id, timezone.utc)).date()
+        _add_to_day(days, row.user_id, day, correct, row.time_spent or 0, correct if row.first_id else 0)
+
+    if days:
+        db.execute(insert(UserDailyActivity), list(days.values()))
+
+    practice_days: Dict[int, List[date]] = {}
+    for key in sorted(days):
+        practice_days.setdefault(key[0], []).append(key[1])
+    summaries = db.query(UserStatsSummary.user_id)
+    if user_id is not None:
+        summaries = summaries.filter(UserStatsSummary.user_id == user_id)
+    updates = []
+    for row in summaries:
+        streak = Streaks()
+        streak.recount_days(practice_days.get(row.user_id, ()))
+        updates.append({
+            'user_id': row.user_id, 'daily_streak': streak.daily_streak,
+            'longest_daily_streak': streak.longest_daily_streak, 'last_practice_day': streak.last_practice_day
+        })
+    if updates:
+        db.execute(update(UserStatsSummary), updates)
+    _mark_cohorts_stale(db, user_id)
+    db.commit()
+
+    if user_id is None:
+        live_stats.clear()
+        analytics_cache.clear()
+    else:
+        live_stats.discard(user_id)
+        analytics_cache.invalidate([user_id])
+    return len(days)
@@ -0,0 +1,346 @@
+"""
+CRUD operations for cohorts (classes) and their precomputed analytics
+
+Class dashboards are never computed on request. Recording an answer queues it
+in ``cohort_refresh_queue`` in the same transaction. ``refresh_cohort_analytics``
+takes a batch of queued answers, finds the classes, chapters, questions and
+days they touch, recomputes just those rows of ``cohort_chapter_stats``,
+``cohort_question_stats`` and ``cohort_daily_activity`` from the per-user
+rollups, which are already exact for every committed answer, and deletes the
+queue rows it took. A queued answer becomes visible when its transaction
+commits, so an answer that commits after one with a higher id is still folded
+in. Recomputing instead of adding deltas keeps a pass idempotent: re-running
+it after a crash cannot double count. Each touched class then gets its
+dashboard re-rendered into ``cohort_dashboards``, so a dashboard read is one
+primary-key lookup however large the class.
+
+Membership changes and anything else that rewrites a student's history mark
+the class stale, and the next pass rebuilds all of its rows.
+"""
+
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, cast, delete, func, insert, literal, select, Integer
+from sqlalchemy.orm import Session
+
+from app.analytics_reports import user_zone
+from app.crud.analytics import _upsert
+from app.crud.question import get_catalog_summary
+from app.models.models import (
+    User, UserQuestionState, UserStatsCounter, UserDailyActivity, Question,
+    Cohort, CohortMember, CohortChapterStats, CohortQuestionStats, CohortDailyActivity, CohortDashboard,
+    CohortAnalyticsState, CohortRefreshQueue
+)
+
+# A student has mastered a chapter at this accuracy over at least this many attempts
+MASTERY_ACCURACY = 80
+MASTERY_MIN_ATTEMPTS = 5
+
+# Weakest questions: lowest first-attempt accuracy among questions this many students tried
+WEAKEST_QUESTIONS = 10
+WEAK_QUESTION_MIN_STUDENTS = 3
+
+# Days of participation on a dashboard
+PARTICIPATION_DAYS = 30
+
+# Join codes: no 0/O or 1/I, so they survive being read out in class
+JOIN_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+JOIN_CODE_LENGTH = 8
+
+
+def _new_join_code(db: Session) -> str:
+    while True:
+        code = ''.join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+        if db.query(Cohort.id).filter(Cohort.join_code == code).first() is None:
+            return code
+
+
+def create_cohort(db: Session, teacher_id: int, name: str) -> Cohort:
+    """Create a class owned by ``teacher_id``, with a fresh join code"""
+    cohort = Cohort(name=name, teacher_id=teacher_id, join_code=_new_join_code(db))
+    db.add(cohort)
+    db.commit()
+    db.refresh(cohort)
+    return cohort
+
+
+def reset_join_code(db: Session, cohort_id: int) -> Cohort:
+    """Replace the class's join code; the old one stops working"""
+    cohort = db.get(Cohort, cohort_id)
+    cohort.join_code = _new_join_code(db)
+    db.commit()
+    db.refresh(cohort)
+    return cohort
+
+
+def get_teacher_cohorts(db: Session, teacher_id: int) -> List[Cohort]:
+    return db.query(Cohort).filter(Cohort.teacher_id == teacher_id).order_by(Cohort.id).all()
+
+
+def get_student_cohorts(db: Session, user_id: int) -> List[Any]:
+    """``(cohort_id, name, joined_at)`` of every class ``user_id`` belongs to"""
+    return db.query(
+        Cohort.id.label('cohort_id'), Cohort.name, CohortMember.joined_at
+    ).join(CohortMember, CohortMember.cohort_id == Cohort.id).filter(
+        CohortMember.user_id == user_id
+    ).order_by(Cohort.id).all()
+
+
+def get_cohort_for_teacher(db: Session, cohort_id: int, user_id: int) -> Optional[Cohort]:
+    """The class when ``user_id`` teaches it or is a superuser, else None"""
+    cohort = db.get(Cohort, cohort_id)
+    if cohort is None or cohort.teacher_id == user_id:
+        return cohort
+    is_superuser = db.query(User.is_superuser).filter(User.id == user_id).scalar()
+    return cohort if is_superuser else None
+
+
+def join_cohort(db: Session, join_code: str, user_id: int) -> Optional[Cohort]:
+    """
+    Add ``user_id`` to the class with ``join_code``; None when no class has
+    that code. Joining twice is a no-op.
+    """
+    cohort = db.query(Cohort).filter(Cohort.join_code == join_code.strip().upper()).first()
+    if cohort is None:
+        return None
+    member = db.query(CohortMember).filter(
+        CohortMember.cohort_id == cohort.id,
+        CohortMember.user_id == user_id
+    ).first()
+    if member is None:
+        db.add(CohortMember(cohort_id=cohort.id, user_id=user_id))
+        cohort.stats_stale = True
+    db.commit()
+    return cohort
+
+
+def remove_cohort_member(db: Session, cohort_id: int, user_id: int) -> bool:
+    removed = db.query(CohortMember).filter(
+        CohortMember.cohort_id == cohort_id,
+        CohortMember.user_id == user_id
+    ).delete(synchronize_session=False)
+    if removed:
+        db.query(Cohort).filter(Cohort.id == cohort_id).update({Cohort.stats_stale: True}, synchronize_session=False)
+    db.commit()
+    return bool(removed)
+
+
+def get_cohort_dashboard(db: Session, cohort_id: int) -> Dict[str, Any]:
+    """
+    The class dashboard as of the last refresh. A class that was never
+    refreshed is built on the spot, once.
+    """
+    dashboard = db.get(CohortDashboard, cohort_id)
+    if dashboard is None:
+        rebuild_cohort_analytics(db, cohort_id)
+        dashboard = db.get(CohortDashboard, cohort_id)
+    return {
+        **dashboard.payload,
+        'last_activity_id': dashboard.last_activity_id,
+        'refreshed_at': dashboard.refreshed_at.isoformat()
+    }
+
+
+def _high_water_mark(db: Session) -> CohortAnalyticsState:
+    state = db.get(CohortAnalyticsState, 1)
+    if state is None:
+        state = CohortAnalyticsState(id=1, last_activity_id=0)
+        db.add(state)
+        db.flush()
+    return state
+
+
+def _recompute(db: Session, cohort_id: int, chapters: Optional[Set[int]] = None,
+               questions: Optional[Set[int]] = None, days: Optional[set] = None) -> None:
+    """
+    Replace the class's aggregate rows for the given chapters, questions and
+    days (all of them when None) with sums over its members' rollups
+    """
+    members = select(CohortMember.user_id).where(CohortMember.cohort_id == cohort_id).scalar_subquery()
+
+    if chapters is None or chapters:
+        scope = [] if chapters is None else [UserStatsCounter.key.in_([str(number) for number in chapters])]
+        stale = [] if chapters is None else [CohortChapterStats.chapter_number.in_(chapters)]
+        mastered = case((and_(
+            UserStatsCounter.attempts >= MASTERY_MIN_ATTEMPTS,
+            UserStatsCounter.correct * 100 >= UserStatsCounter.attempts * MASTERY_ACCURACY
+        ), 1), else_=0)
+        db.execute(delete(CohortChapterStats).where(CohortChapterStats.cohort_id == cohort_id, *stale))
+        db.execute(insert(CohortChapterStats).from_select(
+            ['cohort_id', 'chapter_number', 'chapter_name', 'attempts', 'correct',
+             'students_attempted', 'students_mastered'],
+            select(
+                literal(cohort_id), cast(UserStatsCounter.key, Integer), func.max(UserStatsCounter.label),
+                func.sum(UserStatsCounter.attempts), func.sum(UserStatsCounter.correct),
+                func.count(), func.sum(mastered)
+            ).where(
+                UserStatsCounter.user_id.in_(members), UserStatsCounter.dimension == 'chapter', *scope
+            ).group_by(UserStatsCounter.key)
+        ))
+
+    if questions is None or questions:
+        scope = [] if questions is None else [UserQuestionState.question_id.in_(questions)]
+        stale = [] if questions is None else [CohortQuestionStats.question_id.in_(questions)]
+        db.execute(delete(CohortQuestionStats).where(CohortQuestionStats.cohort_id == cohort_id, *stale))
+        db.execute(insert(CohortQuestionStats).from_select(
+            ['cohort_id', 'question_id', 'students_attempted', 'first_correct', 'attempts'],
+            select(
+                literal(cohort_id), UserQuestionState.question_id, func.count(),
+                func.sum(case((UserQuestionState.first_correct == True, 1), else_=0)),
+                func.sum(UserQuestionState.attempt_count)
+            ).where(UserQuestionState.user_id.in_(members), *scope).group_by(UserQuestionState.question_id)
+        ))
+
+    if days is None or days:
+        scope = [] if days is None else [UserDailyActivity.day.in_(days)]
+        stale = [] if days is None else [CohortDailyActivity.day.in_(days)]
+        db.execute(delete(CohortDailyActivity).where(CohortDailyActivity.cohort_id == cohort_id, *stale))
+        db.execute(insert(CohortDailyActivity).from_select(
+            ['cohort_id', 'day', 'active_students', 'total', 'correct'],
+            select(
+                literal(cohort_id), UserDailyActivity.day, func.count(),
+                func.sum(UserDailyActivity.total), func.sum(UserDailyActivity.correct)
+            ).where(UserDailyActivity.user_id.in_(members), *scope).group_by(UserDailyActivity.day)
+        ))
+
+
+def _render_dashboard(db: Session, cohort_id: int, last_activity_id: int) -> None:
+    """Store the class dashboard built from its aggregate rows"""
+    cohort = db.get(Cohort, cohort_id)
+    students = db.query(func.count(CohortMember.user_id)).filter(CohortMember.cohort_id == cohort_id).scalar()
+
+    chapter_rows = {
+        row.chapter_number: row for row in db.query(CohortChapterStats).filter(CohortChapterStats.cohort_id == cohort_id)
+    }
+    chapters = []
+    for chapter in get_catalog_summary(db)['chapters']:
+        row = chapter_rows.get(chapter['chapter_number'])
+        attempts = row.attempts if row else 0
+        correct = row.correct if row else 0
+        mastered = row.students_mastered if row else 0
+        chapters.append({
+            'chapter_number': chapter['chapter_number'],
+            'chapter_name': chapter['chapter_name'],
+            'total_questions': chapter['total_questions'],
+            'students_attempted': row.students_attempted if row else 0,
+            'students_mastered': mastered,
+            'mastery_percentage': round(mastered / students * 100, 1) if students > 0 else 0,
+            'accuracy_percentage': round(correct / attempts * 100, 2) if attempts > 0 else 0
+        })
+
+    accuracy = CohortQuestionStats.first_correct * 1.0 / CohortQuestionStats.students_attempted
+    weakest = db.query(
+        Question.question_id,
+        Question.question_text,
+        Question.chapter_name,
+        Question.difficulty_level,
+        CohortQuestionStats.students_attempted,
+        CohortQuestionStats.first_correct,
+        CohortQuestionStats.attempts
+    ).join(Question, Question.id == CohortQuestionStats.question_id).filter(
+        CohortQuestionStats.cohort_id == cohort_id,
+        CohortQuestionStats.students_attempted >= WEAK_QUESTION_MIN_STUDENTS
+    ).order_by(accuracy, CohortQuestionStats.attempts.desc(), Question.id).limit(WEAKEST_QUESTIONS).all()
+
+    # Students' days are local to each of them; the window ends on the teacher's today
+    since = datetime.now(user_zone(db, cohort.teacher_id)).date() - timedelta(days=PARTICIPATION_DAYS - 1)
+    participation = db.query(CohortDailyActivity).filter(
+        CohortDailyActivity.cohort_id == cohort_id,
+        CohortDailyActivity.day >= since
+    ).order_by(CohortDailyActivity.day).all()
+
+    payload = {
+        'cohort_id': cohort_id,
+        'name': cohort.name,
+        'students': students,
+        'chapters': chapters,
+        'weakest_questions': [
+            {
+                'question_id': row.question_id,
+                'question_text': row.question_text[:100] + "..." if len(row.question_text) > 100 else row.question_text,
+                'chapter_name': row.chapter_name,
+                'difficulty_level': row.difficulty_level,
+                'students_attempted': row.students_attempted,
+                'first_attempt_accuracy': round(row.first_correct / row.students_attempted * 100, 1),
+                'attempts': row.attempts
+            }
+            for row in weakest
+        ],
+        'participation': [
+            {
+                'date': row.day.isoformat(),
+                'active_students': row.active_students,
+                'participation_percentage': round(row.active_students / students * 100, 1) if students > 0 else 0,
+                'questions_attempted': row.total,
+                'accuracy': round(row.correct / row.total * 100, 1) if row.total > 0 else 0
+            }
+            for row in participation
+        ]
+    }
+    db.execute(_upsert(
+        db, CohortDashboard, [CohortDashboard.cohort_id], [], ['payload', 'last_activity_id', 'refreshed_at']
+    ), [{
+        'cohort_id': cohort_id, 'payload': payload,
+        'last_activity_id': last_activity_id, 'refreshed_at': datetime.utcnow()
+    }])
+
+
+def rebuild_cohort_analytics(db: Session, cohort_id: int) -> None:
+    """Recompute every aggregate row and the dashboard of one class"""
+    last_activity_id = _high_water_mark(db).last_activity_id
+    _recompute(db, cohort_id)
+    _render_dashboard(db, cohort_id, last_activity_id)
+    db.query(Cohort).filter(Cohort.id == cohort_id).update({Cohort.stats_stale: False}, synchronize_session=False)
+    db.commit()
+
+
+def refresh_cohort_analytics(db: Session, batch_size: int) -> int:
+    """
+    Fold up to ``batch_size`` queued answers into the class aggregates and
+    rebuild stale classes, in one transaction. Returns how many queued
+    answers were taken.
+    """
+    state = _high_water_mark(db)
+    queued = db.query(
+        CohortRefreshQueue.activity_id,
+        CohortRefreshQueue.user_id,
+        CohortRefreshQueue.question_id,
+        CohortRefreshQueue.chapter_number,
+        CohortRefreshQueue.day
+    ).order_by(CohortRefreshQueue.activity_id).limit(batch_size).all()
+
+    touched: Dict[int, Dict[str, set]] = {}
+    if queued:
+        cohorts: Dict[int, List[int]] = {}
+        for user_id, cohort_id in db.query(CohortMember.user_id, CohortMember.cohort_id).filter(
+            CohortMember.user_id.in_({row.user_id for row in queued})
+        ):
+            cohorts.setdefault(user_id, []).append(cohort_id)
+        for row in queued:
+            for cohort_id in cohorts.get(row.user_id, ()):
+                keys = touched.setdefault(cohort_id, {'chapters': set(), 'questions': set(), 'days': set()})
+                keys['questions'].add(row.question_id)
+                if row.chapter_number is not None:
+                    keys['chapters'].add(row.chapter_number)
+                if row.day is not None:
+                    keys['days'].add(row.day)
+        db.query(CohortRefreshQueue).filter(
+            CohortRefreshQueue.activity_id.in_([row.activity_id for row in queued])
+        ).delete(synchronize_session=False)
+        state.last_activity_id = max(state.last_activity_id, max(row.activity_id for row in queued))
+
+    stale = {cohort_id for cohort_id, in db.query(Cohort.id).filter(Cohort.stats_stale == True)}
+    for cohort_id, keys in touched.items():
+        if cohort_id not in stale:
+            _recompute(db, cohort_id, keys['chapters'], keys['questions'], keys['days'])
+    for cohort_id in stale:
+        _recompute(db, cohort_id)
+    if stale:
+        db.query(Cohort).filter(Cohort.id.in_(stale)).update({Cohort.stats_stale: False}, synchronize_session=False)
+
+    for cohort_id in sorted(set(touched) | stale):
+        _render_dashboard(db, cohort_id, state.last_activity_id)
+    db.commit()
+    return len(queued)
@@ -3,22 +3,61 @@ CRUD operations for Question model
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, text, case
-from app.models.models import Question, UserActivity
+from sqlalchemy import and_, func, text, case, select, bindparam
+from app.models.models import CatalogSummary, Question, QuestionTag, UserQuestionState
 from app.schemas.schemas import QuestionCreate, QuestionFilter
+from app.catalog import attempted_sets, bump_catalog_version, catalog, get_catalog_version
+from loguru import logger
 from typing import List, Optional, Tuple
-import random
+import base64
+import hashlib
+import json
+import re
 
 
 def create_question(db: Session, question: QuestionCreate) -> Question:
     """Create a new question"""
     db_question = Question(**question.dict())
+    sync_question_tags(db_question)
     db.add(db_question)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(db_question)
     return db_question
 
 
+def sync_question_tags(question: Question) -> None:
+    """Mirror ``question.tags`` into its ``question_tags`` rows"""
+    existing = {row.tag: row for row in question.tag_rows}
+    question.tag_rows = [
+        existing.get(tag) or QuestionTag(tag=tag)
+        for tag in dict.fromkeys(question.tags or [])
+    ]
+
+
+def _tag_filter(filters: QuestionFilter):
+    """Question id condition for the filter's tags via the tag index"""
+    tags = list(dict.fromkeys(filters.tags))
+    matching = select(QuestionTag.question_id).where(QuestionTag.tag.in_(tags))
+    if filters.tag_match == "all" and len(tags) > 1:
+        matching = matching.group_by(QuestionTag.question_id).having(
+            func.count(QuestionTag.tag) == len(tags)
+        )
+    return Question.id.in_(matching)
+
+
+def deactivate_question(db: Session, question_id: int) -> bool:
+    """Deactivate a question so it is no longer served for practice"""
+    question = get_question_by_id(db, question_id)
+    if not question:
+        return False
+    
+    question.is_active = False
+    bump_catalog_version(db)
+    db.commit()
+    return True
+
+
 def get_question_by_id(db: Session, question_id: int) -> Optional[Question]:
     """Get question by ID"""
     return db.query(Question).filter(
@@ -38,12 +77,42 @@ def get_question_by_question_id(db: Session, question_id: str) -> Optional[Quest
     ).first()
 
 
+def encode_cursor(last_id: int, filters: QuestionFilter) -> str:
+    """Build an opaque keyset cursor bound to the filter it was issued for"""
+    payload = json.dumps({"after": last_id, "sig": _filter_hash(filters)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, filters: QuestionFilter) -> int:
+    """Get the last seen question id from a cursor, validating its filter"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = int(payload["after"])
+        signature = payload["sig"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Malformed pagination cursor")
+    
+    if signature != _filter_hash(filters):
+        raise ValueError("Pagination cursor does not match the current filters")
+    return last_id
+
+
+def _filter_hash(filters: QuestionFilter) -> str:
+    """Short stable hash of the filterable fields"""
+    return hashlib.sha1(repr(catalog.signature(filters)).encode()).hexdigest()[:12]
+
+
 def get_questions_filtered(
     db: Session, 
     filters: QuestionFilter, 
     user_id: Optional[int] = None
-) -> Tuple[List[Question], int]:
-    """Get filtered questions with pagination"""
+) -> Tuple[List[Question], int, Optional[str]]:
+    """
+    Get filtered questions with pagination.
+    Pages by offset, or by keyset when ``filters.cursor`` is set. Returns the
+    page, the total match count and the cursor for the next page (if any).
+    """
     query = db.query(Question).filter(Question.is_active == True)
     
     # Apply filters
@@ -57,17 +126,29 @@ def get_questions_filtered(
         query = query.filter(Question.question_type.in_(filters.question_types))
     
     if filters.tags:
-        # Filter by tags (JSON array contains any of the specified tags)
-        for tag in filters.tags:
-            query = query.filter(Question.tags.contains(f'"{tag}"'))
+        query = query.filter(_tag_filter(filters))
     
-    # Get total count
-    total_count = query.count()
+    # Keyset pagination seeks past the last seen id instead of skipping rows
+    if filters.cursor:
+        query = query.filter(Question.id > decode_cursor(filters.cursor, filters))
+    query = query.order_by(Question.id)
+    if not filters.cursor and filters.offset:
+        query = query.offset(filters.offset)
     
-    # Apply pagination
-    questions = query.offset(filters.offset).limit(filters.limit).all()
+    # Fetch one extra row to learn whether another page exists
+    next_cursor = None
+    if filters.limit is not None:
+        questions = query.limit(filters.limit + 1).all()
+        if len(questions) > filters.limit:
+            questions = questions[:filters.limit]
+            next_cursor = encode_cursor(questions[-1].id, filters)
+    else:
+        questions = query.all()
     
-    return questions, total_count
+    # Total count comes from the catalog's cached per-filter bitmaps
+    total_count = catalog.ensure_fresh(db).count(filters)
+    
+    return questions, total_count, next_cursor
 
 
 def get_random_question(
@@ -77,102 +158,221 @@ def get_random_question(
     exclude_attempted: bool = False
 ) -> Optional[Question]:
     """Get a random question based on filters"""
-    query = db.query(Question).filter(Question.is_active == True)
+    snapshot = catalog.ensure_fresh(db)
     
-    # Apply filters
-    if filters.chapter_numbers:
-        query = query.filter(Question.chapter_number.in_(filters.chapter_numbers))
-    
-    if filters.difficulty_levels:
-        query = query.filter(Question.difficulty_level.in_(filters.difficulty_levels))
+    # Exclude already attempted questions if requested
+    exclude = None
+    if exclude_attempted and user_id:
+        exclude = attempted_sets.get(db, user_id)
     
-    if filters.question_types:
-        query = query.filter(Question.question_type.in_(filters.question_types))
+    # Pick from the in-memory bitmap indexes, then load just that row
+    question_id = snapshot.sample(filters, exclude)
+    if question_id is None:
+        return None
     
-    if filters.tags:
-        for tag in filters.tags:
-            query = query.filter(Question.tags.contains(f'"{tag}"'))
+    return get_question_by_id(db, question_id)
+
+
+def get_practice_set(
+    db: Session,
+    filters: QuestionFilter,
+    size: int,
+    seed: int,
+    user_id: Optional[int] = None,
+    exclude_attempted: bool = False
+) -> Tuple[List[Question], int, Optional[int]]:
+    """
+    Get ``size`` distinct questions from a seeded shuffle of the filtered set.
+    ``filters.offset`` is the position in the deck, so clients can page through
+    it by seed alone, passing the returned next offset back. Returns the
+    questions, the number available and the next offset (None at the end).
+    """
+    snapshot = catalog.ensure_fresh(db)
     
-    # Exclude already attempted questions if requested
+    exclude = None
     if exclude_attempted and user_id:
-        attempted_question_ids = db.query(UserActivity.question_id).filter(
-            UserActivity.user_id == user_id
-        ).subquery()
-        query = query.filter(~Question.id.in_(attempted_question_ids))
-    
-    # Get all matching questions and pick random one
-    questions = query.all()
-    if not questions:
-        return None
+        exclude = attempted_sets.get(db, user_id)
+    
+    start = filters.offset or 0
+    question_ids, total, next_offset = snapshot.deck(filters, seed, start, size, exclude)
+    if not question_ids:
+        return [], total, next_offset
+    
+    # One query for the whole set, returned in deck order
+    questions = {
+        question.id: question
+        for question in get_questions_by_ids(db, question_ids)
+        if question.is_active
+    }
+    return [questions[qid] for qid in question_ids if qid in questions], total, next_offset
+
+
+# Last catalog summary read or built by this process; replaced, never mutated
+_summary: Optional[dict] = None
+
+
+def get_catalog_summary(db: Session, version: Optional[int] = None) -> dict:
+    """
+    Get question counts per chapter, difficulty and tag plus the active total.
+    Served from memory, then from the ``catalog_summary`` rows written by
+    ``bump_catalog_version``, and built from the in-memory catalog when a
+    version has no rows (e.g. bumped by an older import script). Pass
+    ``version`` when the caller has already read it. Callers must not modify
+    the returned dict.
+    """
+    global _summary
+    if version is None:
+        version = get_catalog_version(db)
+    summary = _summary
+    if summary is not None and summary['catalog_version'] == version:
+        return summary
     
-    return random.choice(questions)
+    rows = db.query(CatalogSummary).filter(CatalogSummary.catalog_version == version).all()
+    if rows:
+        summary = _summary_from_rows(version, rows)
+    else:
+        summary = catalog.ensure_fresh(db).build_summary()
+    
+    _summary = summary
+    return summary
+
+
+def _summary_from_rows(version: int, rows: List[CatalogSummary]) -> dict:
+    """Rebuild the summary dict from its materialized rows"""
+    summary = {
+        'catalog_version': version,
+        'total_questions': 0,
+        'chapters': [],
+        'difficulties': {},
+        'tags': {}
+    }
+    for row in sorted(rows, key=lambda r: (r.dimension, r.key)):
+        if row.dimension == 'total':
+            summary['total_questions'] = row.total_questions
+        elif row.dimension == 'chapter':
+            summary['chapters'].append({
+                'chapter_number': int(row.key),
+                'chapter_name': row.label,
+                'total_questions': row.total_questions,
+                'easy_questions': row.easy_questions,
+                'medium_questions': row.medium_questions,
+                'hard_questions': row.hard_questions
+            })
+        elif row.dimension == 'difficulty':
+            summary['difficulties'][row.key] = row.total_questions
+        elif row.dimension == 'tag':
+            summary['tags'][row.key] = row.total_questions
+    summary['chapters'].sort(key=lambda chapter: chapter['chapter_number'])
+    return summary
 
 
 def get_chapter_summary(db: Session) -> List[dict]:
     """Get summary of questions by chapter"""
-    # Simplified approach - get basic counts by chapter and difficulty
-    
-    result = db.execute(text("""
-        SELECT 
-            chapter_number,
-            chapter_name,
-            COUNT(*) as total_questions,
-            SUM(CASE WHEN difficulty_level = 'Easy' THEN 1 ELSE 0 END) as easy_questions,
-            SUM(CASE WHEN difficulty_level = 'Medium' THEN 1 ELSE 0 END) as medium_questions,
-            SUM(CASE WHEN difficulty_level = 'Hard' THEN 1 ELSE 0 END) as hard_questions
-        FROM questions 
-        WHERE is_active = 1 
-        GROUP BY chapter_number, chapter_name 
-        ORDER BY chapter_number
-    """)).fetchall()
-    
-    return [
-        {
-            'chapter_number': row.chapter_number,
-            'chapter_name': row.chapter_name,
-            'total_questions': row.total_questions,
-            'easy_questions': row.easy_questions,
-            'medium_questions': row.medium_questions,
-            'hard_questions': row.hard_questions
-        }
-        for row in result
-    ]
+    return get_catalog_summary(db)['chapters']
 
 
-def get_all_tags(db: Session) -> List[str]:
-    """Get all unique tags from questions"""
-    questions = db.query(Question.tags).filter(
-        and_(Question.is_active == True, Question.tags.isnot(None))
-    ).all()
+def _fts_query(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query where every term must match.
+    A trailing ``*`` on a term (``accel*``) makes it a prefix match."""
+    terms = re.findall(r"(\w+)(\*?)", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"{star}' for term, star in terms)
+
+
+def search_questions(
+    db: Session,
+    query: str,
+    chapter_numbers: Optional[List[int]] = None,
+    difficulty_levels: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> List[Tuple[Question, float, str]]:
+    """
+    Full-text search over question text, options, explanations and tags.
+    Returns ``(question, rank, snippet)`` tuples, best BM25 match first.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    
+    if db.bind.dialect.name != "sqlite":
+        # No FTS5 outside SQLite: plain substring match on the question text,
+        # with LIKE wildcards in the query matched literally
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        questions = db.query(Question).filter(
+            Question.is_active == True,
+            Question.question_text.ilike(f"%{pattern}%", escape="\\")
+        )
+        if chapter_numbers:
+            questions = questions.filter(Question.chapter_number.in_(chapter_numbers))
+        if difficulty_levels:
+            questions = questions.filter(Question.difficulty_level.in_(difficulty_levels))
+        return [(q, 0.0, q.question_text) for q in questions.order_by(Question.id).offset(offset).limit(limit)]
     
-    all_tags = set()
-    for question in questions:
-        if question.tags:
-            all_tags.update(question.tags)
+    conditions = ["questions_fts MATCH :match"]
+    params = {"match": match, "limit": limit, "offset": offset}
+    if chapter_numbers:
+        conditions.append("chapter_number IN :chapter_numbers")
+        params["chapter_numbers"] = list(chapter_numbers)
+    if difficulty_levels:
+        conditions.append("difficulty_level IN :difficulty_levels")
+        params["difficulty_levels"] = list(difficulty_levels)
     
-    return sorted(list(all_tags))
+    # Rank every match (column weights: question text, options, explanations,
+    # tags) but only build snippets for the page that is returned
+    statement = text(f"""
+        WITH page AS (
+            SELECT rowid AS id, bm25(questions_fts, 10.0, 4.0, 1.0, 6.0) AS rank
+            FROM questions_fts
+            WHERE {" AND ".join(conditions)}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT
+            page.id,
+            page.rank,
+            snippet(questions_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM page
+        JOIN questions_fts ON questions_fts.rowid = page.id
+        WHERE questions_fts MATCH :match
+        ORDER BY page.rank
+    """)
+    if chapter_numbers:
+        statement = statement.bindparams(bindparam("chapter_numbers", expanding=True))
+    if difficulty_levels:
+        statement = statement.bindparams(bindparam("difficulty_levels", expanding=True))
+    
+    hits = db.execute(statement, params).fetchall()
+    questions = {q.id: q for q in get_questions_by_ids(db, [hit.id for hit in hits])}
+    return [(questions[hit.id], hit.rank, hit.snippet) for hit in hits if hit.id in questions]
+
+
+def get_tag_counts(db: Session) -> List[dict]:
+    """Get every tag with its number of active questions"""
+    tags = get_catalog_summary(db)['tags']
+    return [{'tag': tag, 'count': tags[tag]} for tag in sorted(tags)]
+
+
+def get_all_tags(db: Session) -> List[str]:
+    """Get all unique tags from questions"""
+    return [row['tag'] for row in get_tag_counts(db)]
 
 def get_wrongly_answered_question_ids(db: Session, user_id: int) -> List[int]:
     """
     Get IDs of all questions where the user's most recent attempt was incorrect.
     """
-    # Subquery to find the ID of the last attempt for each question by the user
-    last_attempt_sq = db.query(
-        UserActivity.question_id,
-        func.max(UserActivity.id).label('last_activity_id')
-    ).filter(UserActivity.user_id == user_id).group_by(UserActivity.question_id).subquery()
-
-    # Join to get the last attempt activity record
-    incorrect_question_ids = db.query(UserActivity.question_id).join(
-        last_attempt_sq,
-        UserActivity.id == last_attempt_sq.c.last_activity_id
-    ).filter(UserActivity.is_correct == False).all()
+    incorrect_question_ids = db.query(UserQuestionState.question_id).filter(
+        UserQuestionState.user_id == user_id,
+        UserQuestionState.last_correct == False
+    ).all()
 
     return [qid for qid, in incorrect_question_ids]
 
+
 def get_attempted_question_ids(db: Session, user_id: int) -> List[int]:
     """Get IDs of all questions the user has attempted."""
-    attempted_question_ids = db.query(UserActivity.question_id).filter(
-        UserActivity.user_id == user_id
-    ).distinct().all()
+    attempted_question_ids = db.query(UserQuestionState.question_id).filter(
+        UserQuestionState.user_id == user_id
+    ).all()
     return [qid for qid, in attempted_question_ids]
@@ -7,6 +7,7 @@ from sqlalchemy import or_
 from app.models.models import User
 from app.schemas.schemas import UserCreate
 from app.core.security import get_password_hash, verify_password
+from app.crud.analytics import rebuild_user_daily_activity
 from typing import Optional
 from loguru import logger
 
@@ -64,6 +65,21 @@ def update_user_activity(db: Session, user_id: int):
         db.commit()
         db.refresh(user)
 
+def set_user_timezone(db: Session, user_id: int, timezone: str) -> Optional[User]:
+    """
+    Change the zone a user's daily analytics are bucketed in and re-bucket
+    their history, committing both together so the days never disagree with
+    the stored zone
+    """
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return None
+    user.timezone = timezone
+    db.flush()  # the rebuild reads the zone back; it commits
+    rebuild_user_daily_activity(db, user_id)
+    db.refresh(user)
+    return user
+
 def set_user_verification_code(db: Session, user_id: int, code: str):
     """Placeholder for storing a verification code for a user."""
     # In a real implementation, you would save this code to the user's record
@@ -0,0 +1,255 @@
+"""
+Write-behind ingestion for answer activity
+
+``check_answer`` hands each graded answer to ``activity_writer`` and returns
+without touching ``user_activities``. A single background task collects
+queued records and writes them with one ``executemany`` INSERT per batch,
+flushing whenever ``activity_batch_size`` records are waiting or
+``activity_flush_interval_ms`` has passed since the first one arrived. Having
+one writer also means SQLite sees one writer instead of one per request.
+
+* Backpressure: the queue holds at most ``activity_queue_size`` records and
+  ``submit`` waits for room when it is full.
+* Read-your-writes: ``wait_for_user`` asks for an immediate flush and returns
+  once everything that user submitted is committed. Endpoints that read a
+  user's activity depend on ``get_current_user_synced`` for this.
+* Shutdown: ``stop`` drains the queue before the process exits.
+* Failures: a batch that still fails after ``WRITE_ATTEMPTS`` is split in
+  halves until the failing records are isolated, so one bad record never
+  costs other users their answers. Records that cannot be written are
+  appended to the ``activity_dead_letter_path`` file (replay them with
+  ``scripts/replay_activity_dead_letters.py``), listeners are not told about
+  them, and the user's next ``wait_for_user`` raises ``ActivityWriteError``.
+
+When the writer is not running (scripts, tests without the app lifespan)
+``submit`` writes the record synchronously instead and raises
+``ActivityWriteError`` if it cannot be written.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.catalog import attempted_sets
+from app.crud.analytics import record_user_activities
+
+# Write attempts per batch before it is split to isolate the failing records
+WRITE_ATTEMPTS = 3
+
+FlushListener = Callable[[List[int]], Awaitable[None]]
+
+
+class ActivityWriteError(Exception):
+    """Submitted answer activity could not be written"""
+
+
+class ActivityWriter:
+    """Batching background writer for ``user_activities``"""
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval_ms: int,
+        queue_size: int,
+        dead_letter_path: str,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_size = queue_size
+        self.dead_letter_path = Path(dead_letter_path)
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._flush_now = False
+        self._submitted = 0  # sequence number of the last queued record
+        self._done = 0  # every record up to this sequence number is written or dead-lettered
+        self._user_last: Dict[int, int] = {}
+        self._user_failed: Dict[int, int] = {}  # dead-lettered records not yet reported to the user
+        self._listeners: List[FlushListener] = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add_listener(self, listener: FlushListener) -> None:
+        """Call ``listener(user_ids)`` after each batch is committed"""
+        self._listeners.append(listener)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Activity writer started (batch {self.batch_size}, "
+            f"{self.flush_interval * 1000:.0f} ms, queue {self.queue_size})"
+        )
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the writer"""
+        if not self.running:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        logger.info("Activity writer stopped")
+
+    async def submit(self, record: dict) -> None:
+        """Queue one activity record, waiting for room if the queue is full"""
+        if not self.running:
+            try:
+                await self._write_with_retries([record])
+            except Exception as e:
+                raise ActivityWriteError(f"Activity record could not be written: {str(e)}") from e
+            await self._notify([record])
+            return
+
+        await self._queue.put(record)
+        self._submitted += 1
+        self._user_last[record["user_id"]] = self._submitted
+        attempted_sets.add(record["user_id"], record["question_id"])
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def wait_for_user(self, user_id: int) -> None:
+        """
+        Return once every record the user submitted so far is committed;
+        raises ``ActivityWriteError`` (once) if any of them were dead-lettered
+        """
+        target = self._user_last.get(user_id)
+        if target is not None and self.running:
+            async with self._flushed:
+                if self._done < target:
+                    self._flush_now = True
+                    self._wakeup.set()
+                    await self._flushed.wait_for(lambda: self._done >= target)
+        failed = self._user_failed.pop(user_id, 0)
+        if failed:
+            raise ActivityWriteError(f"{failed} answer records of user {user_id} could not be written")
+
+    async def _run(self) -> None:
+        while True:
+            if self._queue.empty():
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                if self._queue.empty() and not self._closing:
+                    await self._wakeup.wait()
+                continue
+
+            batch = await self._collect()
+            written = await self._write(batch)
+            if len(written) < len(batch):
+                self._record_failures(batch, written)
+
+            async with self._flushed:
+                self._done += len(batch)
+                for user_id in {record["user_id"] for record in batch}:
+                    if self._user_last.get(user_id, 0) <= self._done:
+                        self._user_last.pop(user_id, None)
+                self._flushed.notify_all()
+            if written:
+                await self._notify(written)
+
+    async def _collect(self) -> List[dict]:
+        """Gather one batch: full, timed out, flush requested or closing"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        batch: List[dict] = []
+        while True:
+            self._wakeup.clear()
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if len(batch) >= self.batch_size or self._flush_now or self._closing:
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        self._flush_now = False
+        return batch
+
+    async def _write_with_retries(self, batch: List[dict], attempts: int = WRITE_ATTEMPTS) -> None:
+        for attempt in range(1, attempts + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                return
+            except Exception as e:
+                logger.error(f"Activity batch write failed (attempt {attempt}, {len(batch)} records): {str(e)}")
+                if attempt == attempts:
+                    raise
+                await asyncio.sleep(self.flush_interval * attempt)
+
+    async def _write(self, batch: List[dict], attempts: int = WRITE_ATTEMPTS) -> List[dict]:
+        """
+        Write ``batch``, splitting it in halves (one attempt each) until the
+        records that keep failing are isolated and dead-lettered. Returns the
+        records that were committed.
+        """
+        try:
+            await self._write_with_retries(batch, attempts)
+            return batch
+        except Exception as e:
+            if len(batch) == 1:
+                await asyncio.to_thread(self._dead_letter, batch[0], str(e))
+                return []
+        middle = len(batch) // 2
+        return await self._write(batch[:middle], 1) + await self._write(batch[middle:], 1)
+
+    def _record_failures(self, batch: List[dict], written: List[dict]) -> None:
+        """Report dead-lettered records to their users and drop sets that counted them"""
+        written_ids = {id(record) for record in written}
+        for record in batch:
+            if id(record) not in written_ids:
+                user_id = record["user_id"]
+                self._user_failed[user_id] = self._user_failed.get(user_id, 0) + 1
+                attempted_sets.discard(user_id)
+
+    def _dead_letter(self, record: dict, error: str) -> None:
+        """Append a record that could not be written to the dead-letter file"""
+        self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.dead_letter_path.open("a", encoding="utf-8") as dead_letters:
+            dead_letters.write(json.dumps({"record": record, "error": error}, default=str) + "\n")
+        logger.error(f"Dead-lettered activity record of user {record['user_id']} to {self.dead_letter_path}: {error}")
+
+    async def _notify(self, batch: List[dict]) -> None:
+        user_ids = sorted({record["user_id"] for record in batch})
+        for listener in self._listeners:
+            try:
+                await listener(user_ids)
+            except Exception as e:
+                logger.error(f"Activity flush listener error: {str(e)}")
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        db = self.session_factory()
+        try:
+            record_user_activities(db, batch)
+        finally:
+            db.close()
+
+
+activity_writer = ActivityWriter(
+    settings.activity_batch_size,
+    settings.activity_flush_interval_ms,
+    settings.activity_queue_size,
+    settings.activity_dead_letter_path
+)
@@ -0,0 +1,358 @@
+"""
+Incrementally maintained real-time stats
+
+The ``stats_update`` pushed after every answer used to be rebuilt from
+``user_activities`` each time (``get_real_time_stats``). ``LiveStats`` instead
+loads a user's counters once (overall totals, streaks and per chapter and
+difficulty counters from the stats rollups, today's totals from the daily
+rollup for the user's local day) and then applies each committed answer as an
+O(1) delta. ``record_user_activities`` feeds it after commit, the same way it
+keeps ``attempted_sets`` current.
+
+Every state remembers the highest activity id it has seen, so a delta is never
+counted twice. Rows committed while a state is loading are kept and applied to
+the loaded state before it is stored. Anything a delta cannot express exactly
+(a question missing from the catalog, an answer on a day before the last
+practice day) drops the state and it is reloaded on next use. ``reconcile`` reloads every state that changed
+since the last pass and replaces it, logging any drift it finds.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.analytics_reports import user_zone
+from app.catalog import CatalogEntry, catalog
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.question import get_catalog_summary
+from app.models.models import UserDailyActivity, UserStatsCounter, UserStatsSummary
+from app.streaks import STREAK_COLUMNS, Streaks
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class UserLiveStats:
+    """Counters behind one user's real-time stats"""
+
+    __slots__ = (
+        "last_activity_id", "questions", "first_correct", "attempts", "total_time",
+        "chapters", "difficulties", "today", "today_total", "today_correct", "today_time",
+        "streaks", "zone"
+    )
+
+    def __init__(self):
+        self.last_activity_id = 0
+        self.questions = 0  # distinct questions attempted
+        self.first_correct = 0  # questions answered correctly on the first attempt
+        self.attempts = 0
+        self.total_time = 0
+        self.chapters: Dict[int, list] = {}  # number -> [name, attempts, correct]
+        self.difficulties: Dict[str, int] = {}  # level -> attempts
+        self.today = datetime.utcnow().date()  # in ``zone``
+        self.today_total = 0
+        self.today_correct = 0
+        self.today_time = 0
+        self.streaks = Streaks()
+        self.zone: tzinfo = timezone.utc  # the user's, for practice days
+
+    def counters(self) -> tuple:
+        """Everything that should match a fresh load, for drift checks"""
+        return (
+            self.questions, self.first_correct, self.attempts, self.total_time,
+            {key: tuple(value) for key, value in self.chapters.items()}, dict(self.difficulties),
+            self.today, self.today_total, self.today_correct, self.today_time, self.streaks.values()
+        )
+
+    def roll_day(self) -> None:
+        today = datetime.now(self.zone).date()
+        if today != self.today:
+            self.today = today
+            self.today_total = self.today_correct = self.today_time = 0
+
+    def apply(self, record: Dict[str, Any], entry: CatalogEntry) -> bool:
+        """Add one committed answer; False when the state can no longer be trusted"""
+        completed_at = _utc_naive(record['completed_at'])
+        day = completed_at.replace(tzinfo=timezone.utc).astimezone(self.zone).date() if completed_at else None
+        if day is not None and not self.streaks.practice(day):
+            return False  # back-dated practice day: the daily streak is recounted from the database
+
+        is_correct = bool(record['is_correct'])
+        time_spent = record['time_spent'] or 0
+
+        self.attempts += 1
+        self.total_time += time_spent
+        if record['attempt_number'] == 1:
+            self.questions += 1
+            self.first_correct += is_correct
+        chapter = self.chapters.setdefault(entry.chapter_number, [entry.chapter_name, 0, 0])
+        chapter[1] += 1
+        chapter[2] += is_correct
+        self.difficulties[entry.difficulty_level] = self.difficulties.get(entry.difficulty_level, 0) + 1
+
+        self.roll_day()
+        if day == self.today:
+            self.today_total += 1
+            self.today_correct += is_correct
+            self.today_time += time_spent
+
+        self.streaks.answer(is_correct)
+        self.last_activity_id = record['id']
+        return True
+
+
+def load_user_live_stats(db: Session, user_id: int) -> UserLiveStats:
+    """Build a user's counters from the database"""
+    stats = UserLiveStats()
+    stats.zone = user_zone(db, user_id)
+    stats.today = datetime.now(stats.zone).date()
+
+    summary = db.query(
+        UserStatsSummary.questions_attempted,
+        UserStatsSummary.first_correct,
+        UserStatsSummary.total_attempts,
+        UserStatsSummary.total_time,
+        UserStatsSummary.last_activity_id,
+        *(getattr(UserStatsSummary, name) for name in STREAK_COLUMNS)
+    ).filter(UserStatsSummary.user_id == user_id).first()
+    if summary is not None:
+        stats.questions = summary.questions_attempted
+        stats.first_correct = summary.first_correct
+        stats.attempts = summary.total_attempts
+        stats.total_time = summary.total_time
+        stats.last_activity_id = summary.last_activity_id
+        stats.streaks = Streaks.from_row(summary)
+
+    counters = db.query(
+        UserStatsCounter.dimension,
+        UserStatsCounter.key,
+        UserStatsCounter.label,
+        UserStatsCounter.attempts,
+        UserStatsCounter.correct
+    ).filter(UserStatsCounter.user_id == user_id).all()
+    for row in counters:
+        if row.dimension == 'chapter':
+            stats.chapters[int(row.key)] = [row.label, row.attempts, row.correct]
+        else:
+            stats.difficulties[row.key] = row.attempts
+
+    today = db.query(
+        UserDailyActivity.total,
+        UserDailyActivity.correct,
+        UserDailyActivity.time_spent
+    ).filter(UserDailyActivity.user_id == user_id, UserDailyActivity.day == stats.today).first()
+    if today is not None:
+        stats.today_total = today.total
+        stats.today_correct = today.correct
+        stats.today_time = today.time_spent
+    return stats
+
+
+def live_stats_payload(stats: UserLiveStats, chapter_totals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Render counters in the shape ``get_real_time_stats`` returns"""
+    stats.roll_day()
+
+    by_chapter = {
+        f"Ch{number}: {name}": attempts
+        for number, (name, attempts, _) in sorted(stats.chapters.items())
+    }
+
+    chapter_progress = []
+    for chapter in chapter_totals:
+        _, attempted, correct = stats.chapters.get(chapter['chapter_number'], (None, 0, 0))
+        accuracy = (correct / attempted * 100) if attempted > 0 else 0
+        chapter_progress.append({
+            'chapter_number': chapter['chapter_number'],
+            'chapter_name': chapter['chapter_name'],
+            'total_questions': chapter['total_questions'],
+            'attempted_questions': attempted,
+            'correct_answers': correct,
+            'accuracy_percentage': round(accuracy, 2)
+        })
+
+    accuracy = (stats.first_correct / stats.questions * 100) if stats.questions > 0 else 0
+    avg_time = (stats.total_time / stats.attempts) if stats.attempts > 0 else 0
+    today_accuracy = (stats.today_correct / stats.today_total * 100) if stats.today_total > 0 else 0
+
+    return {
+        "today": {
+            "questions_attempted": stats.today_total,
+            "correct_answers": stats.today_correct,
+            "accuracy": round(today_accuracy, 1),
+            "time_spent": stats.today_time,
+            "current_streak": stats.streaks.current_streak
+        },
+        "overall": {
+            'total_questions_attempted': stats.questions,
+            'correct_answers': stats.first_correct,
+            'accuracy_percentage': round(accuracy, 2),
+            'total_time_spent': stats.total_time,
+            'average_time_per_question': round(avg_time, 2),
+            'questions_by_difficulty': dict(stats.difficulties),
+            'questions_by_chapter': by_chapter,
+            'streaks': stats.streaks.payload(datetime.now(stats.zone).date())
+        },
+        "chapter_progress": chapter_progress,
+        "last_updated": datetime.utcnow().isoformat()
+    }
+
+
+class LiveStats:
+    """LRU of per-user live stats kept current by answer deltas"""
+
+    def __init__(self, max_users: int, reconcile_interval_s: int):
+        self.max_users = max_users
+        self.reconcile_interval = reconcile_interval_s
+        self._states: "OrderedDict[int, UserLiveStats]" = OrderedDict()
+        self._dirty: Set[int] = set()  # users with deltas since the last reconcile
+        self._loading: Dict[int, List[list]] = {}  # user -> rows applied during each load
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """Current real-time stats for the user, loading them if not resident"""
+        chapter_totals = get_catalog_summary(db)['chapters']
+        with self._lock:
+            stats = self._states.get(user_id)
+            if stats is not None:
+                self._states.move_to_end(user_id)
+                return live_stats_payload(stats, chapter_totals)
+            # Rows committed while loading may or may not be in the snapshot
+            applied: list = []
+            self._loading.setdefault(user_id, []).append(applied)
+
+        stats = load_user_live_stats(db, user_id)
+        with self._lock:
+            loads = self._loading.get(user_id, [])
+            current = any(load is applied for load in loads)
+            if current:
+                loads[:] = [load for load in loads if load is not applied]
+                if not loads:
+                    del self._loading[user_id]
+                if self._catch_up(stats, applied):
+                    self._store(user_id, stats)
+                    if applied:
+                        self._dirty.add(user_id)
+            return live_stats_payload(self._states.get(user_id, stats), chapter_totals)
+
+    def apply(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Apply committed activity rows (with ``id`` and ``attempt_number``)"""
+        entries = catalog.entries
+        with self._lock:
+            for row in rows:
+                user_id = row['user_id']
+                for applied in self._loading.get(user_id, ()):
+                    applied.append(row)
+                stats = self._states.get(user_id)
+                if stats is None or row['id'] <= stats.last_activity_id:
+                    continue
+                entry = entries.get(row['question_id'])
+                if entry is None or not stats.apply(row, entry):
+                    del self._states[user_id]
+                    continue
+                self._dirty.add(user_id)
+
+    def discard(self, user_id: int) -> None:
+        """Drop the user's state, e.g. after their analytics are reset"""
+        with self._lock:
+            self._states.pop(user_id, None)
+            self._dirty.discard(user_id)
+            self._loading.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Drop every state, e.g. after the rollups were rebuilt"""
+        with self._lock:
+            self._states.clear()
+            self._dirty.clear()
+            self._loading.clear()
+
+    def reconcile(self, db: Session) -> int:
+        """Reload every state changed since the last pass; return how many had drifted"""
+        with self._lock:
+            user_ids = sorted(self._dirty)
+            self._dirty.clear()
+
+        drifted = 0
+        for user_id in user_ids:
+            fresh = load_user_live_stats(db, user_id)
+            with self._lock:
+                current = self._states.get(user_id)
+                # Newer deltas arrived while loading: leave it for the next pass
+                if current is None or current.last_activity_id > fresh.last_activity_id:
+                    if current is not None:
+                        self._dirty.add(user_id)
+                    continue
+                current.roll_day()
+                if current.counters() != fresh.counters():
+                    drifted += 1
+                    logger.warning(f"Live stats for user {user_id} drifted from the database, corrected")
+                self._states[user_id] = fresh
+        return drifted
+
+    @staticmethod
+    def _catch_up(stats: UserLiveStats, rows: List[Dict[str, Any]]) -> bool:
+        """Apply rows newer than a fresh load; False when it can no longer be trusted"""
+        entries = catalog.entries
+        for row in sorted(rows, key=lambda row: row['id']):
+            if row['id'] <= stats.last_activity_id:
+                continue
+            entry = entries.get(row['question_id'])
+            if entry is None or not stats.apply(row, entry):
+                return False
+        return True
+
+    def _store(self, user_id: int, stats: UserLiveStats) -> None:
+        current = self._states.get(user_id)
+        if current is not None and current.last_activity_id >= stats.last_activity_id:
+            return
+        self._states[user_id] = stats
+        self._states.move_to_end(user_id)
+        while len(self._states) > self.max_users:
+            evicted, _ = self._states.popitem(last=False)
+            self._dirty.discard(evicted)
+
+    async def start(self) -> None:
+        """Start the periodic reconciliation task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                drifted = await asyncio.to_thread(self._reconcile_once)
+                if drifted:
+                    logger.info(f"Live stats reconciliation corrected {drifted} users")
+            except Exception as e:
+                logger.error(f"Live stats reconciliation error: {str(e)}")
+
+    def _reconcile_once(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.reconcile(db)
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+live_stats = LiveStats(settings.live_stats_cache_users, settings.live_stats_reconcile_interval_s)
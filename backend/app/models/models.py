@@ -2,7 +2,7 @@
 SQLAlchemy models for EduTheo application
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Date
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Date, Index, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,6 +22,7 @@ class User(Base):
     full_name = Column(String(100), nullable=True)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    is_teacher = Column(Boolean, default=False, server_default=text("false"), nullable=False)  # may create classes
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -30,6 +31,9 @@ class User(Base):
     ai_queries_today = Column(Integer, default=0, nullable=False)
     last_ai_query_date = Column(Date, nullable=True)
     
+    # IANA zone that daily analytics are bucketed in
+    timezone = Column(String(50), default="UTC", server_default="UTC", nullable=False)
+    
     # Relationships
     activities = relationship("UserActivity", back_populates="user")
     marks = relationship("Mark", back_populates="user")
@@ -66,6 +70,32 @@ class Question(Base):
     # Relationships
     activities = relationship("UserActivity", back_populates="question")
     marks = relationship("Mark", back_populates="question")
+    tag_rows = relationship("QuestionTag", back_populates="question", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Partial index: filtered listings only ever read active questions
+        Index(
+            "ix_questions_active_chapter_difficulty",
+            "chapter_number", "difficulty_level", "id",
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active")
+        ),
+    )
+
+
+class QuestionTag(Base):
+    """Normalized question tags, the inverted index behind tag filters"""
+    __tablename__ = "question_tags"
+    
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    tag = Column(String(50), primary_key=True)
+    
+    # Relationships
+    question = relationship("Question", back_populates="tag_rows")
+    
+    __table_args__ = (
+        Index("ix_question_tags_tag_question_id", "tag", "question_id"),
+    )
 
 
 class UserActivity(Base):
@@ -81,6 +111,8 @@ class UserActivity(Base):
     is_correct = Column(Boolean, nullable=True)
     time_spent = Column(Integer, nullable=True)  # seconds
     attempt_number = Column(Integer, default=1)
+    idempotency_key = Column(String(64), nullable=True)  # client-generated, set by offline batch uploads
+    session_id = Column(Integer, ForeignKey("practice_sessions.id"), nullable=True)  # open session when answered
     
     # Timestamps
     started_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -89,6 +121,222 @@ class UserActivity(Base):
     # Relationships
     user = relationship("User", back_populates="activities")
     question = relationship("Question", back_populates="activities")
+    session = relationship("PracticeSession", back_populates="activities")
+    
+    __table_args__ = (
+        Index("uq_user_activities_user_id_idempotency_key", "user_id", "idempotency_key", unique=True),
+        Index("ix_user_activities_user_id_question_id_id", "user_id", "question_id", "id"),
+        Index("ix_user_activities_user_id_completed_at", "user_id", "completed_at"),
+    )
+
+
+class UserQuestionState(Base):
+    """Per-(user, question) attempt summary, upserted with every answer"""
+    __tablename__ = "user_question_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+
+    attempt_count = Column(Integer, nullable=False, default=0)
+    first_activity_id = Column(Integer, ForeignKey("user_activities.id"), nullable=True)
+    last_activity_id = Column(Integer, ForeignKey("user_activities.id"), nullable=True)
+    first_correct = Column(Boolean, nullable=True)  # accuracy stats use the first attempt
+    last_correct = Column(Boolean, nullable=True)  # review lists use the latest attempt
+
+
+class UserStatsSummary(Base):
+    """Per-user analytics totals, updated in the same transaction as each answer"""
+    __tablename__ = "user_stats_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    questions_attempted = Column(Integer, nullable=False, default=0)  # distinct questions
+    first_correct = Column(Integer, nullable=False, default=0)  # correct on the first attempt
+    total_attempts = Column(Integer, nullable=False, default=0)
+    total_time = Column(Integer, nullable=False, default=0)  # seconds, all attempts
+    last_activity_id = Column(Integer, nullable=False, default=0)  # newest activity counted
+
+    # Streaks, in the order answers were recorded and in the user's local days
+    current_streak = Column(Integer, nullable=False, default=0, server_default="0")  # correct answers in a row
+    longest_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    daily_streak = Column(Integer, nullable=False, default=0, server_default="0")  # consecutive days up to last_practice_day
+    longest_daily_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    last_practice_day = Column(Date, nullable=True)
+
+
+class UserStatsCounter(Base):
+    """Per-user attempt counters by chapter and by difficulty"""
+    __tablename__ = "user_stats_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)  # chapter, difficulty
+    key = Column(String(100), primary_key=True)  # chapter number or difficulty level
+    label = Column(String(100), nullable=True)  # chapter name for chapter rows
+
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)  # correct attempts, not just first ones
+
+
+class UserDailyActivity(Base):
+    """Per-user answer totals for one day in the user's time zone"""
+    __tablename__ = "user_daily_activity"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    time_spent = Column(Integer, nullable=False, default=0)  # seconds
+    first_attempt_correct = Column(Integer, nullable=False, default=0)  # first attempts answered correctly
+
+
+class PracticeSession(Base):
+    """A practice session, with counters updated in the same transaction as each answer"""
+    __tablename__ = "practice_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=True)  # null while the session is open
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)  # latest answer in the session
+
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    time_spent = Column(Integer, nullable=False, default=0)  # seconds
+    chapters_touched = Column(Integer, nullable=False, default=0)
+
+    # Relationships
+    activities = relationship("UserActivity", back_populates="session")
+    chapters = relationship("PracticeSessionChapter", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_practice_sessions_user_id_started_at", "user_id", "started_at"),
+    )
+
+
+class PracticeSessionChapter(Base):
+    """Per-chapter answer counters of one practice session"""
+    __tablename__ = "practice_session_chapters"
+
+    session_id = Column(Integer, ForeignKey("practice_sessions.id"), primary_key=True)
+    chapter_number = Column(Integer, primary_key=True)
+
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+
+class Cohort(Base):
+    """A class of students whose analytics a teacher follows"""
+    __tablename__ = "cohorts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    join_code = Column(String(16), unique=True, index=True, nullable=False)  # students enter it to join
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    stats_stale = Column(Boolean, default=False, nullable=False)  # rebuild every aggregate on the next refresh
+
+    # Relationships
+    members = relationship("CohortMember", back_populates="cohort", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Partial index: refreshes only ever look up stale cohorts
+        Index(
+            "ix_cohorts_stale",
+            "id",
+            sqlite_where=text("stats_stale = 1"),
+            postgresql_where=text("stats_stale")
+        ),
+    )
+
+
+class CohortMember(Base):
+    """Class membership"""
+    __tablename__ = "cohort_members"
+
+    cohort_id = Column(Integer, ForeignKey("cohorts.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    joined_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    cohort = relationship("Cohort", back_populates="members")
+
+    __table_args__ = (
+        Index("ix_cohort_members_user_id_cohort_id", "user_id", "cohort_id"),
+    )
+
+
+class CohortChapterStats(Base):
+    """Class-level totals and mastery for one chapter"""
+    __tablename__ = "cohort_chapter_stats"
+
+    cohort_id = Column(Integer, ForeignKey("cohorts.id"), primary_key=True)
+    chapter_number = Column(Integer, primary_key=True)
+    chapter_name = Column(String(100), nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    students_attempted = Column(Integer, nullable=False, default=0)
+    students_mastered = Column(Integer, nullable=False, default=0)
+
+
+class CohortQuestionStats(Base):
+    """Class-level attempts at one question, for the weakest-question list"""
+    __tablename__ = "cohort_question_stats"
+
+    cohort_id = Column(Integer, ForeignKey("cohorts.id"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+
+    students_attempted = Column(Integer, nullable=False, default=0)
+    first_correct = Column(Integer, nullable=False, default=0)  # students right on their first attempt
+    attempts = Column(Integer, nullable=False, default=0)
+
+
+class CohortDailyActivity(Base):
+    """Class participation on one day, in each student's time zone"""
+    __tablename__ = "cohort_daily_activity"
+
+    cohort_id = Column(Integer, ForeignKey("cohorts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    active_students = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+
+class CohortDashboard(Base):
+    """Rendered class dashboard, replaced by each refresh that touches the class"""
+    __tablename__ = "cohort_dashboards"
+
+    cohort_id = Column(Integer, ForeignKey("cohorts.id"), primary_key=True)
+    payload = Column(JSON, nullable=False)
+    last_activity_id = Column(Integer, nullable=False, default=0)  # high-water mark it reflects
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class CohortRefreshQueue(Base):
+    """
+    Answers not yet folded into the class aggregates. Rows are written in the
+    transaction that records the answer and deleted by the refresh that folds
+    them in, so an answer that commits late is never skipped.
+    """
+    __tablename__ = "cohort_refresh_queue"
+
+    activity_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    question_id = Column(Integer, nullable=False)
+    chapter_number = Column(Integer, nullable=True)
+    day = Column(Date, nullable=True)  # local day of the answer in the user's time zone
+
+
+class CohortAnalyticsState(Base):
+    """Singleton row with the highest activity id folded into the class aggregates, for display"""
+    __tablename__ = "cohort_analytics_state"
+
+    id = Column(Integer, primary_key=True)
+    last_activity_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Mark(Base):
@@ -107,3 +355,35 @@ class Mark(Base):
     # Relationships
     user = relationship("User", back_populates="marks")
     question = relationship("Question", back_populates="marks")
+    
+    __table_args__ = (
+        Index("ix_marks_user_id_mark_type_created_at", "user_id", "mark_type", "created_at"),
+    )
+
+
+class CatalogState(Base):
+    """Singleton row versioning the question catalog"""
+    __tablename__ = "catalog_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CatalogSummary(Base):
+    """Materialized question counts for one catalog version"""
+    __tablename__ = "catalog_summary"
+    
+    id = Column(Integer, primary_key=True)
+    catalog_version = Column(Integer, nullable=False)
+    dimension = Column(String(20), nullable=False)  # chapter, difficulty, tag, total
+    key = Column(String(100), nullable=False)
+    label = Column(String(100), nullable=True)  # chapter name for chapter rows
+    total_questions = Column(Integer, nullable=False, default=0)
+    easy_questions = Column(Integer, nullable=False, default=0)
+    medium_questions = Column(Integer, nullable=False, default=0)
+    hard_questions = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("catalog_version", "dimension", "key", name="uq_catalog_summary_version_dimension_key"),
+    )
@@ -0,0 +1,142 @@
+"""
+Pre-serialized question payloads
+
+Questions only change when the catalog version is bumped, so each question's
+practice view (no answer or explanations) and full view are encoded to JSON
+once with orjson and kept keyed by ``(question id, catalog version)``.
+Endpoints splice the cached bytes straight into a ``Response`` instead of
+building ``QuestionPractice`` / ``QuestionResponse`` models and letting FastAPI
+validate and encode them again on every request.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Question
+from app.schemas.schemas import QuestionResponse
+
+PRACTICE = 0
+FULL = 1
+
+
+def practice_view(question: Question) -> dict:
+    """Practice fields of a question, in ``QuestionPractice`` field order"""
+    return {
+        "id": question.id,
+        "question_id": question.question_id,
+        "question_text": question.question_text,
+        "options": question.options,
+        "hints": question.hints,
+        "chapter_name": question.chapter_name,
+        "chapter_number": question.chapter_number,
+        "difficulty_level": question.difficulty_level,
+        "tags": question.tags
+    }
+
+
+def encode_practice(question: Question) -> bytes:
+    return orjson.dumps(practice_view(question))
+
+
+def encode_full(question: Question) -> bytes:
+    # Encoded through the response schema once so datetimes and defaults match
+    # what FastAPI would have produced for ``response_model=QuestionResponse``
+    return orjson.dumps(QuestionResponse.model_validate(question).model_dump(mode="json"))
+
+
+def json_array(items: Iterable[bytes]) -> bytes:
+    """Join already-encoded JSON values into a JSON array"""
+    return b"[" + b",".join(items) + b"]"
+
+
+def json_object(key: str, items: Iterable[bytes], rest: dict) -> bytes:
+    """Encode ``{key: [items...], **rest}`` around already-encoded items"""
+    head = orjson.dumps({key: None})[:-5]  # '{"key":' without the null and brace
+    tail = orjson.dumps(rest)
+    return head + json_array(items) + (b"," + tail[1:] if rest else b"}")
+
+
+class QuestionPayloadCache:
+    """LRU of encoded practice and full question payloads for one catalog version"""
+
+    def __init__(self, max_questions: int):
+        self.max_questions = max_questions
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[int, List[Optional[bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, question_id: int, version: int, view: int) -> Optional[bytes]:
+        with self._lock:
+            if version != self.version:
+                return None
+            entry = self._entries.get(question_id)
+            if entry is None or entry[view] is None:
+                return None
+            self._entries.move_to_end(question_id)
+            return entry[view]
+
+    def _store(self, question_id: int, version: int, view: int, payload: bytes) -> None:
+        with self._lock:
+            if self.version is None or version > self.version:
+                # Older payloads can never be served again once the catalog moved on
+                self._entries.clear()
+                self.version = version
+            elif version < self.version:
+                return
+            entry = self._entries.setdefault(question_id, [None, None])
+            entry[view] = payload
+            self._entries.move_to_end(question_id)
+            while len(self._entries) > self.max_questions:
+                self._entries.popitem(last=False)
+
+    def _get(self, question: Question, version: int, view: int) -> bytes:
+        payload = self._lookup(question.id, version, view)
+        if payload is None:
+            payload = encode_practice(question) if view == PRACTICE else encode_full(question)
+            self._store(question.id, version, view, payload)
+        return payload
+
+    def practice(self, question: Question, version: int) -> bytes:
+        """Encoded practice view of a loaded question"""
+        return self._get(question, version, PRACTICE)
+
+    def full(self, question: Question, version: int) -> bytes:
+        """Encoded full view of a loaded question"""
+        return self._get(question, version, FULL)
+
+    def full_by_ids(self, db: Session, question_ids: List[int], version: int) -> List[bytes]:
+        """
+        Encoded full views for ``question_ids``. Only questions without a cached
+        payload are loaded from the database; unknown ids are skipped.
+        """
+        found: List[Tuple[int, bytes]] = []
+        missing = []
+        for question_id in question_ids:
+            payload = self._lookup(question_id, version, FULL)
+            if payload is None:
+                missing.append(question_id)
+            else:
+                found.append((question_id, payload))
+
+        if missing:
+            for question in db.query(Question).filter(Question.id.in_(missing)).all():
+                found.append((question.id, self.full(question, version)))
+
+        found.sort(key=lambda item: item[0])
+        return [payload for _, payload in found]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+question_payloads = QuestionPayloadCache(settings.question_payload_cache_size)
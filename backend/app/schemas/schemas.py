@@ -2,9 +2,10 @@
 Pydantic schemas for request/response validation
 """
 
-from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 
 # User schemas
@@ -35,11 +36,26 @@ class UserResponse(UserBase):
     created_at: datetime
     subscription_tier: str
     ai_queries_today: int
+    timezone: str = "UTC"
+    is_superuser: Optional[bool] = False
+    is_teacher: bool = False
     
     class Config:
         from_attributes = True
 
 
+class TimezoneUpdate(BaseModel):
+    timezone: str = Field(..., max_length=50, description="IANA time zone, e.g. Asia/Karachi")
+    
+    @validator('timezone')
+    def validate_timezone(cls, v):
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError('Unknown time zone')
+        return v
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -94,11 +110,25 @@ class QuestionPractice(BaseModel):
     tags: Optional[List[str]] = None
 
 
+class QuestionSearchHit(BaseModel):
+    question: QuestionPractice
+    rank: float  # BM25 score, lower is a better match
+    snippet: str
+
+
+class QuestionSearchResponse(BaseModel):
+    query: str
+    results: List[QuestionSearchHit]
+    limit: int
+    offset: int
+
+
 # Answer schemas
 class AnswerSubmission(BaseModel):
     question_id: int
     user_answer: str
     time_spent: Optional[int] = None  # seconds
+    next: Optional["NextQuestionRequest"] = None  # also pick the next question in the same request
 
 
 class AnswerResponse(BaseModel):
@@ -106,6 +136,33 @@ class AnswerResponse(BaseModel):
     correct_answer: str
     explanation: Optional[str] = None
     user_answer: str
+    next_question: Optional[QuestionPractice] = None  # only when ``next`` was sent and a question matched
+
+
+class OfflineAnswerSubmission(AnswerSubmission):
+    """An answer recorded on the client and uploaded later (``next`` is ignored)"""
+    idempotency_key: str = Field(..., min_length=1, max_length=64)  # unique per user; replays are skipped
+    answered_at: Optional[datetime] = None  # client clock; defaults to upload time
+
+
+class BatchAnswerRequest(BaseModel):
+    answers: List[OfflineAnswerSubmission] = Field(..., min_length=1, max_length=500)
+
+
+class BatchAnswerResult(BaseModel):
+    idempotency_key: str
+    question_id: int
+    status: Literal["recorded", "duplicate", "not_found"]
+    is_correct: Optional[bool] = None
+    correct_answer: Optional[str] = None
+    explanation: Optional[str] = None
+    user_answer: str
+
+
+class BatchAnswerResponse(BaseModel):
+    results: List[BatchAnswerResult]  # same order as the submitted answers
+    recorded: int
+    duplicates: int
 
 
 # Filter schemas
@@ -113,9 +170,37 @@ class QuestionFilter(BaseModel):
     chapter_numbers: Optional[List[int]] = None
     difficulty_levels: Optional[List[str]] = None
     tags: Optional[List[str]] = None
+    tag_match: Literal["any", "all"] = "all"  # match any of, or all of, the tags
     question_types: Optional[List[str]] = None
-    limit: Optional[int] = 10
-    offset: Optional[int] = 0
+    limit: Optional[int] = Field(10, ge=1, le=100)
+    offset: Optional[int] = Field(0, ge=0, le=100000)
+    cursor: Optional[str] = None  # opaque next_cursor from a previous page; overrides offset
+
+
+class NextQuestionRequest(BaseModel):
+    """Which question to serve next, as for ``/get_question``"""
+    filters: QuestionFilter = QuestionFilter()
+    exclude_attempted: bool = False
+
+
+AnswerSubmission.model_rebuild()
+
+
+class PracticeSetRequest(BaseModel):
+    """Request for a deck of distinct practice questions"""
+    filters: QuestionFilter = QuestionFilter()
+    size: int = Field(10, ge=1, le=100)
+    seed: Optional[int] = None  # same seed and filters give the same deck order
+    exclude_attempted: bool = False
+
+
+class PracticeSetResponse(BaseModel):
+    questions: List[QuestionPractice]
+    seed: int
+    total_available: int
+    offset: int
+    next_offset: Optional[int] = None  # offset of the next page; skipped attempted questions count
+    has_more: bool
 
 
 # Mark schemas
@@ -137,6 +222,14 @@ class MarkResponse(BaseModel):
 
 
 # Analytics schemas
+class StreakStats(BaseModel):
+    current_streak: int = 0  # correct answers in a row
+    longest_streak: int = 0
+    daily_streak: int = 0  # consecutive days with practice, 0 once a day is missed
+    longest_daily_streak: int = 0
+    last_practice_day: Optional[str] = None  # ISO date in the user's time zone
+
+
 class UserStats(BaseModel):
     total_questions_attempted: int
     correct_answers: int
@@ -145,6 +238,7 @@ class UserStats(BaseModel):
     average_time_per_question: float
     questions_by_difficulty: Dict[str, int]
     questions_by_chapter: Dict[str, int]
+    streaks: StreakStats = StreakStats()
 
 
 class ChapterProgress(BaseModel):
@@ -159,4 +253,34 @@ class ChapterProgress(BaseModel):
 class AnalyticsResponse(BaseModel):
     user_stats: UserStats
     chapter_progress: List[ChapterProgress]
-    recent_activity: List[Dict[str, Any]]
\ No newline at end of file
+    recent_activity: List[Dict[str, Any]]
+
+
+# Cohort schemas
+class CohortCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+
+
+class CohortResponse(BaseModel):
+    id: int
+    name: str
+    teacher_id: int
+    join_code: str
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class CohortJoin(BaseModel):
+    join_code: str = Field(..., min_length=1, max_length=16)
+
+
+class CohortMembershipResponse(BaseModel):
+    """A class as its students see it (no join code)"""
+    cohort_id: int
+    name: str
+    joined_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
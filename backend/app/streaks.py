@@ -0,0 +1,79 @@
+"""
+Correct-answer and daily-practice streaks
+
+A user's streaks are stored on ``user_stats_summary`` and advance one answer at
+a time: ``answer`` counts correct answers in a row, in the order answers were
+recorded, and ``practice`` counts consecutive days in the user's time zone with
+at least one answer. Both steps are O(1), so ``record_user_activities`` updates
+the stored streaks in the same transaction as the other rollups and
+``LiveStats`` applies the same steps to its in-memory copy.
+
+An answer completed before the last practice day (an offline upload) can join
+two runs of days. ``practice`` reports it, and the caller recounts the daily
+streak from the user's ``user_daily_activity`` rows.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+STREAK_COLUMNS = ('current_streak', 'longest_streak', 'daily_streak', 'longest_daily_streak', 'last_practice_day')
+
+
+class Streaks:
+    """One user's streak state, in the shape of the ``user_stats_summary`` columns"""
+
+    __slots__ = STREAK_COLUMNS
+
+    def __init__(self, current_streak: int = 0, longest_streak: int = 0, daily_streak: int = 0,
+                 longest_daily_streak: int = 0, last_practice_day: Optional[date] = None):
+        self.current_streak = current_streak
+        self.longest_streak = longest_streak
+        self.daily_streak = daily_streak  # consecutive days ending on last_practice_day
+        self.longest_daily_streak = longest_daily_streak
+        self.last_practice_day = last_practice_day
+
+    @classmethod
+    def from_row(cls, row) -> "Streaks":
+        """State from a row with the streak columns, or a fresh one for None"""
+        if row is None:
+            return cls()
+        return cls(*(getattr(row, name) or 0 for name in STREAK_COLUMNS[:-1]), row.last_practice_day)
+
+    def answer(self, is_correct: bool) -> None:
+        self.current_streak = self.current_streak + 1 if is_correct else 0
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+
+    def practice(self, day: date) -> bool:
+        """Count an answer on the local ``day``; False when ``day`` is before the last practice day"""
+        last = self.last_practice_day
+        if last is not None and day <= last:
+            return day == last
+        self.daily_streak = self.daily_streak + 1 if last == day - timedelta(days=1) else 1
+        self.longest_daily_streak = max(self.longest_daily_streak, self.daily_streak)
+        self.last_practice_day = day
+        return True
+
+    def recount_days(self, days: Iterable[date]) -> None:
+        """Replace the daily streaks with ones counted over every practice day, oldest first"""
+        self.daily_streak = self.longest_daily_streak = 0
+        self.last_practice_day = None
+        for day in days:
+            self.practice(day)
+
+    def values(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in STREAK_COLUMNS}
+
+    def payload(self, today: date) -> Dict[str, Any]:
+        """
+        The streaks as the user sees them on their local ``today``: a daily
+        streak is still alive until a whole day passes without practice
+        """
+        last = self.last_practice_day
+        alive = last is not None and last >= today - timedelta(days=1)
+        return {
+            'current_streak': self.current_streak,
+            'longest_streak': self.longest_streak,
+            'daily_streak': self.daily_streak if alive else 0,
+            'longest_daily_streak': self.longest_daily_streak,
+            'last_practice_day': last.isoformat() if last else None
+        }
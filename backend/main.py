@@ -12,12 +12,16 @@ import os
 from pathlib import Path
 
 from app.core.config import settings
-from app.core.database import get_db, engine
+from app.core.database import get_db, engine, init_search_index
 from app.models import models
-from app.api import auth, questions, analytics, ai
+from app.api import auth, questions, analytics, ai, cohorts
+from app.cohort_analytics import cohort_analytics
+from app.ingest import activity_writer
+from app.live_stats import live_stats
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+init_search_index(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -45,11 +49,48 @@ logger.add(
     level="INFO"
 )
 
+@app.on_event("startup")
+async def start_activity_writer():
+    """Start the write-behind writer for answer activity"""
+    await activity_writer.start()
+
+
+@app.on_event("startup")
+async def start_live_stats_reconciler():
+    """Periodically correct live stats against the database"""
+    await live_stats.start()
+
+
+@app.on_event("startup")
+async def start_cohort_analytics():
+    """Periodically fold new answers into the class dashboards"""
+    await cohort_analytics.start()
+
+
+@app.on_event("shutdown")
+async def stop_activity_writer():
+    """Flush queued answer activity before exiting"""
+    await activity_writer.stop()
+
+
+@app.on_event("shutdown")
+async def stop_live_stats_reconciler():
+    """Stop the live stats reconciler"""
+    await live_stats.stop()
+
+
+@app.on_event("shutdown")
+async def stop_cohort_analytics():
+    """Stop the class analytics refresh"""
+    await cohort_analytics.stop()
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(questions.router, prefix="/api/v1/questions", tags=["questions"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
 app.include_router(ai.router, prefix="/api/v1/ai", tags=["ai"])
+app.include_router(cohorts.router, prefix="/api/v1/cohorts", tags=["cohorts"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,139 @@
+"""
+Shared fixtures for the backend test suite
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Make the ``app`` package importable when pytest runs from the backend directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.catalog import attempted_sets, bump_catalog_version, catalog
+from app.core.database import init_search_index
+from app.crud import question as question_crud
+from app.crud.analytics import rebuild_user_stats_rollups
+from app.crud.question import sync_question_tags
+from app.live_stats import live_stats
+from app.models.models import Base, Mark, Question, User, UserActivity, UserQuestionState
+from app.payloads import question_payloads
+from app.schemas.schemas import UserResponse
+
+CHAPTERS = [(1, "Physical Quantities and Measurement"), (2, "Kinematics"), (3, "Dynamics")]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+TAGS = ["units", "motion", "force", "vectors"]
+
+
+def answer(user_id, question_id, is_correct=True, completed_at=None, time_spent=10):
+    """An answer record for ``record_user_activities``, completed now unless ``completed_at`` is given"""
+    return {
+        "user_id": user_id,
+        "question_id": question_id,
+        "user_answer": "a" if is_correct else "b",
+        "is_correct": is_correct,
+        "time_spent": time_spent,
+        "completed_at": completed_at or datetime.utcnow()
+    }
+
+
+@pytest.fixture
+def engine():
+    """Fresh in-memory SQLite database with the full schema"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    init_search_index(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """Session over a small seeded question bank with two users' history"""
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+
+    for number in range(1, 31):
+        chapter_number, chapter_name = CHAPTERS[number % len(CHAPTERS)]
+        question = Question(
+            question_id=f"PHY09-CH{chapter_number:02d}-MCQ{number:04d}",
+            question_text=f"Which unit measures quantity number {number}?",
+            options={"a": "newton", "b": "joule", "c": "watt", "d": "pascal"},
+            correct_answer="a",
+            explanations={"a": "Force is measured in newtons"},
+            hints=["Think about forces"],
+            chapter_name=chapter_name,
+            chapter_number=chapter_number,
+            difficulty_level=DIFFICULTIES[number % len(DIFFICULTIES)],
+            tags=[TAGS[number % len(TAGS)], TAGS[(number + 1) % len(TAGS)]],
+            is_active=number != 30
+        )
+        sync_question_tags(question)
+        session.add(question)
+
+    for name in ("alice", "bob"):
+        session.add(User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True))
+    bump_catalog_version(session)
+    session.commit()
+
+    for user_id in (1, 2):
+        for question_id in range(1, 11):
+            activity = UserActivity(
+                user_id=user_id, question_id=question_id, user_answer="a",
+                is_correct=question_id % 3 != 0, time_spent=20, attempt_number=1
+            )
+            session.add(activity)
+            session.flush()
+            session.add(UserQuestionState(
+                user_id=user_id, question_id=question_id, attempt_count=1,
+                first_activity_id=activity.id, last_activity_id=activity.id,
+                first_correct=activity.is_correct, last_correct=activity.is_correct
+            ))
+        session.add(Mark(user_id=user_id, question_id=3, mark_type="review"))
+    session.commit()
+    rebuild_user_stats_rollups(session)
+
+    # Module-level caches are keyed by versions that restart in every database
+    catalog.clear()
+    question_crud._summary = None
+    question_payloads.clear()
+    for user_id in (1, 2):
+        attempted_sets.discard(user_id)
+        live_stats.discard(user_id)
+
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(engine, db, monkeypatch):
+    """API client over the seeded database, signed in as alice"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import analytics, questions
+    from app.api.auth import get_current_user
+    from app.core import database
+    from app.ingest import activity_writer
+
+    # Route sessions, including run_db and the (not started) activity writer's
+    # direct writes, to the test database
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    monkeypatch.setattr(activity_writer, "session_factory", factory)
+
+    alice = UserResponse.model_validate(db.get(User, 1))
+    app = FastAPI()
+    app.include_router(questions.router, prefix="/api/v1/questions")
+    app.include_router(analytics.router, prefix="/api/v1/analytics")
+    app.dependency_overrides[get_current_user] = lambda: alice
+    with TestClient(app) as client:
+        yield client
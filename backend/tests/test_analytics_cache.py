@@ -0,0 +1,97 @@
+"""
+Analytics responses are cached per user until their next answer
+"""
+
+import asyncio
+from datetime import datetime
+
+import orjson
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics_cache import AnalyticsCache
+from app.core.database import SessionRunner
+from app.crud import analytics as analytics_crud
+
+
+class InlineRunner(SessionRunner):
+    """Runs CRUD on the calling thread; the test database has one connection"""
+
+    async def run(self, fn, *args, **kwargs):
+        return self._run_sync(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def runner(engine, db):
+    return InlineRunner(sessionmaker(bind=engine, autoflush=False))
+
+
+def stats_builder(runner, calls):
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return await runner.run(analytics_crud.get_user_stats, 1)
+    return build
+
+
+def test_hits_until_next_answer(runner, db, monkeypatch):
+    cache = AnalyticsCache(max_entries=100, ttl_s=60)
+    monkeypatch.setattr(analytics_crud, "analytics_cache", cache)
+    calls = []
+
+    async def scenario():
+        first = await cache.fetch(runner, 1, "stats", (), stats_builder(runner, calls))
+        second = await cache.fetch(runner, 1, "stats", (), stats_builder(runner, calls))
+        assert first == second and len(calls) == 1
+
+        analytics_crud.record_user_activities(db, [{
+            "user_id": 1, "question_id": 12, "user_answer": "a", "is_correct": True,
+            "time_spent": 5, "completed_at": datetime.utcnow()
+        }])
+        assert len(cache) == 0
+        third = await cache.fetch(runner, 1, "stats", (), stats_builder(runner, calls))
+        return first, third
+
+    first, third = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert orjson.loads(third)["total_questions_attempted"] == orjson.loads(first)["total_questions_attempted"] + 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    assert stats["bytes"] == len(third)
+
+
+def test_concurrent_misses_share_one_build(runner):
+    cache = AnalyticsCache(max_entries=100, ttl_s=60)
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cache.fetch(runner, 1, "stats", (), stats_builder(runner, calls)) for _ in range(5)
+        ))
+
+    payloads = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert len(set(payloads)) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (0, 1, 4)
+    assert stats["hit_rate"] == 0.0
+
+
+def test_lru_and_ttl_eviction(runner):
+    cache = AnalyticsCache(max_entries=2, ttl_s=60)
+
+    async def value():
+        return {"ok": True}
+
+    async def scenario():
+        for endpoint in ("a", "b", "c"):
+            await cache.fetch(runner, 1, endpoint, (), value)
+
+    asyncio.run(scenario())
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+
+    cache = AnalyticsCache(max_entries=10, ttl_s=-1)  # entries expire as soon as they are stored
+    asyncio.run(scenario())
+    asyncio.run(scenario())
+    assert cache.stats()["expirations"] == 3 and cache.stats()["hits"] == 0
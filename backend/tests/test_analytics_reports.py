@@ -0,0 +1,40 @@
+"""
+Curves in the detailed report, computed from grouped rows
+"""
+
+from collections import namedtuple
+from datetime import date
+
+from app.analytics_reports import hourly_accuracy, improvement_slope, moving_average, time_spent_percentiles
+
+Day = namedtuple("Day", "day total correct time_spent")
+Hour = namedtuple("Hour", "hour total correct")
+Time = namedtuple("Time", "time_spent total")
+
+
+def test_moving_average_weights_the_trailing_week():
+    daily = [Day(date(2025, 5, 1), 4, 2, 0), Day(date(2025, 5, 7), 6, 6, 0), Day(date(2025, 5, 8), 10, 5, 0)]
+    assert [(item["questions_attempted"], item["accuracy"]) for item in moving_average(daily)] == [
+        (4, 50.0), (10, 80.0), (16, 68.8)
+    ]
+
+
+def test_improvement_slope_in_points_per_day():
+    assert improvement_slope([Day(date(2025, 5, 1), 4, 2, 0)]) is None
+    daily = [Day(date(2025, 5, 1), 4, 2, 0), Day(date(2025, 5, 3), 4, 3, 0), Day(date(2025, 5, 5), 4, 4, 0)]
+    assert improvement_slope(daily) == 12.5
+
+
+def test_percentiles_are_nearest_rank():
+    rows = [Time(40, 1), Time(5, 2), Time(12, 7)]
+    assert time_spent_percentiles(rows) == {"p25": 12, "p50": 12, "p75": 12, "p90": 12}
+    assert time_spent_percentiles([Time(5, 1), Time(40, 1)]) == {"p25": 5, "p50": 5, "p75": 40, "p90": 40}
+    assert time_spent_percentiles([]) == {}
+
+
+def test_hourly_accuracy_runs_from_midnight():
+    curve = hourly_accuracy([Hour(14, 4, 3), Hour(2.0, 2, 1)])
+    assert curve == [
+        {"hour": 2, "questions_attempted": 2, "accuracy": 50.0},
+        {"hour": 14, "questions_attempted": 4, "accuracy": 75.0}
+    ]
@@ -0,0 +1,97 @@
+"""
+The in-memory catalog reloads each version once and samples within the filters
+"""
+
+import random
+
+from sqlalchemy import event
+
+from app import catalog as catalog_module
+from app.catalog import Bitset, attempted_sets, bump_catalog_version, catalog, get_catalog_version
+from app.schemas.schemas import QuestionFilter
+
+
+def question_queries(engine, run):
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        if "FROM questions" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+
+def test_concurrent_requests_serve_the_old_snapshot_while_one_loads(engine, db):
+    catalog.ensure_fresh(db)
+    loaded = catalog.version
+    bump_catalog_version(db)
+    db.commit()
+
+    # Another request is already loading the new version
+    catalog._loading = get_catalog_version(db)
+    try:
+        assert question_queries(engine, lambda: catalog.ensure_fresh(db)) == []
+        assert catalog.version == loaded
+    finally:
+        catalog._loading = None
+
+    assert len(question_queries(engine, lambda: catalog.ensure_fresh(db))) == 1
+    assert catalog.version == get_catalog_version(db)
+
+
+def test_sample_stays_within_the_filters_and_skips_excluded_ids(db):
+    snapshot = catalog.ensure_fresh(db)
+    filters = QuestionFilter(chapter_numbers=[2], difficulty_levels=["Medium", "Hard"])
+    matching = snapshot.members(filters)
+    assert len(matching) > 2
+    exclude = Bitset(matching[:-2])
+    rng = random.Random(7)
+
+    picks = {snapshot.sample(filters, exclude, rng) for _ in range(200)}
+    assert picks == set(matching[-2:])
+    for question_id in picks:
+        assert snapshot.matches(snapshot.entries[question_id], filters)
+
+    assert snapshot.sample(filters, Bitset(matching), rng) is None
+
+
+def test_sample_never_returns_attempted_questions(db):
+    snapshot = catalog.ensure_fresh(db)
+    attempted = attempted_sets.get(db, 1)
+    filters = QuestionFilter()
+    rng = random.Random(3)
+
+    picks = {snapshot.sample(filters, attempted, rng) for _ in range(500)}
+    assert picks
+    assert not picks & set(range(1, 11))
+    assert 30 not in picks  # inactive
+
+
+def test_deck_page_is_stable_across_a_rebuild(db):
+    filters = QuestionFilter(difficulty_levels=["Easy", "Hard"])
+    before = catalog.ensure_fresh(db)
+    page = before.deck(filters, seed=11, start=5, size=5)
+
+    bump_catalog_version(db)
+    db.commit()
+    after = catalog.ensure_fresh(db)
+    assert after is not before
+    assert after.version > before.version
+
+    assert after.deck(filters, seed=11, start=5, size=5) == page
+    # The old snapshot is untouched and still answers for readers holding it
+    assert before.deck(filters, seed=11, start=5, size=5) == page
+
+
+def test_filter_cache_evicts_without_losing_entries(db, monkeypatch):
+    monkeypatch.setattr(catalog_module, "MAX_CACHED_FILTERS", 2)
+    snapshot = catalog.ensure_fresh(db)
+    counts = [snapshot.count(QuestionFilter(chapter_numbers=[number])) for number in (1, 2, 3)]
+
+    assert len(snapshot._filter_cache) == 2
+    assert [snapshot.count(QuestionFilter(chapter_numbers=[number])) for number in (1, 2, 3)] == counts
@@ -0,0 +1,32 @@
+"""
+Catalog-backed endpoints answer conditional GETs by catalog version
+"""
+
+from app.catalog import bump_catalog_version
+
+
+def test_current_tag_gets_an_empty_304(client):
+    first = client.get("/api/v1/questions/chapters")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/v1/questions/chapters", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert "max-age" in cached.headers["cache-control"]
+
+    # Weak comparison and tag lists are honoured too
+    assert client.get("/api/v1/questions/tags", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+
+def test_catalog_bump_changes_the_tag(client, db):
+    etag = client.get("/api/v1/questions/chapters").headers["etag"]
+
+    bump_catalog_version(db)
+    db.commit()
+
+    response = client.get("/api/v1/questions/chapters", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["chapters"]
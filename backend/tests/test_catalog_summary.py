@@ -0,0 +1,29 @@
+"""
+Catalog summaries are materialized by the version bump, never by readers
+"""
+
+from app.catalog import catalog, get_catalog_version
+from app.crud import question as question_crud
+from app.models.models import CatalogSummary, Mark
+
+
+def test_stored_summary_matches_catalog(db):
+    question_crud.deactivate_question(db, 6)
+    version = get_catalog_version(db)
+    assert db.query(CatalogSummary).filter(CatalogSummary.catalog_version != version).count() == 0
+
+    summary = question_crud.get_catalog_summary(db)
+    assert summary == catalog.ensure_fresh(db).build_summary()
+    assert summary["total_questions"] == 28
+
+
+def test_summary_read_leaves_the_transaction_open(db):
+    question_crud._summary = None
+    db.query(CatalogSummary).delete()
+    db.add(Mark(user_id=2, question_id=9, mark_type="review"))
+    db.flush()
+
+    assert question_crud.get_catalog_summary(db)["total_questions"] == 29
+    db.rollback()
+    assert db.query(Mark).filter(Mark.question_id == 9).count() == 0
+    assert db.query(CatalogSummary).count() > 0
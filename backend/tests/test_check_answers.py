@@ -0,0 +1,76 @@
+"""
+Offline batch uploads are recorded once per idempotency key, even when replayed concurrently
+"""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+
+from app.api import questions
+from app.core.database import init_search_index
+from app.models.models import Base, UserActivity
+
+BATCH = {"answers": [
+    {"question_id": 11, "user_answer": "a", "time_spent": 5, "idempotency_key": "k-11"},
+    {"question_id": 12, "user_answer": "b", "time_spent": 7, "idempotency_key": "k-12"}
+]}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """File database, so concurrent requests get connections of their own"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    init_search_index(engine)
+    yield engine
+    engine.dispose()
+
+
+def recorded(db):
+    return db.query(UserActivity).filter(UserActivity.idempotency_key.isnot(None)).count()
+
+
+def test_replayed_batch_is_reported_as_duplicates(client, db):
+    first = client.post("/api/v1/questions/check_answers", json=BATCH)
+    assert first.status_code == 200
+    assert (first.json()["recorded"], first.json()["duplicates"]) == (2, 0)
+
+    replay = client.post("/api/v1/questions/check_answers", json=BATCH)
+    assert replay.status_code == 200
+    assert (replay.json()["recorded"], replay.json()["duplicates"]) == (0, 2)
+    assert [result["status"] for result in replay.json()["results"]] == ["duplicate", "duplicate"]
+    assert [result["is_correct"] for result in replay.json()["results"]] == [
+        result["is_correct"] for result in first.json()["results"]
+    ]
+    assert recorded(db) == 2
+
+
+def test_concurrent_uploads_of_one_batch_conflict(client, db, monkeypatch):
+    # Both uploads check for recorded keys before either writes
+    barrier = threading.Barrier(2, timeout=5)
+    lookup = questions.get_activities_by_idempotency_keys
+
+    def checked_together(*args):
+        found = lookup(*args)
+        barrier.wait()
+        return found
+
+    monkeypatch.setattr(questions, "get_activities_by_idempotency_keys", checked_together)
+
+    async def upload_twice():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post("/api/v1/questions/check_answers", json=BATCH) for _ in range(2)
+            ))
+
+    responses = asyncio.run(upload_twice())
+    assert sorted(response.status_code for response in responses) == [200, 409]
+    assert recorded(db) == 2
+
+    monkeypatch.setattr(questions, "get_activities_by_idempotency_keys", lookup)
+    retry = client.post("/api/v1/questions/check_answers", json=BATCH)
+    assert (retry.status_code, retry.json()["duplicates"]) == (200, 2)
@@ -0,0 +1,183 @@
+"""
+Class analytics are folded in incrementally from the answers queued for them
+"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.crud import analytics as analytics_crud
+from app.crud import cohort as cohort_crud
+from app.models.models import (
+    CohortAnalyticsState, CohortChapterStats, CohortDailyActivity, CohortMember, CohortQuestionStats,
+    CohortRefreshQueue, User, UserActivity
+)
+
+from conftest import answer
+
+
+def aggregates(db, cohort_id):
+    return [
+        sorted(
+            tuple(getattr(row, column.name) for column in model.__table__.columns)
+            for row in db.query(model).filter(model.cohort_id == cohort_id)
+        )
+        for model in (CohortChapterStats, CohortQuestionStats, CohortDailyActivity)
+    ]
+
+
+def enroll(db, cohort, *user_ids):
+    for user_id in user_ids:
+        assert cohort_crud.join_cohort(db, cohort.join_code.lower(), user_id).id == cohort.id
+
+
+def add_student(db, name):
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_incremental_refresh_matches_rebuild(db):
+    carol = add_student(db, "carol")
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    enroll(db, cohort, 1, 2, carol)
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+
+    now = datetime.utcnow()
+    analytics_crud.record_user_activities(db, [
+        answer(1, 11, True, now - timedelta(days=2)), answer(2, 11, False), answer(carol, 12, True),
+        answer(1, 3, True), answer(2, 20, True, now - timedelta(days=1))
+    ])
+    analytics_crud.record_user_activities(db, [answer(carol, 11, True), answer(carol, 11, False)])
+    # Two activity ids per pass, so touched keys span several transactions
+    while cohort_crud.refresh_cohort_analytics(db, 2):
+        pass
+    incremental = aggregates(db, cohort.id)
+    assert db.get(CohortAnalyticsState, 1).last_activity_id == db.query(UserActivity.id).order_by(
+        UserActivity.id.desc()
+    ).first()[0]
+
+    cohort_crud.rebuild_cohort_analytics(db, cohort.id)
+    assert aggregates(db, cohort.id) == incremental
+
+    # Caught up: another pass folds nothing in and changes nothing
+    assert cohort_crud.refresh_cohort_analytics(db, 2) == 0
+    assert aggregates(db, cohort.id) == incremental
+
+
+def test_answer_committed_behind_a_higher_id_is_folded_in(db):
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    enroll(db, cohort, 1, 2)
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+
+    # A pass already saw a higher id than the answers below, as happens when
+    # they commit after a later transaction
+    db.get(CohortAnalyticsState, 1).last_activity_id = 10 ** 6
+    db.commit()
+    analytics_crud.record_user_activities(db, [answer(1, 20, False), answer(2, 21, True)])
+    assert cohort_crud.refresh_cohort_analytics(db, 1000) == 2
+    folded = aggregates(db, cohort.id)
+
+    cohort_crud.rebuild_cohort_analytics(db, cohort.id)
+    assert aggregates(db, cohort.id) == folded
+    assert db.query(CohortRefreshQueue).count() == 0
+
+
+def test_dashboard_mastery_weakest_and_participation(db):
+    carol = add_student(db, "carol")
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    enroll(db, cohort, 1, 2, carol)
+
+    # Question 12 is missed first time by everyone; carol masters chapter 1 (questions 3, 6, 9, ...)
+    analytics_crud.record_user_activities(db, [answer(user_id, 12, False) for user_id in (1, 2, carol)])
+    analytics_crud.record_user_activities(db, [answer(carol, question_id, True) for question_id in (3, 6, 9, 15, 18)])
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+
+    dashboard = cohort_crud.get_cohort_dashboard(db, cohort.id)
+    assert dashboard["students"] == 3
+    chapters = {chapter["chapter_number"]: chapter for chapter in dashboard["chapters"]}
+    assert chapters[1]["students_mastered"] == 1
+    assert chapters[1]["mastery_percentage"] == round(1 / 3 * 100, 1)
+
+    weakest = dashboard["weakest_questions"][0]
+    assert (weakest["question_id"], weakest["first_attempt_accuracy"]) == ("PHY09-CH01-MCQ0012", 0)
+
+    today = dashboard["participation"][-1]
+    assert today["date"] == datetime.utcnow().date().isoformat()
+    assert (today["active_students"], today["questions_attempted"]) == (3, 8)
+    assert dashboard["last_activity_id"] == db.get(CohortAnalyticsState, 1).last_activity_id
+
+
+def test_membership_changes_rebuild_the_class(db):
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    enroll(db, cohort, 1)
+    assert cohort_crud.get_cohort_dashboard(db, cohort.id)["students"] == 1
+    assert cohort.stats_stale is False
+
+    # Bob's earlier answers count once he joins, and stop counting when he leaves
+    enroll(db, cohort, 2, 2)
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+    assert cohort_crud.get_cohort_dashboard(db, cohort.id)["students"] == 2
+    assert sum(row[4] for row in aggregates(db, cohort.id)[1]) == 20
+
+    assert cohort_crud.remove_cohort_member(db, cohort.id, 2)
+    assert not cohort_crud.remove_cohort_member(db, cohort.id, 2)
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+    assert sum(row[4] for row in aggregates(db, cohort.id)[1]) == 10
+
+    # Only the teacher sees the class
+    assert cohort_crud.get_cohort_for_teacher(db, cohort.id, 2) is None
+    analytics_crud.reset_user_analytics(db, 1)
+    db.expire_all()
+    assert cohort.stats_stale is True
+
+
+def test_students_join_with_the_current_code(db):
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    assert cohort_crud.join_cohort(db, "NOSUCHCODE", 2) is None
+
+    old_code = cohort.join_code
+    cohort_crud.reset_join_code(db, cohort.id)
+    assert cohort.join_code != old_code
+    assert cohort_crud.join_cohort(db, old_code, 2) is None
+    assert cohort_crud.join_cohort(db, f" {cohort.join_code} ", 2).id == cohort.id
+    assert db.query(CohortMember).filter(CohortMember.cohort_id == cohort.id).count() == 1
+
+
+def test_participation_window_ends_on_the_teachers_local_today(db):
+    # A zone whose date differs from UTC's right now, so a UTC window would be off by a day
+    zone = "Pacific/Kiritimati" if datetime.utcnow().hour >= 10 else "Pacific/Pago_Pago"
+    carol = add_student(db, "carol")
+    for user_id in (1, carol):
+        db.get(User, user_id).timezone = zone
+    db.commit()
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    enroll(db, cohort, carol)
+
+    # Answers just outside, on the first and on the last day of the window
+    now, window = datetime.utcnow(), cohort_crud.PARTICIPATION_DAYS
+    analytics_crud.record_user_activities(db, [
+        answer(carol, 11, completed_at=now - timedelta(days=days)) for days in (window, window - 1, 0)
+    ])
+    cohort_crud.rebuild_cohort_analytics(db, cohort.id)
+
+    local_today = datetime.now(ZoneInfo(zone)).date()
+    days = [day["date"] for day in cohort_crud.get_cohort_dashboard(db, cohort.id)["participation"]]
+    assert days == [
+        (local_today - timedelta(days=window - 1)).isoformat(),
+        local_today.isoformat()
+    ]
+
+
+def test_students_list_and_leave_their_classes(db):
+    first = cohort_crud.create_cohort(db, 1, "9-A")
+    second = cohort_crud.create_cohort(db, 1, "9-B")
+    enroll(db, first, 2)
+    enroll(db, second, 2)
+
+    joined = cohort_crud.get_student_cohorts(db, 2)
+    assert [(row.cohort_id, row.name) for row in joined] == [(first.id, "9-A"), (second.id, "9-B")]
+    assert cohort_crud.get_student_cohorts(db, 1) == []
+
+    assert cohort_crud.remove_cohort_member(db, first.id, 2)
+    assert [row.cohort_id for row in cohort_crud.get_student_cohorts(db, 2)] == [second.id]
@@ -0,0 +1,56 @@
+"""
+The NumPy analytics engine must reproduce the SQL reports exactly
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.crud import analytics as analytics_crud
+from app.crud import user as user_crud
+
+np = pytest.importorskip("numpy")
+
+
+def history(user_id, count, days, seed=3):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {
+            "user_id": user_id,
+            "question_id": rng.randint(1, 30),
+            "user_answer": "a",
+            "is_correct": rng.random() < 0.7,
+            "time_spent": rng.choice([None, 5, 12, 40]),
+            "completed_at": now - timedelta(minutes=rng.randint(0, (days - 2) * 24 * 60))
+        }
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("timezone", ["UTC", "America/New_York", "Asia/Kathmandu"])
+def test_numpy_engine_matches_sql(db, monkeypatch, timezone):
+    user_crud.set_user_timezone(db, 1, timezone)
+    analytics_crud.record_user_activities(db, history(1, 400, 365))
+
+    reports = {}
+    for engine in ("sql", "numpy"):
+        monkeypatch.setattr(settings, "analytics_engine", engine)
+        reports[engine] = [
+            analytics_crud.get_detailed_analytics(db, 1, days)
+            for days in (7, 30, 365)
+        ] + [analytics_crud.get_performance_trends(db, 1, 90)]
+
+    assert reports["numpy"] == reports["sql"]
+    assert reports["sql"][2]["insights"]["peak_performance_hour"] is not None
+    curves = reports["sql"][2]["curves"]
+    assert curves["hourly_accuracy"] and curves["moving_average"] and curves["improvement_slope"] is not None
+    assert set(curves["time_spent_percentiles"]) == {"p25", "p50", "p75", "p90"}
+
+
+def test_numpy_engine_without_answers(db, monkeypatch):
+    monkeypatch.setattr(settings, "analytics_engine", "numpy")
+    assert analytics_crud.get_performance_trends(db, 2, 30) == []
+    assert analytics_crud.get_detailed_analytics(db, 2, 30)["trends"] == []
@@ -0,0 +1,104 @@
+"""
+Daily activity rollups: updated per answer, bucketed in the user's time zone
+"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.analytics_reports import local_time
+from app.crud import analytics as analytics_crud
+from app.crud import user as user_crud
+from app.live_stats import live_stats
+from app.models.models import User, UserActivity, UserDailyActivity
+
+from conftest import answer
+
+
+def daily_rows(db):
+    return sorted(
+        (row.user_id, row.day, row.total, row.correct, row.time_spent, row.first_attempt_correct)
+        for row in db.query(UserDailyActivity)
+    )
+
+
+def test_incremental_days_match_rebuild(db):
+    now = datetime.utcnow()
+    analytics_crud.record_user_activities(db, [
+        answer(1, 11, True, now - timedelta(days=3)), answer(1, 11, False, now - timedelta(days=3)),
+        answer(2, 3, False, now, None), answer(1, 29, True, now - timedelta(days=1))
+    ])
+    analytics_crud.record_user_activities(db, [answer(1, 2, True, now), answer(1, 12, True, now)])
+    incremental = daily_rows(db)
+    assert [row[2:] for row in incremental if row[0] == 1] == [(2, 1, 20, 1), (1, 1, 10, 1), (2, 2, 20, 1)]
+
+    analytics_crud.rebuild_user_daily_activity(db)
+    assert daily_rows(db) == incremental
+
+    trends = analytics_crud.get_performance_trends(db, 1, days=7)
+    assert [trend["questions_attempted"] for trend in trends] == [2, 1, 2]
+    assert analytics_crud.get_performance_trends(db, 1, days=2)[0]["date"] == (now - timedelta(days=1)).date().isoformat()
+
+    detailed = analytics_crud.get_detailed_analytics(db, 1, days=7)
+    assert detailed["patterns"]["consistency_score"] == round(3 / 7 * 100, 1)
+    assert detailed["insights"]["total_practice_time"] == 50
+    assert detailed["insights"]["average_session_length"] == 0  # no practice sessions were started
+    assert detailed["trends"] == trends
+
+
+def test_days_follow_user_timezone(db):
+    # 23:30 UTC is already the next day in Karachi (UTC+5)
+    late = datetime.utcnow().replace(hour=23, minute=30) - timedelta(days=2)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True, late)])
+    assert [row[1] for row in daily_rows(db)] == [late.date()]
+
+    user = user_crud.set_user_timezone(db, 1, "Asia/Karachi")
+    assert user.timezone == "Asia/Karachi"
+    assert [row[1] for row in daily_rows(db)] == [late.date() + timedelta(days=1)]
+
+    analytics_crud.record_user_activities(db, [answer(1, 12, False, late)])
+    assert [row[1:4] for row in daily_rows(db)] == [(late.date() + timedelta(days=1), 2, 1)]
+
+
+def test_local_hour_follows_daylight_saving(db):
+    # New York moved from UTC-5 to UTC-4 at 2025-03-09 07:00 UTC
+    zone = ZoneInfo("America/New_York")
+    times = [datetime(2025, 3, 9, 6, 59, 59), datetime(2025, 3, 9, 7, 0), datetime(2025, 3, 12, 15, 30)]
+    analytics_crud.record_user_activities(db, [answer(1, 11 + i, True, at) for i, at in enumerate(times)])
+
+    hour = analytics_crud._local_hour(db, UserActivity.completed_at, zone, datetime(2025, 3, 1), datetime(2025, 4, 1))
+    hours = db.query(hour).filter(UserActivity.completed_at >= times[0]).order_by(UserActivity.id).all()
+    assert [row[0] for row in hours] == [local_time(at, zone).hour for at in times] == [1, 3, 11]
+
+
+def test_today_is_the_users_local_day(db):
+    # UTC+14: the local day never starts at UTC midnight
+    zone = ZoneInfo("Pacific/Kiritimati")
+    analytics_crud.reset_user_analytics(db, 1)
+    user_crud.set_user_timezone(db, 1, "Pacific/Kiritimati")
+    local_midnight = datetime.combine(datetime.now(zone).date(), datetime.min.time(), zone)
+    midnight = local_midnight.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+    analytics_crud.record_user_activities(db, [
+        answer(1, 11, True, midnight - timedelta(minutes=1)), answer(1, 12, False, midnight + timedelta(minutes=1))
+    ])
+
+    today = analytics_crud.load_dashboard(db, 1, recent_limit=0)["today"]
+    assert (today["questions_attempted"], today["correct_answers"]) == (1, 0)
+    assert live_stats.get(db, 1)["today"] == analytics_crud.get_real_time_stats(db, 1)["today"]
+    assert live_stats.get(db, 1)["today"]["questions_attempted"] == 1
+
+
+def test_failed_rebuild_keeps_the_old_timezone(db, monkeypatch):
+    analytics_crud.record_user_activities(db, [answer(1, 11, True, datetime.utcnow() - timedelta(days=2))])
+    before = daily_rows(db), db.get(User, 1).timezone
+
+    def fail(db, user_id):
+        raise RuntimeError("rebuild failed")
+
+    monkeypatch.setattr(analytics_crud, "_mark_cohorts_stale", fail)
+    with pytest.raises(RuntimeError):
+        user_crud.set_user_timezone(db, 1, "Asia/Karachi")
+    db.rollback()
+
+    assert (daily_rows(db), db.get(User, 1).timezone) == before
@@ -0,0 +1,57 @@
+"""
+The analytics dashboard loads in a fixed number of queries
+"""
+
+from sqlalchemy import event
+
+from app.crud import analytics as analytics_crud
+from app.crud import question as question_crud
+from app.live_stats import live_stats
+
+from conftest import answer
+
+
+def count_queries(engine, func):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return result, len(statements)
+
+
+def test_dashboard_query_count(engine, db):
+    analytics_crud.record_user_activities(db, [answer(1, 11, False), answer(1, 12, True), answer(1, 13, True)])
+    question_crud.get_catalog_summary(db)
+
+    dashboard, queries = count_queries(engine, lambda: analytics_crud.load_dashboard(db, 1))
+    assert queries == 2
+
+    # Same shapes and values as the separate reads it replaces
+    assert dashboard["user_stats"] == analytics_crud.get_user_stats(db, 1)
+    assert dashboard["chapter_progress"] == analytics_crud.get_chapter_progress(db, 1)
+    assert dashboard["recent_activity"] == analytics_crud.get_recent_activity(db, 1, limit=20)
+    assert dashboard["today"]["questions_attempted"] == 3
+    assert dashboard["today"]["current_streak"] == 2
+
+    # Real-time stats come from the same snapshot and agree with the live counters
+    realtime, queries = count_queries(engine, lambda: analytics_crud.get_real_time_stats(db, 1))
+    assert queries == 1
+    live = live_stats.get(db, 1)
+    for payload in (realtime, live):
+        payload.pop("last_updated")
+    assert realtime == live
+
+
+def test_dashboard_for_new_user(engine, db):
+    analytics_crud.reset_user_analytics(db, 2)
+    dashboard = analytics_crud.load_dashboard(db, 2)
+    assert dashboard["user_stats"]["total_questions_attempted"] == 0
+    assert dashboard["recent_activity"] == []
+    assert dashboard["today"]["current_streak"] == 0
+    assert all(chapter["attempted_questions"] == 0 for chapter in dashboard["chapter_progress"])
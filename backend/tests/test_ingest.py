@@ -0,0 +1,52 @@
+"""
+The write-behind writer isolates records it cannot write instead of dropping batches
+"""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.ingest import ActivityWriteError, ActivityWriter
+from app.models.models import UserActivity
+
+from conftest import answer
+
+
+@pytest.fixture
+def writer(engine, tmp_path):
+    return ActivityWriter(10, 5, 100, str(tmp_path / "dead.jsonl"), sessionmaker(bind=engine))
+
+
+def test_bad_record_is_isolated_and_reported(db, writer):
+    notified = []
+
+    async def listener(user_ids):
+        notified.extend(user_ids)
+
+    writer.add_listener(listener)
+    before = db.query(UserActivity).count()
+
+    async def scenario():
+        await writer.start()
+        for record in (answer(1, 11), answer(2, None), answer(2, 12), answer(1, 13)):
+            await writer.submit(record)
+        await writer.wait_for_user(1)
+        with pytest.raises(ActivityWriteError):
+            await writer.wait_for_user(2)
+        await writer.wait_for_user(2)  # reported once
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert db.query(UserActivity).count() == before + 3
+    assert sorted(set(notified)) == [1, 2]
+
+    dead = [json.loads(line) for line in writer.dead_letter_path.read_text().splitlines()]
+    assert [(entry["record"]["user_id"], entry["record"]["question_id"]) for entry in dead] == [(2, None)]
+
+
+def test_synchronous_write_failure_raises(db, writer):
+    with pytest.raises(ActivityWriteError):
+        asyncio.run(writer.submit(answer(1, None)))
+    assert not writer.dead_letter_path.exists()
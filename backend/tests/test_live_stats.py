@@ -0,0 +1,71 @@
+"""
+Live stats must match a full recompute from the database
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.catalog import catalog
+from app.crud import analytics as analytics_crud
+from app.live_stats import live_stats, load_user_live_stats
+
+from conftest import answer
+
+
+def comparable(stats):
+    return {key: value for key, value in stats.items() if key != "last_updated"}
+
+
+def test_deltas_match_recompute(db):
+    catalog.ensure_fresh(db)
+    live_stats.get(db, 1)
+
+    analytics_crud.record_user_activities(db, [answer(1, 11, True), answer(1, 12, True)])
+    analytics_crud.record_user_activities(db, [answer(1, 11, False, time_spent=None), answer(1, 2, True)])
+    analytics_crud.record_user_activities(db, [answer(1, 13, True)])
+
+    assert len(live_stats._dirty) == 1
+    assert comparable(live_stats.get(db, 1)) == comparable(analytics_crud.get_real_time_stats(db, 1))
+    assert live_stats.get(db, 1)["today"]["current_streak"] == 2
+
+
+def test_backdated_answer_reloads(db):
+    catalog.ensure_fresh(db)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True)])
+    live_stats.get(db, 1)
+
+    analytics_crud.record_user_activities(db, [answer(1, 12, False, datetime.utcnow() - timedelta(days=2))])
+
+    assert 1 not in live_stats._states
+    assert comparable(live_stats.get(db, 1)) == comparable(analytics_crud.get_real_time_stats(db, 1))
+
+
+def test_reconcile_corrects_drift(db):
+    catalog.ensure_fresh(db)
+    live_stats.get(db, 1)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True)])
+
+    live_stats._states[1].attempts += 5
+    assert live_stats.reconcile(db) == 1
+    assert live_stats.reconcile(db) == 0
+    assert comparable(live_stats.get(db, 1)) == comparable(analytics_crud.get_real_time_stats(db, 1))
+
+
+def test_answer_committed_while_loading_is_applied(engine, db):
+    catalog.ensure_fresh(db)
+    expected = load_user_live_stats(db, 1).attempts + 1
+    row = {**answer(1, 11, True), "id": 10 ** 6, "attempt_number": 2}
+
+    # The answer commits after the load read the rollups, before it stored them
+    def commit_answer(*args):
+        if 1 not in live_stats._states:
+            live_stats.apply([row])
+
+    event.listen(engine, "before_cursor_execute", commit_answer)
+    try:
+        live_stats.get(db, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", commit_answer)
+    assert live_stats._states[1].attempts == expected
+    assert 1 in live_stats._dirty
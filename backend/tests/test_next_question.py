@@ -0,0 +1,45 @@
+"""
+Answers can carry the next question, picked under the submitted filters
+"""
+
+from app.catalog import catalog
+from app.schemas.schemas import QuestionFilter
+
+
+def submit(client, question_id, filters):
+    response = client.post("/api/v1/questions/check_answer", json={
+        "question_id": question_id,
+        "user_answer": "a",
+        "time_spent": 10,
+        "next": {"filters": filters, "exclude_attempted": True}
+    })
+    assert response.status_code == 200
+    return response.json()["next_question"]
+
+
+def test_next_question_is_unattempted_and_matches_until_the_pool_is_exhausted(client, db):
+    filters = {"chapter_numbers": [2], "difficulty_levels": ["Medium"]}
+    pool = set(catalog.ensure_fresh(db).members(QuestionFilter(**filters)))
+    remaining = pool - set(range(1, 11))  # alice attempted 1 to 10
+    assert len(remaining) > 1
+
+    question_id = min(remaining)
+    answered = [question_id]
+    while True:
+        upcoming = submit(client, question_id, filters)
+        if upcoming is None:
+            break
+        assert upcoming["id"] in remaining
+        assert upcoming["id"] not in answered
+        assert upcoming["chapter_number"] == 2 and upcoming["difficulty_level"] == "Medium"
+        assert "correct_answer" not in upcoming
+        question_id = upcoming["id"]
+        answered.append(question_id)
+
+    assert set(answered) == remaining
+
+
+def test_no_next_question_without_a_request(client):
+    response = client.post("/api/v1/questions/check_answer", json={"question_id": 11, "user_answer": "a"})
+    assert response.status_code == 200
+    assert response.json()["next_question"] is None
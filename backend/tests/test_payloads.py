@@ -0,0 +1,25 @@
+"""
+Cached question payloads are replaced once a question edit bumps the catalog
+"""
+
+from app.catalog import bump_catalog_version
+from app.models.models import Question
+
+
+def served_text(client, question_id):
+    review = {question["id"]: question for question in client.get("/api/v1/questions/review/attempted").json()}
+    practice = client.post("/api/v1/questions/filter", json={"chapter_numbers": [2], "limit": 100}).json()
+    listed = {question["id"]: question for question in practice["questions"]}
+    return review[question_id]["question_text"], listed[question_id]["question_text"]
+
+
+def test_edit_is_served_after_the_catalog_bump(client, db):
+    original = db.get(Question, 1).question_text
+    assert served_text(client, 1) == (original, original)
+
+    question = db.get(Question, 1)
+    question.question_text = "Which unit measures force?"
+    bump_catalog_version(db)
+    db.commit()
+
+    assert served_text(client, 1) == ("Which unit measures force?", "Which unit measures force?")
@@ -0,0 +1,69 @@
+"""
+Practice sessions: answers are stamped at write time and counted per session
+"""
+
+from datetime import timedelta
+
+from app.core.config import settings
+from app.crud import analytics as analytics_crud
+from app.models.models import PracticeSession, UserActivity
+
+from conftest import answer
+
+
+def test_session_counters_and_summary(db):
+    session = analytics_crud.record_session_start(db, 1)
+    # Question 3 is in chapter 1, questions 4 and 7 in chapter 2
+    analytics_crud.record_user_activities(db, [answer(1, 3, True), answer(2, 4, True), answer(1, 4, False)])
+    analytics_crud.record_user_activities(db, [answer(1, 7, True, time_spent=None)])
+
+    stamped = db.query(UserActivity.user_id, UserActivity.session_id).filter(UserActivity.session_id.isnot(None)).all()
+    assert sorted(stamped) == [(1, session.id)] * 3
+
+    summary = analytics_crud.record_session_end(db, 1, session.id)
+    assert summary["session_id"] == session.id
+    assert (summary["questions_answered"], summary["correct_answers"], summary["time_spent"]) == (3, 2, 20)
+    assert summary["accuracy"] == round(2 / 3 * 100, 1)
+    assert summary["chapters_touched"] == 2
+    assert [(chapter["chapter_number"], chapter["questions_answered"]) for chapter in summary["chapters"]] == [(1, 1), (2, 2)]
+    assert summary["duration"] >= 0
+
+    # Ended sessions take no more answers, and other users cannot end them
+    analytics_crud.record_user_activities(db, [answer(1, 3, True)])
+    assert db.get(PracticeSession, session.id).answered == 3
+    assert analytics_crud.record_session_end(db, 2, session.id) is None
+
+
+def test_idle_and_earlier_answers_are_not_stamped(db):
+    session = analytics_crud.record_session_start(db, 1)
+    idle = timedelta(seconds=settings.practice_session_idle_timeout_s + 60)
+    analytics_crud.record_user_activities(db, [
+        answer(1, 3, True, session.started_at - timedelta(minutes=5)),
+        answer(1, 4, True),
+        answer(1, 5, True, session.started_at + idle + timedelta(minutes=1))
+    ])
+    assert db.get(PracticeSession, session.id).answered == 1
+
+    # Starting again ends the open session at its last answer
+    last_activity_at = db.get(PracticeSession, session.id).last_activity_at
+    analytics_crud.record_session_start(db, 1)
+    db.expire_all()
+    assert db.get(PracticeSession, session.id).ended_at == last_activity_at
+
+
+def test_detailed_session_length_comes_from_sessions(db):
+    analytics_crud.reset_user_analytics(db, 1)
+    for questions in ([3, 4], [5]):
+        session = analytics_crud.record_session_start(db, 1)
+        analytics_crud.record_user_activities(db, [
+            answer(1, question_id, True, time_spent=50 // len(questions)) for question_id in questions
+        ])
+        analytics_crud.record_session_end(db, 1, session.id)
+    analytics_crud.record_session_start(db, 1)  # no answers: not counted
+
+    insights = analytics_crud.get_detailed_analytics(db, 1, days=7)["insights"]
+    assert insights["practice_sessions"] == 2
+    assert insights["average_session_length"] == 50.0
+
+    analytics_crud.reset_user_analytics(db, 1)
+    assert db.query(PracticeSession).filter(PracticeSession.user_id == 1).count() == 0
@@ -0,0 +1,79 @@
+"""
+Practice decks page by seed, with and without attempted questions
+"""
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event
+
+from app.catalog import AttemptedSets, attempted_sets
+from app.crud import question as question_crud
+from app.schemas.schemas import QuestionFilter
+
+
+def page(db, offset, exclude_attempted=False, size=5):
+    return question_crud.get_practice_set(
+        db, QuestionFilter(offset=offset), size, seed=7, user_id=1, exclude_attempted=exclude_attempted
+    )
+
+
+def ids(questions):
+    return [question.id for question in questions]
+
+
+def test_pages_cover_the_deck_once(db):
+    deck, total, next_offset = page(db, 0, size=100)
+    assert (len(deck), next_offset) == (total, None)
+
+    seen, offset = [], 0
+    while offset is not None:
+        questions, _, offset = page(db, offset)
+        seen += ids(questions)
+    assert seen == ids(deck)
+
+
+def test_paging_without_attempted_is_stable_while_answering(db):
+    # Questions 1 to 10 are already attempted by the seeded history
+    first, total, next_offset = page(db, 0, exclude_attempted=True)
+    assert total == 19 and not set(ids(first)) & set(range(1, 11))
+
+    # Answering the first page must not shift the second
+    expected, _, _ = page(db, next_offset, exclude_attempted=True)
+    for question in first:
+        attempted_sets.add(1, question.id)
+    second, total, _ = page(db, next_offset, exclude_attempted=True)
+    assert ids(second) == ids(expected)
+    assert total == 14
+
+
+def test_offset_must_not_be_negative():
+    with pytest.raises(ValidationError):
+        QuestionFilter(offset=-5)
+
+
+def test_attempt_added_while_loading_is_kept(engine, db):
+    sets = AttemptedSets(10)
+
+    # An answer for question 25 is queued while the set is being loaded
+    def queue_answer(*args):
+        sets.add(1, 25)
+
+    event.listen(engine, "before_cursor_execute", queue_answer)
+    try:
+        assert 25 in sets.get(db, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", queue_answer)
+    assert 25 in sets.get(db, 1)
+
+
+def test_endpoint_serves_practice_views_of_the_deck(client, db):
+    deck, total, next_offset = page(db, 0)
+    response = client.post("/api/v1/questions/practice_set", json={
+        "filters": {"offset": 0}, "size": 5, "seed": 7, "exclude_attempted": False
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert [question["id"] for question in body["questions"]] == ids(deck)
+    assert (body["total_available"], body["next_offset"]) == (total, next_offset)
+    assert "correct_answer" not in body["questions"][0]
+    assert body["questions"][0]["options"] == deck[0].options
@@ -0,0 +1,245 @@
+"""
+Query-plan regression tests
+
+Every CRUD query is captured while it runs against SQLite and replayed
+through ``EXPLAIN QUERY PLAN``. A test fails when a plan scans a table
+instead of searching an index, unless the scan is listed in ``ALLOWED_SCANS``
+with the reason it is intentional.
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.catalog import attempted_sets, bump_catalog_version, catalog, get_catalog_version
+from app.crud import analytics as analytics_crud
+from app.crud import cohort as cohort_crud
+from app.crud import question as question_crud
+from app.crud import user as user_crud
+from app.live_stats import load_user_live_stats
+from app.models.models import Base
+from app.schemas.schemas import AnswerSubmission, QuestionCreate, QuestionFilter, UserCreate
+
+TABLES = set(Base.metadata.tables)
+SCAN = re.compile(r"^SCAN (\w+)")
+
+# A catalog version bump materializes the new version's summary counts
+CATALOG_BUMP = {
+    "questions": "counts the active questions for the new version's summary",
+    "question_tags": "counts the active questions per tag for the new version's summary",
+    "catalog_summary": "prunes rows of older versions once per catalog version",
+}
+COHORT_REFRESH = {
+    "cohorts": "walks the partial index that holds only stale cohorts",
+    "cohort_refresh_queue": "takes the oldest queued answers in primary-key order, up to the batch size",
+}
+
+# Scans that are expected, with the reason they do not grow with a user's request
+ALLOWED_SCANS = {
+    "catalog.load": {
+        "questions": "loads every active question once per catalog version",
+    },
+    "create_question": CATALOG_BUMP,
+    "deactivate_question": CATALOG_BUMP,
+    "bump_catalog_version": CATALOG_BUMP,
+    "get_leaderboard": {"users": "ranks every active user by design"},
+    "verify_user_by_code": {"users": "placeholder verification picks any inactive user"},
+    "refresh_cohort_analytics": COHORT_REFRESH,
+    "get_cohort_dashboard": COHORT_REFRESH,
+}
+
+
+@contextmanager
+def captured_statements(engine):
+    """Collect ``(sql, parameters)`` for everything executed on ``engine``"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if executemany and parameters and isinstance(parameters[0], (list, tuple)):
+            parameters = parameters[0]  # one parameter set is enough for the plan
+        statements.append((statement, tuple(parameters)))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def table_scans(engine, statements):
+    """``(table, plan line, sql)`` for every full scan of a real table"""
+    scans = []
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for statement, parameters in statements:
+            if statement.lstrip().split(None, 1)[0].upper() not in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+                continue
+            for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall():
+                detail = row[-1]
+                match = SCAN.match(detail)
+                if match and match.group(1) in TABLES and "VIRTUAL TABLE" not in detail:
+                    scans.append((match.group(1), detail, " ".join(statement.split())))
+    finally:
+        connection.close()
+    return scans
+
+
+def assert_no_scans(engine, statements, case):
+    assert statements, f"{case} ran no queries"
+    allowed = ALLOWED_SCANS.get(case, {})
+    unexpected = [scan for scan in table_scans(engine, statements) if scan[0] not in allowed]
+    assert not unexpected, f"{case} scans: " + "; ".join(f"{detail} in {sql}" for _, detail, sql in unexpected)
+
+
+def submission(question_id, answer="a"):
+    return AnswerSubmission(question_id=question_id, user_answer=answer, time_spent=15)
+
+
+def activity_record(user_id, question_id, key=None):
+    return {
+        "user_id": user_id,
+        "question_id": question_id,
+        "user_answer": "b",
+        "is_correct": False,
+        "time_spent": 12,
+        "completed_at": datetime.utcnow(),
+        "idempotency_key": key
+    }
+
+
+def record_in_session(db):
+    analytics_crud.record_session_start(db, 1)
+    analytics_crud.record_user_activities(db, [activity_record(1, 2), activity_record(1, 7)])
+
+
+def refresh_cohort(db):
+    cohort = cohort_crud.create_cohort(db, 1, "9-A")
+    for user_id in (1, 2):
+        cohort_crud.join_cohort(db, cohort.join_code, user_id)
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+    analytics_crud.record_user_activities(db, [activity_record(1, 2), activity_record(2, 7)])
+    cohort_crud.refresh_cohort_analytics(db, 1000)
+    return cohort
+
+
+CASES = {
+    # Questions
+    "get_question_by_id": lambda db: question_crud.get_question_by_id(db, 4),
+    "get_questions_by_ids": lambda db: question_crud.get_questions_by_ids(db, [1, 5, 9]),
+    "get_question_by_question_id": lambda db: question_crud.get_question_by_question_id(db, "PHY09-CH02-MCQ0004"),
+    "get_questions_filtered": lambda db: question_crud.get_questions_filtered(
+        db, QuestionFilter(chapter_numbers=[2], difficulty_levels=["Hard", "Easy"], limit=5)
+    ),
+    "get_questions_filtered.cursor": lambda db: question_crud.get_questions_filtered(
+        db, QuestionFilter(
+            chapter_numbers=[1, 2], limit=2,
+            cursor=question_crud.encode_cursor(4, QuestionFilter(chapter_numbers=[1, 2]))
+        )
+    ),
+    "get_questions_filtered.tags_all": lambda db: question_crud.get_questions_filtered(
+        db, QuestionFilter(chapter_numbers=[1], tags=["motion", "force"], limit=5)
+    ),
+    "get_questions_filtered.tags_any": lambda db: question_crud.get_questions_filtered(
+        db, QuestionFilter(chapter_numbers=[3], tags=["units", "vectors"], tag_match="any", limit=5)
+    ),
+    "get_random_question": lambda db: question_crud.get_random_question(
+        db, QuestionFilter(chapter_numbers=[2]), user_id=1, exclude_attempted=True
+    ),
+    "get_practice_set": lambda db: question_crud.get_practice_set(
+        db, QuestionFilter(difficulty_levels=["Medium"]), size=5, seed=7, user_id=2, exclude_attempted=True
+    ),
+    "get_catalog_summary": question_crud.get_catalog_summary,
+    "get_tag_counts": question_crud.get_tag_counts,
+    "search_questions": lambda db: question_crud.search_questions(db, "unit quantity", chapter_numbers=[1]),
+    "get_wrongly_answered_question_ids": lambda db: question_crud.get_wrongly_answered_question_ids(db, 1),
+    "get_attempted_question_ids": lambda db: question_crud.get_attempted_question_ids(db, 1),
+    "create_question": lambda db: question_crud.create_question(db, QuestionCreate(
+        question_id="PHY09-CH03-MCQ9001", question_text="What is inertia?",
+        options={"a": "mass", "b": "speed", "c": "heat", "d": "light"}, correct_answer="a",
+        chapter_name="Dynamics", chapter_number=3, difficulty_level="Easy", tags=["force"]
+    )),
+    "deactivate_question": lambda db: question_crud.deactivate_question(db, 6),
+    # Catalog
+    "catalog.load": lambda db: catalog.load(db, get_catalog_version(db)),
+    "attempted_sets.get": lambda db: attempted_sets.get(db, 2),
+    "bump_catalog_version": bump_catalog_version,
+    # Analytics
+    "record_user_activity": lambda db: analytics_crud.record_user_activity(db, 1, submission(4), True),
+    "record_user_activities": lambda db: analytics_crud.record_user_activities(
+        db, [activity_record(1, 2, "k-1"), activity_record(2, 12, "k-2"), activity_record(1, 2, "k-3")]
+    ),
+    "get_activities_by_idempotency_keys": lambda db: analytics_crud.get_activities_by_idempotency_keys(
+        db, 1, ["k-1", "k-2"]
+    ),
+    "get_user_stats": lambda db: analytics_crud.get_user_stats(db, 1),
+    "get_chapter_progress": lambda db: analytics_crud.get_chapter_progress(db, 1),
+    "get_recent_activity": lambda db: analytics_crud.get_recent_activity(db, 1),
+    "create_mark": lambda db: analytics_crud.create_mark(db, 1, 5, "important", "recheck"),
+    "create_mark.existing": lambda db: analytics_crud.create_mark(db, 1, 3, "review", "again"),
+    "get_user_marks": lambda db: analytics_crud.get_user_marks(db, 1),
+    "get_user_marks.by_type": lambda db: analytics_crud.get_user_marks(db, 1, "review"),
+    "remove_mark": lambda db: analytics_crud.remove_mark(db, 1, 1),
+    "get_leaderboard": analytics_crud.get_leaderboard,
+    "get_real_time_stats": lambda db: analytics_crud.get_real_time_stats(db, 1),
+    "load_dashboard": lambda db: analytics_crud.load_dashboard(db, 1),
+    "get_analytics_version": lambda db: analytics_crud.get_analytics_version(db, 1),
+    "get_performance_trends": lambda db: analytics_crud.get_performance_trends(db, 1),
+    "get_detailed_analytics": lambda db: analytics_crud.get_detailed_analytics(db, 1),
+    "record_session_start": lambda db: analytics_crud.record_session_start(db, 1),
+    "record_session_end": lambda db: analytics_crud.record_session_end(
+        db, 1, analytics_crud.record_session_start(db, 1).id
+    ),
+    "record_user_activities.session": lambda db: record_in_session(db),
+    "reset_user_analytics": lambda db: analytics_crud.reset_user_analytics(db, 2),
+    "load_user_live_stats": lambda db: load_user_live_stats(db, 1),
+    "rebuild_user_stats_rollups.user": lambda db: analytics_crud.rebuild_user_stats_rollups(db, 1),
+    "rebuild_user_daily_activity.user": lambda db: analytics_crud.rebuild_user_daily_activity(db, 1),
+    # Cohorts
+    "refresh_cohort_analytics": lambda db: refresh_cohort(db),
+    "get_cohort_dashboard": lambda db: cohort_crud.get_cohort_dashboard(db, refresh_cohort(db).id),
+    "get_cohort_for_teacher": lambda db: cohort_crud.get_cohort_for_teacher(db, 1, 2),
+    "join_cohort": lambda db: cohort_crud.join_cohort(db, cohort_crud.create_cohort(db, 1, "9-A").join_code, 2),
+    # Users
+    "create_user": lambda db: user_crud.create_user(db, UserCreate(
+        username="carol", email="carol@example.com", password="secret123", full_name="Carol"
+    )),
+    "get_user_by_username": lambda db: user_crud.get_user_by_username(db, "alice"),
+    "get_user_by_email": lambda db: user_crud.get_user_by_email(db, "bob@example.com"),
+    "get_user_by_id": lambda db: user_crud.get_user_by_id(db, 2),
+    "authenticate_user": lambda db: user_crud.authenticate_user(db, "nobody@example.com", "secret123"),
+    "update_user_activity": lambda db: user_crud.update_user_activity(db, 1),
+    "verify_user_by_code": lambda db: user_crud.verify_user_by_code(db, "123456"),
+    "set_user_timezone": lambda db: user_crud.set_user_timezone(db, 1, "Asia/Karachi"),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_crud_query_uses_indexes(engine, db, case):
+    # Warm the catalog and summary so each case only sees its own queries
+    catalog.ensure_fresh(db)
+    question_crud.get_catalog_summary(db)
+
+    with captured_statements(engine) as statements:
+        CASES[case](db)
+    assert_no_scans(engine, statements, case)
+
+
+def test_cold_catalog_summary_uses_indexes(engine, db):
+    """First request after an import rebuilds and stores the summary"""
+    with captured_statements(engine) as statements:
+        question_crud.get_catalog_summary(db)
+    assert_no_scans(engine, statements, "catalog.load")
+
+
+def test_scan_detection(engine, db):
+    """The checker itself flags an unindexed filter"""
+    with captured_statements(engine) as statements:
+        db.execute(Base.metadata.tables["user_activities"].select().where(
+            Base.metadata.tables["user_activities"].c.time_spent > 10
+        )).all()
+    scans = table_scans(engine, statements)
+    assert [table for table, _, _ in scans] == ["user_activities"]
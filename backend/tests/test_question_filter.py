@@ -0,0 +1,39 @@
+"""
+Filtered question pages walk the matches once by cursor, bound to their filters
+"""
+
+from app.models.models import Question
+
+FILTER = "/api/v1/questions/filter"
+
+
+def test_cursor_pages_cover_every_match_once(client, db):
+    filters = {"chapter_numbers": [1, 2], "limit": 4}
+    expected = [
+        question_id for question_id, in db.query(Question.id).filter(
+            Question.is_active == True, Question.chapter_number.in_([1, 2])
+        ).order_by(Question.id)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        page = client.post(FILTER, json={**filters, "cursor": cursor}).json()
+        assert page["total_count"] == len(expected)
+        seen += [question["id"] for question in page["questions"]]
+        cursor = page["page_info"]["next_cursor"]
+        assert page["page_info"]["has_more"] == (cursor is not None)
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_cursor_is_rejected_with_other_filters(client):
+    cursor = client.post(FILTER, json={"chapter_numbers": [1], "limit": 2}).json()["page_info"]["next_cursor"]
+    response = client.post(FILTER, json={"chapter_numbers": [2], "limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert client.post(FILTER, json={"limit": 2, "cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_limit_must_be_positive(client):
+    assert client.post(FILTER, json={"limit": 0}).status_code == 422
+    assert client.post(FILTER, json={"limit": 101}).status_code == 422
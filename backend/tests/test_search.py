@@ -0,0 +1,91 @@
+"""
+Full-text search ranks with BM25, honours filters and follows question edits
+"""
+
+from app.crud.question import search_questions
+from app.models.models import Question
+
+
+def add_question(db, number, text, explanation="See the chapter notes", chapter_number=2, difficulty="Medium"):
+    question = Question(
+        question_id=f"PHY09-CH{chapter_number:02d}-MCQ{number:04d}",
+        question_text=text,
+        options={"a": "metre", "b": "second", "c": "kilogram", "d": "kelvin"},
+        correct_answer="a",
+        explanations={"a": explanation},
+        hints=[],
+        chapter_name="Kinematics",
+        chapter_number=chapter_number,
+        difficulty_level=difficulty,
+        tags=[]
+    )
+    db.add(question)
+    db.commit()
+    return question
+
+
+def hit_ids(db, query, **filters):
+    return [question.id for question, _, _ in search_questions(db, query, **filters)]
+
+
+def test_question_text_matches_rank_above_explanation_matches(db):
+    in_explanation = add_question(db, 101, "What does a speedometer show?", "It ignores acceleration")
+    in_text = add_question(db, 102, "Define acceleration")
+
+    hits = search_questions(db, "acceleration")
+    assert [question.id for question, _, _ in hits] == [in_text.id, in_explanation.id]
+    ranks = [rank for _, rank, _ in hits]
+    assert ranks == sorted(ranks)
+
+
+def test_filters_combine_with_the_query(db):
+    chapter_medium = add_question(db, 101, "Uniform acceleration", chapter_number=2, difficulty="Medium")
+    add_question(db, 102, "Average acceleration", chapter_number=2, difficulty="Hard")
+    chapter_hard = add_question(db, 103, "Angular acceleration", chapter_number=3, difficulty="Hard")
+
+    assert hit_ids(db, "acceleration", chapter_numbers=[2], difficulty_levels=["Medium"]) == [chapter_medium.id]
+    assert hit_ids(db, "acceleration", chapter_numbers=[3]) == [chapter_hard.id]
+    assert hit_ids(db, "acceleration", chapter_numbers=[1]) == []
+
+
+def test_snippet_highlights_the_matched_term(db):
+    add_question(db, 101, "Define acceleration")
+
+    (_, _, snippet), = search_questions(db, "acceleration")
+    assert "<mark>acceleration</mark>" in snippet
+
+
+def test_index_follows_insert_update_and_delete(db):
+    assert hit_ids(db, "momentum") == []
+
+    question = add_question(db, 101, "What is momentum?")
+    assert hit_ids(db, "momentum") == [question.id]
+
+    question.question_text = "What is impulse?"
+    db.commit()
+    assert hit_ids(db, "momentum") == []
+    assert hit_ids(db, "impulse") == [question.id]
+
+    question.is_active = False
+    db.commit()
+    assert hit_ids(db, "impulse") == []
+
+    question.is_active = True
+    db.commit()
+    assert hit_ids(db, "impulse") == [question.id]
+
+    db.delete(question)
+    db.commit()
+    assert hit_ids(db, "impulse") == []
+
+
+def test_search_endpoint_returns_practice_views(client, db):
+    question = add_question(db, 101, "Define acceleration")
+
+    response = client.get("/api/v1/questions/search", params={"q": "accel*"})
+    assert response.status_code == 200
+    (hit,) = response.json()["results"]
+    assert hit["question"]["id"] == question.id
+    assert hit["question"]["question_text"] == "Define acceleration"
+    assert "correct_answer" not in hit["question"]
+    assert "<mark>" in hit["snippet"]
@@ -0,0 +1,44 @@
+"""
+Stats rollups updated per answer must equal a rebuild from user_activities
+"""
+
+from app.crud import analytics as analytics_crud
+from app.models.models import UserStatsCounter, UserStatsSummary
+
+from conftest import answer
+
+
+def rollup_rows(db):
+    summaries = sorted(
+        (row.user_id, row.questions_attempted, row.first_correct, row.total_attempts, row.total_time, row.last_activity_id)
+        for row in db.query(UserStatsSummary)
+    )
+    counters = sorted(
+        (row.user_id, row.dimension, row.key, row.label, row.attempts, row.correct)
+        for row in db.query(UserStatsCounter)
+    )
+    return summaries, counters
+
+
+def test_incremental_rollups_match_rebuild(db):
+    analytics_crud.record_user_activities(db, [
+        answer(1, 11, True), answer(1, 11, False), answer(2, 3, False, time_spent=None), answer(1, 29, True)
+    ])
+    analytics_crud.record_user_activities(db, [answer(2, 25, True), answer(1, 2, True)])
+    incremental = rollup_rows(db)
+
+    db.expire_all()
+    analytics_crud.rebuild_user_stats_rollups(db)
+    assert rollup_rows(db) == incremental
+
+    stats = analytics_crud.get_user_stats(db, 1)
+    assert stats["total_questions_attempted"] == 12
+    assert stats["questions_by_chapter"]["Ch3: Dynamics"] == 7
+
+
+def test_reset_clears_rollups(db):
+    analytics_crud.reset_user_analytics(db, 2)
+    summaries, counters = rollup_rows(db)
+    assert {row[0] for row in summaries} == {1}
+    assert {row[0] for row in counters} == {1}
+    assert analytics_crud.get_user_stats(db, 2)["total_questions_attempted"] == 0
@@ -0,0 +1,89 @@
+"""
+Streaks are stored per user and advanced with every answer
+"""
+
+from datetime import datetime, timedelta
+
+from app.catalog import catalog
+from app.crud import analytics as analytics_crud
+from app.crud import user as user_crud
+from app.live_stats import live_stats
+from app.models.models import UserStatsSummary
+from app.streaks import STREAK_COLUMNS
+
+from conftest import answer
+
+
+def stored_streaks(db):
+    return {
+        row.user_id: tuple(getattr(row, name) for name in STREAK_COLUMNS)
+        for row in db.query(UserStatsSummary)
+    }
+
+
+def test_incremental_streaks_match_rebuild(db):
+    now = datetime.utcnow()
+    analytics_crud.reset_user_analytics(db, 1)
+    analytics_crud.record_user_activities(db, [
+        answer(1, 11, True, now - timedelta(days=4)), answer(1, 12, True, now - timedelta(days=3)),
+        answer(1, 13, True, now - timedelta(days=3)), answer(2, 2, False, now - timedelta(days=1))
+    ])
+    analytics_crud.record_user_activities(db, [answer(1, 14, False), answer(1, 15, True), answer(1, 16, True)])
+    incremental = stored_streaks(db)
+
+    today = now.date()
+    assert incremental[1][:4] == (2, 3, 1, 2)
+    assert incremental[1][4] == today
+
+    analytics_crud.rebuild_user_stats_rollups(db)
+    assert stored_streaks(db) == incremental
+
+    streaks = analytics_crud.get_user_stats(db, 1)["streaks"]
+    assert streaks == {
+        "current_streak": 2, "longest_streak": 3, "daily_streak": 1,
+        "longest_daily_streak": 2, "last_practice_day": today.isoformat()
+    }
+    assert analytics_crud.load_dashboard(db, 1)["user_stats"]["streaks"] == streaks
+
+
+def test_backdated_day_joins_daily_runs(db):
+    now = datetime.utcnow()
+    analytics_crud.reset_user_analytics(db, 1)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True, now - timedelta(days=2)), answer(1, 12, True, now)])
+    assert analytics_crud.get_user_stats(db, 1)["streaks"]["daily_streak"] == 1
+
+    # An offline upload for yesterday links both days
+    analytics_crud.record_user_activities(db, [answer(1, 13, False, now - timedelta(days=1))])
+    streaks = analytics_crud.get_user_stats(db, 1)["streaks"]
+    assert (streaks["daily_streak"], streaks["longest_daily_streak"], streaks["current_streak"]) == (3, 3, 0)
+
+    incremental = stored_streaks(db)
+    analytics_crud.rebuild_user_stats_rollups(db, 1)
+    assert stored_streaks(db) == incremental
+
+
+def test_daily_streak_lapses_and_follows_timezone(db):
+    # 23:30 UTC three days ago is already the next day in Karachi (UTC+5)
+    late = datetime.utcnow().replace(hour=23, minute=30) - timedelta(days=3)
+    analytics_crud.reset_user_analytics(db, 1)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True, late)])
+    streaks = analytics_crud.get_user_stats(db, 1)["streaks"]
+    assert (streaks["daily_streak"], streaks["longest_daily_streak"]) == (0, 1)
+    assert streaks["last_practice_day"] == late.date().isoformat()
+
+    user_crud.set_user_timezone(db, 1, "Asia/Karachi")
+    streaks = analytics_crud.get_user_stats(db, 1)["streaks"]
+    assert (streaks["daily_streak"], streaks["longest_daily_streak"]) == (0, 1)
+    assert streaks["last_practice_day"] == (late.date() + timedelta(days=1)).isoformat()
+
+
+def test_live_streaks_match_database(db):
+    catalog.ensure_fresh(db)
+    analytics_crud.reset_user_analytics(db, 1)
+    live_stats.get(db, 1)
+    analytics_crud.record_user_activities(db, [answer(1, 11, True) for _ in range(12)])
+    analytics_crud.record_user_activities(db, [answer(1, 12, True)])
+
+    live = live_stats.get(db, 1)
+    assert live["today"]["current_streak"] == 13
+    assert live["overall"]["streaks"] == analytics_crud.get_user_stats(db, 1)["streaks"]
@@ -0,0 +1,38 @@
+"""
+Tag filters match any or all of the given tags, in SQL and in the catalog
+"""
+
+import pytest
+
+from app.catalog import catalog
+from app.crud.question import get_questions_filtered
+from app.schemas.schemas import QuestionFilter
+
+# Active questions 1 to 29 carry TAGS[n % 4] and TAGS[(n + 1) % 4]; units and
+# motion go together on n % 4 == 0 (7 questions), units alone on 3 and motion
+# alone on 1 (22 with either)
+UNITS_AND_MOTION = {n for n in range(1, 30) if n % 4 == 0}
+UNITS_OR_MOTION = {n for n in range(1, 30) if n % 4 in (0, 1, 3)}
+UNITS = {n for n in range(1, 30) if n % 4 in (0, 3)}
+ACTIVE = set(range(1, 30))
+
+
+@pytest.mark.parametrize("tags, tag_match, expected", [
+    (["units", "motion"], "all", UNITS_AND_MOTION),
+    (["units", "motion"], "any", UNITS_OR_MOTION),
+    (["motion", "units", "units"], "all", UNITS_AND_MOTION),
+    ([], "all", ACTIVE),
+    ([], "any", ACTIVE),
+    (["units", "unknown"], "all", set()),
+    (["units", "unknown"], "any", UNITS),
+    (["unknown"], "any", set()),
+])
+def test_tag_match(db, tags, tag_match, expected):
+    assert len(UNITS_AND_MOTION) == 7 and len(UNITS_OR_MOTION) == 22
+    filters = QuestionFilter(tags=tags, tag_match=tag_match, limit=100)
+
+    questions, total_count, next_cursor = get_questions_filtered(db, filters)
+    assert {question.id for question in questions} == expected
+    assert (total_count, next_cursor) == (len(expected), None)
+    assert set(catalog.ensure_fresh(db).members(filters)) == expected
+
@@ -0,0 +1,631 @@
+"""
+Micro-benchmarks for the EduTheo backend hot paths
+
+Usage:
+    python scripts/benchmark.py catalog [--sizes 80,10000,1000000]
+    python scripts/benchmark.py search [--size 1000000]
+    python scripts/benchmark.py serialize [--batch 1000]
+    python scripts/benchmark.py ingest [--answers 20000 --clients 64]
+    python scripts/benchmark.py concurrency [--clients 500 --rounds 4]
+    python scripts/benchmark.py detailed [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add the backend directory to the path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.append(str(backend_dir))
+
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI, Header
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, case, create_engine, func, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import questions as questions_api
+from app.api.auth import get_current_user
+from app.catalog import QuestionCatalog, catalog
+from app.core import database
+from app.core.config import settings
+from app.crud.analytics import get_detailed_analytics, rebuild_user_stats_rollups, record_user_activity
+from app.core.database import SessionLocal, SessionRunner, async_database_url, get_session_runner, init_search_index
+from app.crud.question import search_questions
+from app.ingest import ActivityWriter, activity_writer
+from app.models.models import Base, Question, User, UserActivity
+from app.payloads import QuestionPayloadCache, json_array, json_object
+from app.schemas.schemas import AnswerSubmission, QuestionFilter, QuestionPractice, QuestionResponse, UserResponse
+
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+TAGS = ["motion", "force", "energy", "pressure", "heat", "waves", "units", "vectors"]
+
+
+def synthetic_questions(count: int, seed: int = 7) -> List[tuple]:
+    """Catalog rows shaped like ``QuestionCatalog.build`` expects"""
+    rng = random.Random(seed)
+    rows = []
+    for question_id in range(1, count + 1):
+        chapter = rng.randint(1, 10)
+        rows.append((
+            question_id,
+            f"PHY09-CH{chapter:02d}-MCQ{question_id:07d}",
+            chapter,
+            f"Chapter {chapter}",
+            rng.choice(DIFFICULTIES),
+            "multiple_choice",
+            rng.sample(TAGS, 2)
+        ))
+    return rows
+
+
+def time_calls(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Per-call latency percentiles in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[int(len(samples) * 0.99) - 1]
+    }
+
+
+def bench_catalog(sizes: List[int], repeat: int) -> None:
+    """Random question selection latency against catalog size"""
+    scenarios = {
+        "no filter": QuestionFilter(),
+        "chapter": QuestionFilter(chapter_numbers=[3]),
+        "chapter+difficulty": QuestionFilter(chapter_numbers=[3, 4], difficulty_levels=["Hard"]),
+        "tag": QuestionFilter(tags=["energy"]),
+        "narrow": QuestionFilter(chapter_numbers=[3], difficulty_levels=["Hard"], tags=["energy", "heat"]),
+    }
+
+    print(f"{'questions':>10} {'build s':>8}  " + "  ".join(f"{name:>22}" for name in scenarios))
+    for size in sizes:
+        catalog = QuestionCatalog()
+        start = time.perf_counter()
+        catalog.build(synthetic_questions(size), version=1)
+        build_time = time.perf_counter() - start
+
+        cells = []
+        for filters in scenarios.values():
+            catalog.sample(filters)  # warm the filter cache
+            timing = time_calls(lambda: catalog.sample(filters), repeat)
+            cells.append(f"{timing['p50']:>8.1f} / {timing['p99']:>7.1f} us")
+        print(f"{size:>10} {build_time:>8.2f}  " + "  ".join(f"{cell:>22}" for cell in cells))
+    print("(cells are p50 / p99 latency per random pick)")
+
+
+def synthetic_vocabulary(count: int, seed: int = 11) -> List[str]:
+    """Pronounceable pseudo-words standing in for a physics vocabulary"""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "ve", "mi", "tor", "qua", "ne", "sil", "ra", "pho", "ton", "ex", "mag", "ul", "dri"]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def bench_search(size: int, repeat: int) -> None:
+    """FTS5 search latency over a synthetic question bank"""
+    vocabulary = synthetic_vocabulary(20000)
+    rng = random.Random(3)
+    workdir = tempfile.mkdtemp(prefix="edutheo-bench-")
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'search.db')}")
+    Base.metadata.create_all(bind=engine)
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for batch_start in range(0, size, 50000):
+            rows = []
+            for question_id in range(batch_start + 1, min(size, batch_start + 50000) + 1):
+                chapter = rng.randint(1, 10)
+                rows.append({
+                    "question_id": f"PHY09-CH{chapter:02d}-MCQ{question_id:07d}",
+                    "question_text": " ".join(rng.choices(vocabulary, k=14)),
+                    "options": {letter: " ".join(rng.choices(vocabulary, k=3)) for letter in "abcd"},
+                    "correct_answer": "A",
+                    "explanations": {"a": " ".join(rng.choices(vocabulary, k=12))},
+                    "chapter_name": f"Chapter {chapter}",
+                    "chapter_number": chapter,
+                    "difficulty_level": rng.choice(DIFFICULTIES),
+                    "tags": rng.sample(TAGS, 2),
+                    "is_active": True
+                })
+            conn.execute(insert(Question), rows)
+    init_search_index(engine)
+    print(f"Indexed {size} questions in {time.perf_counter() - start:.1f}s ({workdir})")
+
+    db = sessionmaker(bind=engine)()
+    scenarios = {
+        "one term": lambda: search_questions(db, rng.choice(vocabulary)),
+        "two terms": lambda: search_questions(db, " ".join(rng.sample(vocabulary, 2))),
+        "prefix": lambda: search_questions(db, rng.choice(vocabulary)[:5] + "*"),
+        "term+chapter": lambda: search_questions(db, rng.choice(vocabulary), chapter_numbers=[3]),
+    }
+    for name, func in scenarios.items():
+        timing = time_calls(func, repeat)
+        print(f"{name:>14}: p50 {timing['p50'] / 1000:.2f} ms, p99 {timing['p99'] / 1000:.2f} ms")
+    db.close()
+
+
+def synthetic_question_rows(count: int, seed: int = 5) -> List[Question]:
+    """Detached ORM questions with realistic field sizes"""
+    rng = random.Random(seed)
+    words = synthetic_vocabulary(2000)
+    questions = []
+    for question_id in range(1, count + 1):
+        chapter = rng.randint(1, 10)
+        questions.append(Question(
+            id=question_id,
+            question_id=f"PHY09-CH{chapter:02d}-MCQ{question_id:07d}",
+            question_text=" ".join(rng.choices(words, k=18)) + "?",
+            options={letter: " ".join(rng.choices(words, k=4)) for letter in "abcd"},
+            correct_answer="A",
+            explanations={letter: " ".join(rng.choices(words, k=15)) for letter in "abcd"},
+            hints=[" ".join(rng.choices(words, k=10))],
+            chapter_name=f"Chapter {chapter}",
+            chapter_number=chapter,
+            difficulty_level=rng.choice(DIFFICULTIES),
+            question_type="multiple_choice",
+            source="benchmark",
+            language="english",
+            grade="9th",
+            subject="Physics",
+            tags=rng.sample(TAGS, 2),
+            created_date=datetime.now(timezone.utc),
+            is_active=True
+        ))
+    return questions
+
+
+def fastapi_json(content) -> bytes:
+    """Encode the way FastAPI's default JSONResponse does"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def bench_serialize(batch: int, repeat: int) -> None:
+    """Cost of turning ``batch`` questions into a response body"""
+    questions = synthetic_question_rows(batch)
+    page_info = {"limit": batch, "offset": 0, "has_more": False, "next_cursor": None}
+
+    def practice_before():
+        practice = [
+            QuestionPractice(
+                id=q.id,
+                question_id=q.question_id,
+                question_text=q.question_text,
+                options=q.options,
+                hints=q.hints,
+                chapter_name=q.chapter_name,
+                chapter_number=q.chapter_number,
+                difficulty_level=q.difficulty_level,
+                tags=q.tags
+            )
+            for q in questions
+        ]
+        return fastapi_json({"questions": practice, "total_count": batch, "page_info": page_info})
+
+    def full_before():
+        return fastapi_json([QuestionResponse.model_validate(q) for q in questions])
+
+    cache = QuestionPayloadCache(batch)
+
+    def practice_after():
+        return json_object(
+            "questions",
+            (cache.practice(q, 1) for q in questions),
+            {"total_count": batch, "page_info": page_info}
+        )
+
+    def full_after():
+        return json_array([cache.full(q, 1) for q in questions])
+
+    def cold(func):
+        def run():
+            cache.clear()
+            return func()
+        return run
+
+    assert json.loads(practice_before()) == json.loads(practice_after())
+    assert json.loads(full_before()) == json.loads(full_after())
+
+    scenarios = {
+        "practice, models + json": practice_before,
+        "practice, orjson cold": cold(practice_after),
+        "practice, cached bytes": practice_after,
+        "full, models + json": full_before,
+        "full, orjson cold": cold(full_after),
+        "full, cached bytes": full_after,
+    }
+    for name, func in scenarios.items():
+        func()
+        timing = time_calls(func, repeat)
+        print(f"{name:>24}: p50 {timing['p50'] / 1000:.2f} ms, p99 {timing['p99'] / 1000:.2f} ms per {batch} questions")
+
+
+def ingest_database(users: int, questions: int):
+    """Fresh file-backed SQLite database with users and questions to answer"""
+    workdir = tempfile.mkdtemp(prefix="edutheo-bench-")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(workdir, 'ingest.db')}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Question), [
+            {
+                "question_id": f"PHY09-CH01-MCQ{i:07d}",
+                "question_text": f"Question {i}",
+                "options": {"a": "1", "b": "2", "c": "3", "d": "4"},
+                "correct_answer": "A",
+                "chapter_name": "Chapter 1",
+                "chapter_number": 1,
+                "difficulty_level": "Easy"
+            }
+            for i in range(1, questions + 1)
+        ])
+    return engine, sessionmaker(bind=engine)
+
+
+def bench_ingest(answers: int, clients: int, users: int) -> None:
+    """Answers per second: inline record_user_activity vs the write-behind writer"""
+    rng = random.Random(9)
+    workload = [(rng.randint(1, users), rng.randint(1, 500), rng.choice("ABCD")) for _ in range(answers)]
+
+    async def drive(handle):
+        # ``clients`` concurrent request handlers sharing the workload
+        async def client(offset):
+            for user_id, question_id, answer in workload[offset::clients]:
+                await handle(user_id, question_id, answer)
+        await asyncio.gather(*(client(offset) for offset in range(clients)))
+
+    # Current path: one query/INSERT/COMMIT/refresh per answer inside the request
+    engine, session_factory = ingest_database(users, 500)
+
+    async def inline(user_id, question_id, answer):
+        db = session_factory()
+        try:
+            submission = AnswerSubmission(question_id=question_id, user_answer=answer, time_spent=10)
+            record_user_activity(db, user_id, submission, answer == "A")
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    asyncio.run(drive(inline))
+    inline_rate = answers / (time.perf_counter() - start)
+    engine.dispose()
+
+    # Write-behind: enqueue and return, batches flushed by the background writer
+    engine, session_factory = ingest_database(users, 500)
+    writer = ActivityWriter(500, 50, 10000, session_factory=session_factory)
+
+    async def queued(user_id, question_id, answer):
+        await writer.submit({
+            "user_id": user_id,
+            "question_id": question_id,
+            "user_answer": answer,
+            "is_correct": answer == "A",
+            "time_spent": 10,
+            "completed_at": datetime.utcnow()
+        })
+
+    async def run_queued():
+        await writer.start()
+        await drive(queued)
+        await writer.stop()  # include the final flush in the measurement
+
+    start = time.perf_counter()
+    asyncio.run(run_queued())
+    queued_rate = answers / (time.perf_counter() - start)
+
+    db = session_factory()
+    written = db.query(UserActivity).count()
+    db.close()
+    engine.dispose()
+
+    print(f"{'inline':>12}: {inline_rate:>9.0f} answers/s")
+    print(f"{'write-behind':>12}: {queued_rate:>9.0f} answers/s ({written} rows written, {queued_rate / inline_rate:.1f}x)")
+
+
+class BlockingRunner(SessionRunner):
+    """The previous behaviour: CRUD runs right on the event loop"""
+
+    async def run(self, fn, *args, **kwargs):
+        return self._run_sync(fn, *args, **kwargs)
+
+
+def practice_app() -> FastAPI:
+    """Questions router with the bearer token replaced by an ``X-User`` header"""
+    app = FastAPI()
+    app.include_router(questions_api.router, prefix="/api/v1/questions")
+
+    async def bench_user(x_user: int = Header(...)) -> UserResponse:
+        return UserResponse(
+            id=x_user, username=f"user{x_user}", email=f"user{x_user}@example.com",
+            is_active=True, created_at=datetime.utcnow(), subscription_tier="base", ai_queries_today=0
+        )
+
+    app.dependency_overrides[get_current_user] = bench_user
+    return app
+
+
+def bench_concurrency(clients: int, rounds: int) -> None:
+    """Request latency and event-loop stalls with many simultaneous practice clients"""
+    engine, _ = ingest_database(clients, 2000)
+    with engine.connect() as conn:
+        # Readers and the answer writer overlap constantly; rollback-journal locking would serialize them
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    SessionLocal.configure(bind=engine)  # every session the app opens now uses the bench database
+    async_engine = create_async_engine(async_database_url(str(engine.url)))
+    app = practice_app()
+
+    async def practice(http, user_id, latencies):
+        headers = {"X-User": str(user_id)}
+        for _ in range(rounds):
+            start = time.perf_counter()
+            question = (await http.post("/api/v1/questions/get_question", json={}, headers=headers)).json()
+            latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            response = await http.post("/api/v1/questions/check_answer", json={
+                "question_id": question["id"], "user_answer": "a", "time_spent": 10
+            }, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def run(mode):
+        latencies: List[float] = []
+        lags: List[float] = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            # Stand-in for a WebSocket: how late does a 10 ms timer fire?
+            loop = asyncio.get_running_loop()
+            while not stop.is_set():
+                expected = loop.time() + 0.01
+                await asyncio.sleep(0.01)
+                lags.append(loop.time() - expected)
+
+        await activity_writer.start()
+        tick = asyncio.create_task(ticker())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(practice(http, user_id, latencies) for user_id in range(1, clients + 1)))
+            elapsed = time.perf_counter() - start
+        stop.set()
+        await tick
+        await activity_writer.stop()
+        return latencies, lags, elapsed
+
+    modes = {
+        "blocking": (lambda: BlockingRunner(SessionLocal), None),
+        "threadpool": (None, None),
+        "async": (None, async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)),
+    }
+    for mode, (runner_override, async_factory) in modes.items():
+        app.dependency_overrides.pop(get_session_runner, None)
+        if runner_override is not None:
+            app.dependency_overrides[get_session_runner] = runner_override
+        database.AsyncSessionLocal = async_factory
+        catalog.clear()
+
+        latencies, lags, elapsed = asyncio.run(run(mode))
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(
+            f"{mode:>10}: p50 {p50:7.1f} ms, p99 {p99:7.1f} ms, "
+            f"max loop stall {max(lags, default=0) * 1000:6.1f} ms, "
+            f"{len(latencies) / elapsed:6.0f} requests/s"
+        )
+
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+def detailed_before(db, user_id: int, days: int) -> dict:
+    """The previous ``get_detailed_analytics``: every (activity, question) pair loaded into Python"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    pairs = db.query(UserActivity, Question).join(Question).filter(
+        and_(UserActivity.user_id == user_id, UserActivity.completed_at >= start_date)
+    ).all()
+    activities = [activity for activity, _ in pairs]
+
+    chapters, difficulties, hours, weekdays = {}, {}, {}, {}
+    for activity, question in pairs:
+        chapter = chapters.setdefault(question.chapter_name, {"total": 0, "correct": 0})
+        chapter["total"] += 1
+        chapter["correct"] += bool(activity.is_correct)
+        difficulties[question.difficulty_level] = difficulties.get(question.difficulty_level, 0) + 1
+    for activity in activities:
+        hour = hours.setdefault(activity.completed_at.hour, {"total": 0, "correct": 0})
+        hour["total"] += 1
+        hour["correct"] += bool(activity.is_correct)
+        weekday = activity.completed_at.strftime('%A')
+        weekdays[weekday] = weekdays.get(weekday, 0) + 1
+
+    chapter_accuracy = sorted(
+        ({"chapter": name, "accuracy": stats["correct"] / stats["total"] * 100, "total": stats["total"]}
+         for name, stats in chapters.items()),
+        key=lambda item: item["accuracy"]
+    )
+    best_hour, best_accuracy = None, -1
+    for hour, stats in hours.items():
+        if stats["total"] >= 3 and stats["correct"] / stats["total"] > best_accuracy:
+            best_accuracy, best_hour = stats["correct"] / stats["total"], hour
+
+    unique_dates = {activity.completed_at.date() for activity in activities}
+    total_time = sum(activity.time_spent for activity in activities if activity.time_spent)
+
+    day = func.date(UserActivity.completed_at)
+    daily = db.query(
+        day.label('date'), func.count(UserActivity.id).label('total'),
+        func.sum(case((UserActivity.is_correct == True, 1), else_=0)).label('correct'),
+        func.sum(UserActivity.time_spent).label('time_spent')
+    ).filter(
+        UserActivity.user_id == user_id, UserActivity.completed_at >= start_date
+    ).group_by(day).order_by(day).all()
+
+    return {
+        "insights": {
+            "total_practice_time": total_time,
+            "average_session_length": round(total_time / len(unique_dates), 1),
+            "peak_performance_hour": f"{best_hour}:00" if best_hour is not None else None,
+            "improvement_areas": [
+                {"name": item["chapter"], "accuracy": round(item["accuracy"])}
+                for item in chapter_accuracy if item["total"] >= 5 and item["accuracy"] < 70
+            ][:3],
+            "strengths": [
+                {"name": item["chapter"], "accuracy": round(item["accuracy"])}
+                for item in reversed(chapter_accuracy) if item["total"] >= 5 and item["accuracy"] >= 85
+            ][:3]
+        },
+        "patterns": {
+            "most_active_day": max(weekdays, key=weekdays.get),
+            "preferred_difficulty": max(difficulties, key=difficulties.get),
+            "consistency_score": round(len(unique_dates) / days * 100, 1)
+        },
+        "trends": [
+            {
+                "date": row.date,
+                "questions_attempted": row.total,
+                "correct_answers": row.correct,
+                "accuracy": round(row.correct / row.total * 100, 1),
+                "time_spent": row.time_spent or 0,
+                "avg_time_per_question": round((row.time_spent or 0) / row.total, 1)
+            }
+            for row in daily
+        ]
+    }
+
+
+def without_sessions(report: dict) -> dict:
+    """A detailed report minus the session insights, which the row-by-row version predates"""
+    insights = {
+        key: value for key, value in report["insights"].items()
+        if key not in ("average_session_length", "practice_sessions")
+    }
+    return {**report, "insights": insights}
+
+
+def bench_detailed(sizes: List[int], days: int, before_limit: int) -> None:
+    """Detailed analytics latency for one user against the size of their history"""
+    rng = random.Random(13)
+    chapter_accuracy = {chapter: rng.uniform(0.5, 0.95) for chapter in range(1, 11)}
+    for size in sizes:
+        engine, session_factory = ingest_database(1, 500)
+        with engine.begin() as conn:
+            conn.execute(Question.__table__.update().values(
+                chapter_number=Question.id % 10 + 1,
+                chapter_name="Chapter " + func.cast(Question.id % 10 + 1, Question.chapter_name.type),
+                difficulty_level=case((Question.id % 3 == 0, "Hard"), (Question.id % 3 == 1, "Easy"), else_="Medium")
+            ))
+        # Spread the history over the window, clear of its first local day
+        now = datetime.utcnow()
+        span = (days - 2) * 86400
+        for offset in range(0, size, 50000):
+            rows = []
+            for index in range(offset, min(offset + 50000, size)):
+                question_id = rng.randint(1, 500)
+                rows.append({
+                    "user_id": 1,
+                    "question_id": question_id,
+                    "user_answer": "a",
+                    "is_correct": rng.random() < chapter_accuracy[question_id % 10 + 1],
+                    "time_spent": rng.randint(5, 90),
+                    "attempt_number": 1,
+                    "completed_at": now - timedelta(seconds=span * (size - index) / size)
+                })
+            with engine.begin() as conn:
+                conn.execute(insert(UserActivity), rows)
+        db = session_factory()
+        rebuild_user_stats_rollups(db)
+
+        reports, cells = [], []
+        for analytics_engine in ("sql", "numpy"):
+            settings.analytics_engine = analytics_engine
+            reports.append(get_detailed_analytics(db, 1, days))
+            timing = time_calls(lambda: get_detailed_analytics(db, 1, days), 5)
+            cells.append(f"{analytics_engine} {timing['p50'] / 1000:8.1f} ms")
+        settings.analytics_engine = "sql"
+        if size <= before_limit:
+            db.expunge_all()
+            start = time.perf_counter()
+            reports.append(detailed_before(db, 1, days))
+            cells.append(f"row-by-row {(time.perf_counter() - start) * 1000:8.1f} ms")
+        identical = all(without_sessions(report) == without_sessions(reports[0]) for report in reports)
+        print(f"{size:>9} activities: " + ", ".join(cells) + f", identical: {identical}")
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EduTheo backend micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    catalog_parser = subparsers.add_parser("catalog", help="Random question selection")
+    catalog_parser.add_argument("--sizes", default="80,1000,10000,100000,1000000")
+    catalog_parser.add_argument("--repeat", type=int, default=2000)
+
+    search_parser = subparsers.add_parser("search", help="Full-text question search")
+    search_parser.add_argument("--size", type=int, default=1000000)
+    search_parser.add_argument("--repeat", type=int, default=200)
+
+    serialize_parser = subparsers.add_parser("serialize", help="Question payload encoding")
+    serialize_parser.add_argument("--batch", type=int, default=1000)
+    serialize_parser.add_argument("--repeat", type=int, default=200)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Answer activity ingestion throughput")
+    ingest_parser.add_argument("--answers", type=int, default=20000)
+    ingest_parser.add_argument("--clients", type=int, default=64)
+    ingest_parser.add_argument("--users", type=int, default=200)
+
+    concurrency_parser = subparsers.add_parser("concurrency", help="Latency under many simultaneous practice clients")
+    concurrency_parser.add_argument("--clients", type=int, default=500)
+    concurrency_parser.add_argument("--rounds", type=int, default=4)
+
+    detailed_parser = subparsers.add_parser("detailed", help="Detailed analytics against activity history size")
+    detailed_parser.add_argument("--sizes", default="10000,100000,1000000")
+    detailed_parser.add_argument("--days", type=int, default=365)
+    detailed_parser.add_argument("--before-limit", type=int, default=1000000, help="Skip the row-by-row run above this size")
+
+    args = parser.parse_args()
+
+    if args.benchmark == "catalog":
+        bench_catalog([int(size) for size in args.sizes.split(",")], args.repeat)
+    elif args.benchmark == "search":
+        bench_search(args.size, args.repeat)
+    elif args.benchmark == "serialize":
+        bench_serialize(args.batch, args.repeat)
+    elif args.benchmark == "ingest":
+        bench_ingest(args.answers, args.clients, args.users)
+    elif args.benchmark == "concurrency":
+        bench_concurrency(args.clients, args.rounds)
+    elif args.benchmark == "detailed":
+        bench_detailed([int(size) for size in args.sizes.split(",")], args.days, args.before_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,10 @@ backend_dir = Path(__file__).parent.parent / "backend"
 sys.path.append(str(backend_dir))
 
 from app.models.models import Base, Question, User
+from app.core.database import init_search_index
 from app.core.security import get_password_hash
+from app.catalog import bump_catalog_version
+from app.crud.question import sync_question_tags
 
 
 class MCQImporter:
@@ -40,8 +43,9 @@ class MCQImporter:
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         self.db = SessionLocal()
 
-        # Create tables if they don't exist
+        # Create tables (and the full-text search index) if they don't exist
         Base.metadata.create_all(bind=self.engine)
+        init_search_index(self.engine)
 
         self.import_stats = {
             "total_records": 0,
@@ -91,11 +95,13 @@ class MCQImporter:
                 existing_question.tags = question_data["tags"]
                 existing_question.source = question_data["source"]
                 existing_question.updated_date = datetime.utcnow()
+                sync_question_tags(existing_question)
                 self.import_stats["updated_questions"] += 1
                 print(f"Updated question: {question_data['question_id']}...")
             else:
                 # Create new question
                 new_question = Question(**question_data)
+                sync_question_tags(new_question)
                 self.db.add(new_question)
                 self.import_stats["imported_questions"] += 1
                 print(f"Imported question: {question_data['question_id']}...")
@@ -179,7 +185,8 @@ class MCQImporter:
                 else:
                     self.import_stats["skipped_records"] += 1
 
-            # Final commit
+            # Final commit, invalidating any running server's question catalog
+            bump_catalog_version(self.db)
             self.db.commit()
 
             # Create demo user
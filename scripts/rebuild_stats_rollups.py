@@ -0,0 +1,43 @@
+"""
+Rebuild the per-user stats rollups and streaks from user_activities
+
+Usage:
+    python scripts/rebuild_stats_rollups.py [--user-id 42] [--database-url sqlite:///./edutheo.db]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend directory to the path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.append(str(backend_dir))
+
+from app.core.config import settings
+from app.crud.analytics import rebuild_user_stats_rollups
+
+
+def main():
+    """Recompute user_stats_summary (streaks included), user_stats_counters and user_daily_activity"""
+    parser = argparse.ArgumentParser(description="Rebuild per-user stats rollups from user_activities")
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user (default: everyone)")
+    parser.add_argument("--database-url", default=settings.database_url)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        start = time.perf_counter()
+        rebuilt = rebuild_user_stats_rollups(db, args.user_id)
+        print(f"Rebuilt stats rollups for {rebuilt} users in {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Write answer activity records that the write-behind writer dead-lettered
+
+Records that still fail stay in the file; the rest are removed from it.
+
+Usage:
+    python scripts/replay_activity_dead_letters.py [--path logs/activity_dead_letters.jsonl] [--database-url sqlite:///./edutheo.db]
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend directory to the path
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.append(str(backend_dir))
+
+from app.core.config import settings
+from app.crud.analytics import record_user_activities
+
+
+def main():
+    """Replay dead-lettered records one at a time through record_user_activities"""
+    parser = argparse.ArgumentParser(description="Replay dead-lettered answer activity records")
+    parser.add_argument("--path", default=settings.activity_dead_letter_path)
+    parser.add_argument("--database-url", default=settings.database_url)
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    if not path.exists():
+        print(f"No dead-lettered records at {path}")
+        return
+
+    engine = create_engine(args.database_url)
+    db = sessionmaker(bind=engine)()
+    remaining = []
+    replayed = 0
+    try:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            record = dict(entry["record"])
+            if record.get("completed_at"):
+                record["completed_at"] = datetime.fromisoformat(record["completed_at"])
+            try:
+                record_user_activities(db, [record])
+                replayed += 1
+            except Exception as e:
+                db.rollback()
+                remaining.append(json.dumps({"record": entry["record"], "error": str(e)}))
+        path.write_text("".join(f"{line}\n" for line in remaining), encoding="utf-8")
+        print(f"Replayed {replayed} records, {len(remaining)} still failing")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
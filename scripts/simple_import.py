@@ -13,7 +13,7 @@ from pathlib import Path
 
 # Add SQLAlchemy imports
 try:
-    from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, Boolean
+    from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, Boolean, Index
     from sqlalchemy.ext.declarative import declarative_base
     from sqlalchemy.orm import sessionmaker
 except ImportError:
@@ -47,6 +47,36 @@ class Question(Base):
     is_active = Column(Boolean, default=True)
 
 
+class QuestionTag(Base):
+    __tablename__ = "question_tags"
+    
+    question_id = Column(Integer, primary_key=True)
+    tag = Column(String(50), primary_key=True)
+    
+    __table_args__ = (
+        Index("ix_question_tags_tag_question_id", "tag", "question_id"),
+    )
+
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+
+def bump_catalog_version(db):
+    """Invalidate the API server's in-memory question catalog"""
+    state = db.query(CatalogState).filter(CatalogState.id == 1).first()
+    if state:
+        state.version += 1
+        state.updated_at = datetime.utcnow()
+    else:
+        db.add(CatalogState(id=1, version=1, updated_at=datetime.utcnow()))
+    db.commit()
+
+
 def create_database(database_url):
     """Create database and tables"""
     # Ensure database directory exists
@@ -162,8 +192,13 @@ def import_questions(json_file_path, database_url):
                 is_active=True
             )
             
-            # Add to database
+            # Add to database, indexing its tags
             db.add(new_question)
+            db.flush()
+            db.add_all(
+                QuestionTag(question_id=new_question.id, tag=tag)
+                for tag in dict.fromkeys(tags)
+            )
             db.commit()
             
             stats['imported'] += 1
@@ -176,6 +211,9 @@ def import_questions(json_file_path, database_url):
             db.rollback()
             continue
     
+    if stats['imported'] > 0:
+        bump_catalog_version(db)
+    
     # Close database connection
     db.close()
     